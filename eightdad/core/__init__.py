@@ -2,5 +2,5 @@
 Unifying package for front-ends and prototyping to import from
 """
 
-from .video import VideoRam
+from .video import VideoRam, IntRowVideoRam, DirtyTrackingVideoRam
 from .vm import Chip8VirtualMachine
\ No newline at end of file
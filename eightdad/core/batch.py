@@ -0,0 +1,628 @@
+"""
+Structure-of-arrays engine running many Chip-8 VMs in lockstep
+
+Each piece of VM state is one NumPy array with a leading lane axis, so
+a step fetches an instruction for every lane at once, then executes
+each instruction family as a handful of masked array operations over
+the lanes that hit it. The cost of a step barely depends on how many
+lanes there are, which suits running one ROM many times with different
+inputs.
+
+Every lane gives the same results as a Chip8VirtualMachine ticked with
+its default tick length, with these differences:
+
+    - Cxkk draws from the batch's own NumPy generator, not random
+    - the call stack holds at most stack_depth addresses
+    - the screen width must be a multiple of 8
+
+Where a VM would raise an exception, such as when reading past the end
+of memory, the lane's faulted flag is set instead. Unhandled
+instructions set the unhandled flag. Either way, the lane stops
+executing with the program counter on the instruction that stopped it,
+though its timers keep running.
+
+NumPy is an optional dependency, installed with the batch extra.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from eightdad.types import Buffer
+from eightdad.core.video import DEFAULT_DIGITS
+from eightdad.core.bytecode import INSTRUCTION_LENGTH
+from eightdad.core.vm import (
+    Chip8VirtualMachine,
+    DEFAULT_EXECUTION_START,
+    DIGIT_HEIGHT,
+    ExecutionMode,
+    Timer
+)
+
+# which family step method runs each type nibble, in the same groups
+# as bytecode.FIRST_NIBBLE_TO_HANDLER
+TYPE_NIBBLE_TO_FAMILY = np.array(
+    [0, 1, 1, 2, 2, 3, 2, 2, 4, 3, 1, 1, 2, 5, 6, 6],
+    dtype=np.int8
+)
+
+# marks a waiting lane nobody has pressed a key for yet
+NO_KEY = -1
+
+# marks a math result that leaves VF alone
+KEEP_VF = -1
+
+
+class Chip8Batch:
+    """
+    Many Chip-8 VMs, each called a lane, stepped together.
+
+    State is exposed as arrays indexed by lane first, named after the
+    matching Chip8VirtualMachine attributes where there is one. The
+    screen is kept packed, 8 pixels per byte with the leftmost in the
+    highest bit, so a lane's rows match VideoRam.pixels.tobytes().
+    """
+
+    def __init__(
+            self,
+            num_lanes: int,
+            display_size: Tuple[int, int] = (64, 32),
+            display_wrap: bool = False,
+            memory_size: int = 4096,
+            execution_start: int = DEFAULT_EXECUTION_START,
+            digit_start: int = 0x0,
+            ticks_per_frame: int = 20,
+            frames_per_second: int = 30,
+            stack_depth: int = 16,
+            seed: Optional[int] = None
+    ):
+        """
+        Build a batch of identical, freshly initialized lanes.
+
+        Arguments shared with Chip8VirtualMachine mean the same thing.
+
+        :param num_lanes: how many VMs to run
+        :param stack_depth: how many calls each lane can nest
+        :param seed: seed for the generator Cxkk draws from
+        """
+        width, height = display_size
+        if width < 1 or height < 1:
+            raise ValueError("Video memory dimensions must be at least 1px")
+        if width % 8:
+            raise ValueError("Batch screen width must be a multiple of 8")
+
+        self.num_lanes = num_lanes
+        self.display_size = display_size
+        self.display_wrap = display_wrap
+        self.execution_start = execution_start
+        self.digits_memory_location = digit_start
+
+        self.memory = np.zeros((num_lanes, memory_size), dtype=np.uint8)
+        self.v_registers = np.zeros((num_lanes, 16), dtype=np.uint8)
+        self.program_counter = np.full(
+            num_lanes, execution_start, dtype=np.int64)
+        self.i_register = np.zeros(num_lanes, dtype=np.int64)
+
+        self.call_stack = np.zeros((num_lanes, stack_depth), dtype=np.int64)
+        self.stack_size = np.zeros(num_lanes, dtype=np.int64)
+
+        self.delay_timer = np.zeros(num_lanes, dtype=np.int64)
+        self.sound_timer = np.zeros(num_lanes, dtype=np.int64)
+
+        self.keys = np.zeros((num_lanes, 16), dtype=bool)
+        self.waiting_for_key = np.zeros(num_lanes, dtype=bool)
+        self.waiting_register = np.zeros(num_lanes, dtype=np.int64)
+        # first key pressed while waiting, or NO_KEY
+        self._pressed_while_waiting = np.full(
+            num_lanes, NO_KEY, dtype=np.int64)
+
+        self.pixels = np.zeros(
+            (num_lanes, height, width // 8), dtype=np.uint8)
+
+        self.unhandled = np.zeros(num_lanes, dtype=bool)
+        self.faulted = np.zeros(num_lanes, dtype=bool)
+
+        self.ticks_per_frame = ticks_per_frame
+        self.frames_per_second = frames_per_second
+        self.ticks_per_second = ticks_per_frame * frames_per_second
+        self.cycle_count = 0
+
+        # every lane's timers advance together, so they share a phase.
+        # its value is unused, lanes keep theirs in the arrays above.
+        self._timer_phase = Timer(self.ticks_per_second)
+
+        self.random = np.random.default_rng(seed)
+
+        self._family_steps = (
+            self._step_iiii,
+            self._step_innn,
+            self._step_ixkk,
+            self._step_ixyi,
+            self._step_math,
+            self._step_ixyn,
+            self._step_ixii,
+        )
+
+        location = digit_start
+        for digit_data in DEFAULT_DIGITS:
+            self.load_to_memory(digit_data, location)
+            location += DIGIT_HEIGHT
+
+    def load_to_memory(self, data: Buffer, location: int) -> None:
+        """
+        Load the same data into every lane's memory.
+
+        Raises IndexError if the data would extend past the end of
+        memory.
+
+        :param data: a bytes-like object
+        :param location: where in memory to load to
+        """
+        if location < 0:
+            raise IndexError("Location must be 0 or greater")
+
+        loaded = np.frombuffer(memoryview(data), dtype=np.uint8)
+        end = location + len(loaded)
+        if end > self.memory.shape[1]:
+            raise IndexError("Passed data extends past the end of memory")
+
+        self.memory[:, location:end] = loaded
+
+    @property
+    def running(self) -> np.ndarray:
+        """
+        Which lanes will execute on the next step, as a bool array.
+        """
+        return ~(self.waiting_for_key | self.unhandled | self.faulted)
+
+    def press(self, key: int, lanes=slice(None)) -> None:
+        """
+        Press a key on some or all lanes.
+
+        :param key: the key to press
+        :param lanes: an index into the lane axis, all lanes by default
+        """
+        self.keys[lanes, key] = True
+
+        first_press = np.zeros(self.num_lanes, dtype=bool)
+        first_press[lanes] = True
+        first_press &= self.waiting_for_key
+        first_press &= self._pressed_while_waiting == NO_KEY
+        self._pressed_while_waiting[first_press] = key
+
+    def release(self, key: int, lanes=slice(None)) -> None:
+        """
+        Release a key on some or all lanes.
+
+        :param key: the key to release
+        :param lanes: an index into the lane axis, all lanes by default
+        """
+        self.keys[lanes, key] = False
+
+    def run_cycles(self, num_cycles: int) -> None:
+        """
+        Step every lane num_cycles times.
+
+        :param num_cycles: how many cycles to run
+        """
+        for _ in range(num_cycles):
+            self.step()
+
+    def step(self) -> None:
+        """
+        Run one cycle on every lane, like Chip8VirtualMachine.tick.
+        """
+        self.cycle_count += 1
+        self._advance_timers()
+
+        waiting = self.waiting_for_key
+        if waiting.any():
+            pressed = self._pressed_while_waiting
+            resolved = np.flatnonzero(waiting & (pressed != NO_KEY))
+            self.v_registers[
+                resolved, self.waiting_register[resolved]] = pressed[resolved]
+            waiting[resolved] = False
+            pressed[resolved] = NO_KEY
+
+        lanes = np.flatnonzero(self.running)
+        if not lanes.size:
+            return
+
+        pc = self.program_counter[lanes]
+        fetchable = pc + 1 < self.memory.shape[1]
+        if not fetchable.all():
+            self.faulted[lanes[~fetchable]] = True
+            lanes = lanes[fetchable]
+            pc = pc[fetchable]
+
+        memory = self.memory
+        raw = (memory[lanes, pc].astype(np.int64) << 8) | memory[lanes, pc + 1]
+        families = TYPE_NIBBLE_TO_FAMILY[raw >> 12]
+
+        for family, step_family in enumerate(self._family_steps):
+            selected = families == family
+            if selected.any():
+                step_family(lanes[selected], raw[selected])
+
+    def _advance_timers(self) -> None:
+        phase = self._timer_phase
+        decrements, phase.elapsed = divmod(
+            phase.elapsed + phase.hz_decrement_rate,
+            phase.cycles_per_second
+        )
+        if decrements:
+            for timer in (self.delay_timer, self.sound_timer):
+                np.maximum(timer - decrements, 0, out=timer)
+
+    def _advance(self, lanes: np.ndarray, condition=None) -> None:
+        """
+        Move lanes to the next instruction, or past it where condition.
+        """
+        step = INSTRUCTION_LENGTH
+        if condition is not None:
+            step = INSTRUCTION_LENGTH + INSTRUCTION_LENGTH * condition
+        self.program_counter[lanes] += step
+
+    def _step_iiii(self, lanes: np.ndarray, raw: np.ndarray) -> None:
+        # the hi byte is ignored, as the VM does
+        clear = (raw & 0xFF) == 0xE0
+        if clear.any():
+            cleared = lanes[clear]
+            self.pixels[cleared] = 0
+            self._advance(cleared)
+
+        stack_return = (raw & 0xFF) == 0xEE
+        if stack_return.any():
+            returning = lanes[stack_return]
+            empty = self.stack_size[returning] == 0
+            self.faulted[returning[empty]] = True
+
+            returning = returning[~empty]
+            self.stack_size[returning] -= 1
+            self.program_counter[returning] = self.call_stack[
+                returning, self.stack_size[returning]] + INSTRUCTION_LENGTH
+
+        self.unhandled[lanes[~(clear | stack_return)]] = True
+
+    def _step_innn(self, lanes: np.ndarray, raw: np.ndarray) -> None:
+        type_nibble = raw >> 12
+        nnn = raw & 0xFFF
+
+        jump = type_nibble == 0x1
+        self.program_counter[lanes[jump]] = nnn[jump]
+
+        call = type_nibble == 0x2
+        if call.any():
+            calling = lanes[call]
+            full = self.stack_size[calling] == self.call_stack.shape[1]
+            self.faulted[calling[full]] = True
+
+            room = ~full
+            calling = calling[room]
+            self.call_stack[calling, self.stack_size[calling]] = \
+                self.program_counter[calling]
+            self.stack_size[calling] += 1
+            self.program_counter[calling] = nnn[call][room]
+
+        set_i = type_nibble == 0xA
+        self.i_register[lanes[set_i]] = nnn[set_i]
+        self._advance(lanes[set_i])
+
+        jump_offset = type_nibble == 0xB
+        offset_lanes = lanes[jump_offset]
+        self.program_counter[offset_lanes] = \
+            nnn[jump_offset] + self.v_registers[offset_lanes, 0]
+
+    def _step_ixkk(self, lanes: np.ndarray, raw: np.ndarray) -> None:
+        type_nibble = raw >> 12
+        x = (raw >> 8) & 0xF
+        kk = raw & 0xFF
+        v = self.v_registers
+        vx = v[lanes, x].astype(np.int64)
+
+        skip = (type_nibble == 0x3) | (type_nibble == 0x4)
+        taken = (vx == kk) == (type_nibble == 0x3)
+        self._advance(lanes[skip], taken[skip])
+
+        load = type_nibble == 0x6
+        v[lanes[load], x[load]] = kk[load]
+
+        add = type_nibble == 0x7
+        v[lanes[add], x[add]] = (vx[add] + kk[add]) & 0xFF
+
+        random_and = type_nibble == 0xC
+        if random_and.any():
+            drawn = self.random.integers(0, 0xFF, random_and.sum())
+            v[lanes[random_and], x[random_and]] = drawn & kk[random_and]
+
+        self._advance(lanes[~skip])
+
+    def _step_ixyi(self, lanes: np.ndarray, raw: np.ndarray) -> None:
+        valid = (raw & 0xF) == 0
+        self.unhandled[lanes[~valid]] = True
+
+        lanes = lanes[valid]
+        raw = raw[valid]
+        v = self.v_registers
+        equal = v[lanes, (raw >> 8) & 0xF] == v[lanes, (raw >> 4) & 0xF]
+        self._advance(lanes, equal == ((raw >> 12) == 0x5))
+
+    def _step_math(self, lanes: np.ndarray, raw: np.ndarray) -> None:
+        lo_nibble = raw & 0xF
+        valid = (lo_nibble <= 0x7) | (lo_nibble == 0xE)
+        self.unhandled[lanes[~valid]] = True
+
+        lanes = lanes[valid]
+        raw = raw[valid]
+        lo_nibble = lo_nibble[valid]
+
+        v = self.v_registers
+        x = (raw >> 8) & 0xF
+        vx = v[lanes, x].astype(np.int64)
+        vy = v[lanes, (raw >> 4) & 0xF].astype(np.int64)
+
+        result = np.empty_like(vx)
+        flag = np.full_like(vx, KEEP_VF)
+
+        for op, value in (
+            (0x0, vy),
+            (0x1, vx | vy),
+            (0x2, vx & vy),
+            (0x3, vx ^ vy),
+        ):
+            chosen = lo_nibble == op
+            result[chosen] = value[chosen]
+
+        chosen = lo_nibble == 0x4
+        total = vx + vy
+        result[chosen] = total[chosen] & 0xFF
+        flag[chosen] = total[chosen] > 0xFF
+
+        # subtraction clamps at 0 rather than wrapping, as in the VM
+        for op, diff in ((0x5, vx - vy), (0x7, vy - vx)):
+            chosen = lo_nibble == op
+            result[chosen] = np.maximum(diff[chosen], 0)
+            flag[chosen] = diff[chosen] >= 0
+
+        chosen = lo_nibble == 0x6
+        result[chosen] = vy[chosen] >> 1
+        flag[chosen] = vy[chosen] & 1
+
+        chosen = lo_nibble == 0xE
+        result[chosen] = (vy[chosen] << 1) & 0xFF
+        flag[chosen] = vy[chosen] >> 7
+
+        # Vx is written before VF, so VF wins when x is F
+        v[lanes, x] = result
+        sets_flag = flag != KEEP_VF
+        v[lanes[sets_flag], 0xF] = flag[sets_flag]
+
+        self._advance(lanes)
+
+    def _step_ixyn(self, lanes: np.ndarray, raw: np.ndarray) -> None:
+        v = self.v_registers
+        pixels = self.pixels
+        memory_size = self.memory.shape[1]
+        _, height, columns = pixels.shape
+        width = columns * 8
+
+        x = v[lanes, (raw >> 8) & 0xF].astype(np.int64)
+        y = v[lanes, (raw >> 4) & 0xF].astype(np.int64)
+        n = raw & 0xF
+        i = self.i_register[lanes]
+
+        # n of 0 draws the rest of memory, and reading past the end of
+        # memory faults after drawing the rows that were there
+        available = np.maximum(memory_size - i, 0)
+        rows = np.where(n == 0, available, np.minimum(n, available))
+        faults = (n != 0) & (n > available)
+
+        if self.display_wrap:
+            x %= width
+        else:
+            # rows below the screen would be clipped anyway
+            rows = np.minimum(rows, np.maximum(height - y, 0))
+
+        column = x // 8
+        shift = x % 8
+        right_column = column + 1
+        if self.display_wrap:
+            right_column %= columns
+
+        collided = np.zeros(len(lanes), dtype=bool)
+
+        for row in range(int(rows.max(initial=0))):
+            drawing = np.flatnonzero(row < rows)
+            drawing_lanes = lanes[drawing]
+            sprite_byte = self.memory[
+                drawing_lanes, i[drawing] + row].astype(np.int64)
+
+            screen_y = y[drawing] + row
+            if self.display_wrap:
+                screen_y %= height
+
+            halves = (
+                (column[drawing], sprite_byte >> shift[drawing]),
+                (
+                    right_column[drawing],
+                    (sprite_byte << (8 - shift[drawing])) & 0xFF
+                ),
+            )
+            for half_column, bits in halves:
+                visible = (half_column < columns) & (bits != 0)
+                target = (
+                    drawing_lanes[visible],
+                    screen_y[visible],
+                    half_column[visible]
+                )
+                old = pixels[target]
+                collided[drawing[visible]] |= (old & bits[visible]) != 0
+                pixels[target] = old ^ bits[visible]
+
+        self.faulted[lanes[faults]] = True
+        finished = ~faults
+        v[lanes[finished], 0xF] = collided[finished]
+        self._advance(lanes[finished])
+
+    def _step_ixii(self, lanes: np.ndarray, raw: np.ndarray) -> None:
+        v = self.v_registers
+        memory = self.memory
+        memory_size = memory.shape[1]
+        x = (raw >> 8) & 0xF
+        pattern = raw & 0xF0FF
+        handled = np.zeros(len(lanes), dtype=bool)
+
+        def select(instruction: int):
+            chosen = pattern == instruction
+            handled[chosen] = True
+            return chosen
+
+        for instruction, skip_when_down in ((0xE09E, True), (0xE0A1, False)):
+            chosen = select(instruction)
+            if chosen.any():
+                key = v[lanes[chosen], x[chosen]].astype(np.int64)
+                # the VM's key list raises IndexError past key F
+                valid = key < 16
+                self.faulted[lanes[chosen][~valid]] = True
+
+                skipping = lanes[chosen][valid]
+                down = self.keys[skipping, key[valid]]
+                self._advance(skipping, down == skip_when_down)
+
+        chosen = select(0xF007)
+        v[lanes[chosen], x[chosen]] = self.delay_timer[lanes[chosen]]
+
+        chosen = select(0xF00A)
+        if chosen.any():
+            key_lanes = lanes[chosen]
+            held = self.keys[key_lanes]
+            any_held = held.any(axis=1)
+
+            v[key_lanes[any_held], x[chosen][any_held]] = \
+                held[any_held].argmax(axis=1)
+
+            waiting = key_lanes[~any_held]
+            self.waiting_for_key[waiting] = True
+            self.waiting_register[waiting] = x[chosen][~any_held]
+            self._pressed_while_waiting[waiting] = NO_KEY
+
+        chosen = select(0xF015)
+        self.delay_timer[lanes[chosen]] = v[lanes[chosen], x[chosen]]
+
+        chosen = select(0xF018)
+        self.sound_timer[lanes[chosen]] = v[lanes[chosen], x[chosen]]
+
+        chosen = select(0xF01E)
+        self.i_register[lanes[chosen]] += v[lanes[chosen], x[chosen]]
+
+        chosen = select(0xF029)
+        self.i_register[lanes[chosen]] = self.digits_memory_location + \
+            v[lanes[chosen], x[chosen]].astype(np.int64) * DIGIT_HEIGHT
+
+        faults = np.zeros(len(lanes), dtype=bool)
+
+        chosen = select(0xF033)
+        if chosen.any():
+            bcd_lanes = lanes[chosen]
+            value = v[bcd_lanes, x[chosen]].astype(np.int64)
+            i = self.i_register[bcd_lanes]
+            digits = (value // 100, (value // 10) % 10, value % 10)
+            for offset, digit in enumerate(digits):
+                fits = i + offset < memory_size
+                memory[bcd_lanes[fits], i[fits] + offset] = digit[fits]
+            faults[chosen] = i + 2 >= memory_size
+
+        for instruction in (0xF055, 0xF065):
+            chosen = select(instruction)
+            if not chosen.any():
+                continue
+
+            bulk_lanes = lanes[chosen]
+            last = x[chosen]
+            i = self.i_register[bulk_lanes]
+            # copies stop at the end of memory, then fault
+            for register in range(16):
+                copying = (register <= last) & (i + register < memory_size)
+                if not copying.any():
+                    break
+                copy_lanes = bulk_lanes[copying]
+                address = i[copying] + register
+                if instruction == 0xF055:
+                    memory[copy_lanes, address] = v[copy_lanes, register]
+                else:
+                    v[copy_lanes, register] = memory[copy_lanes, address]
+            faults[chosen] = i + last >= memory_size
+
+        self.faulted[lanes[faults]] = True
+        self.unhandled[lanes[~handled]] = True
+
+        # skips already moved their lanes
+        moves = handled & ~faults & (raw >> 12 == 0xF)
+        self._advance(lanes[moves])
+
+    def framebuffer(self, lane: int) -> bytes:
+        """
+        Return a lane's screen packed like VideoRam.pixels.tobytes().
+
+        :param lane: which lane to read
+        :return: the packed rows of the screen
+        """
+        return self.pixels[lane].tobytes()
+
+    def to_vm(
+            self,
+            lane: int,
+            execution_mode: ExecutionMode = ExecutionMode.INTERPRET
+    ) -> Chip8VirtualMachine:
+        """
+        Build a Chip8VirtualMachine with a copy of a lane's state.
+
+        Useful for inspecting a lane with the usual tools, or carrying
+        on with one interesting lane alone.
+
+        :param lane: which lane to copy
+        :param execution_mode: the mode of the new VM
+        :return: a new VM
+        """
+        vm = Chip8VirtualMachine(
+            display_size=self.display_size,
+            display_wrap=self.display_wrap,
+            memory_size=self.memory.shape[1],
+            execution_start=self.execution_start,
+            digit_start=self.digits_memory_location,
+            ticks_per_frame=self.ticks_per_frame,
+            frames_per_second=self.frames_per_second,
+            execution_mode=execution_mode
+        )
+        vm.load_to_memory(self.memory[lane].tobytes(), 0)
+
+        vm.v_registers[:] = self.v_registers[lane].tobytes()
+        vm.program_counter = int(self.program_counter[lane])
+        vm.i_register = int(self.i_register[lane])
+        vm.call_stack = [
+            int(address) for address
+            in self.call_stack[lane, :self.stack_size[lane]]
+        ]
+
+        for timer, values in (
+            (vm._delay_timer, self.delay_timer),
+            (vm._sound_timer, self.sound_timer)
+        ):
+            timer.value = int(values[lane])
+            timer.elapsed = self._timer_phase.elapsed
+
+        for key, down in enumerate(self.keys[lane]):
+            if down:
+                vm.press(key)
+
+        if self.waiting_for_key[lane]:
+            vm.waiting_for_key = True
+            vm.waiting_register = int(self.waiting_register[lane])
+            pressed = int(self._pressed_while_waiting[lane])
+            if pressed != NO_KEY:
+                vm._key_events.append(pressed)
+
+        vm.video_ram.load_pixels(self.framebuffer(lane))
+
+        vm.cycle_count = self.cycle_count
+        vm.instruction_unhandled = bool(self.unhandled[lane])
+        return vm
@@ -7,6 +7,12 @@ they use to store information:
 PATTERN_IIII
     00EE - CLR, turn all pixels off
     00E0 - return from subroutine. jump to last address on stack and pop stack
+    00Cn - (SUPER-CHIP) scroll the screen down n lines
+    00FB - (SUPER-CHIP) scroll the screen right 4 pixels
+    00FC - (SUPER-CHIP) scroll the screen left 4 pixels
+    00FE - (SUPER-CHIP) switch to low resolution
+    00FF - (SUPER-CHIP) switch to high resolution
+    00Dn - (XO-CHIP) scroll the screen up n lines
 
 PATTERN_INNN
     1nnn - JP addr : set execution pointer to nnn
@@ -16,6 +22,10 @@ PATTERN_INNN
     Bnnn - JP v0, addr : Jump to location nnn + V0.
 
 PATTERN_IXII
+    F000 - (XO-CHIP) LD I, NNNN - Set I to the 16-bit address in the next
+           two bytes. The only 4 byte instruction, so skips step over it
+           whole.
+    Fn01 - (XO-CHIP) PLANE n - Select the bitplanes in mask n for drawing.
     Ex9E - Skip next instruction if key with the value of Vx is pressed.
     ExA1 - SKNP Vx - Skip next instruction if key with value of VX ISN'T
            pressed.
@@ -26,6 +36,7 @@ PATTERN_IXII
     Fx1E - ADD I, Vx - Set I = I + Vx. The values of I and Vx are added, and
            the results are stored in I.
     Fx29 - LD F, Vx - Set I = location of sprite for digit Vx.
+    Fx30 - (SUPER-CHIP) LD HF, Vx - Set I = location of large digit Vx.
     Fx33 - LD B, Vx - Store BCD of Vx at I, I + 1, I + 2
     Fx55 - LD [I], Vx - Store V0 through Vx  to mem, starting at I
     Fx65 - LD Vx, [I] - Read mem into V0-VX, starting at I
@@ -39,6 +50,8 @@ PATTERN_IXKK
 
 PATTERN_IXYI
     5xy0 - Skip next instruction if Vx ==Vy
+    5xy2 - (XO-CHIP) Save Vx through Vy to memory at I, in either order
+    5xy3 - (XO-CHIP) Load Vx through Vy from memory at I, in either order
     8xy0 - Set Vx = Vy
     8xy1 - Set Vx = Vx OR Vy.
     8xy2 - Set Vx = Vx AND Vy.
@@ -55,13 +68,24 @@ PATTERN_IXYI
 
 PATTERN_IXYN
     Dxyn - DRW Vx, Vy, nibble - draw sprite to ram
+    Dxy0 - (SUPER-CHIP) draw a 16x16 sprite, or 8x16 in low resolution
 
 """
-from typing import Iterable, Dict, ByteString, Any, Union
+import functools
+from typing import Iterable, Dict, ByteString, Any, Union, NamedTuple, Tuple
 
 #
 from eightdad.core.util import ValidateInt
 
+INSTRUCTION_LENGTH = 2  # 2 bytes, 16 bits
+
+# XO-CHIP's F000 NNNN is followed by a 16-bit address
+LONG_INSTRUCTION = b"\xF0\x00"
+LONG_INSTRUCTION_LENGTH = 2 * INSTRUCTION_LENGTH
+
+# how far back a delay timer spin loop's jump goes: Fx07, 3x00, 1nnn
+IDLE_LOOP_OFFSET = 2 * INSTRUCTION_LENGTH
+
 USES_NNN = 0x1
 USES_X = 0x2
 USES_Y = 0x4
@@ -135,6 +159,37 @@ register_patterns_for_nibbles(PATTERN_IXYN, (0xD,))
 register_patterns_for_nibbles(PATTERN_INNN, (0x1, 0x2, 0xA, 0xB))
 
 
+"""
+Names of the Chip8VirtualMachine methods that execute each type nibble.
+
+Stored as names rather than functions so the table stays independent of
+any particular VM instance. VMs bind them to themselves once on creation.
+"""
+FIRST_NIBBLE_TO_HANDLER = {}
+
+register_handler_for_nibbles =\
+    build_pattern_registrar(FIRST_NIBBLE_TO_HANDLER)
+
+register_handler_for_nibbles("_handle_iiii", (0x0,))
+register_handler_for_nibbles("_handle_innn", (0x1, 0x2, 0xA, 0xB))
+register_handler_for_nibbles("handle_ixkk", (0x3, 0x4, 0x6, 0x7, 0xC))
+register_handler_for_nibbles("_handle_ixyi", (0x5, 0x9))
+register_handler_for_nibbles("_handle_math", (0x8,))
+register_handler_for_nibbles("_handle_ixyn", (0xD,))
+register_handler_for_nibbles("handle_ixii", IXII_INSTRUCTIONS)
+
+
+def is_long_instruction(memory: ByteString, address: int) -> bool:
+    """
+    Return whether an XO-CHIP F000 NNNN starts at address.
+
+    :param memory: the memory to check
+    :param address: where the instruction starts
+    :return: True if it's 4 bytes long rather than 2
+    """
+    return memory[address:address + INSTRUCTION_LENGTH] == LONG_INSTRUCTION
+
+
 class InvalidInstructionException(Exception):
     pass
 
@@ -310,3 +365,67 @@ class Chip8Instruction:
         self._lo_byte |= value
 
         self._n = value
+
+
+class DecodedInstruction(NamedTuple):
+    """
+    Immutable, fully decoded form of a single 16-bit instruction.
+
+    Unlike Chip8Instruction, every field is precomputed regardless of
+    the pattern, so reading one is a plain tuple access with no checks.
+    Fields a pattern doesn't use still hold whatever the nibbles contain.
+
+    The field names match Chip8Instruction's so code reading decoded
+    values works with either.
+    """
+    raw: int
+    pattern: int
+    type_nibble: int
+    hi_byte: int
+    lo_byte: int
+    x: int
+    y: int
+    n: int
+    kk: int
+    nnn: int
+    handler: str
+
+
+def decode_raw(raw: int) -> DecodedInstruction:
+    """
+    Decode a raw 16-bit instruction into a DecodedInstruction.
+
+    :param raw: the instruction as a big endian int
+    :return: a DecodedInstruction for it
+    """
+    hi_byte = raw >> 8
+    lo_byte = raw & 0xFF
+    type_nibble = hi_byte >> 4
+
+    return DecodedInstruction(
+        raw,
+        FIRST_NIBBLE_TO_PATTERN[type_nibble],
+        type_nibble,
+        hi_byte,
+        lo_byte,
+        hi_byte & 0xF,
+        lo_byte >> 4,
+        lo_byte & 0xF,
+        lo_byte,
+        raw & 0xFFF,
+        FIRST_NIBBLE_TO_HANDLER[type_nibble]
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_decode_table() -> Tuple[DecodedInstruction, ...]:
+    """
+    Return a table of every possible instruction, indexed by raw value.
+
+    The table is built on first use and shared afterward. Building it
+    takes a noticeable fraction of a second, but it turns decoding into
+    a single tuple index per executed instruction.
+
+    :return: a 65536-entry tuple of DecodedInstruction objects
+    """
+    return tuple(decode_raw(raw) for raw in range(0x10000))
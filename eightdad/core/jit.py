@@ -0,0 +1,530 @@
+"""
+Basic-block compiler turning Chip-8 code into Python functions
+
+A block is a run of straight-line instructions starting at one address.
+It ends after the first jump, call, return, skip or memory write, or
+just before an instruction the compiler leaves to the interpreter.
+
+Each block becomes the source of one Python function holding registers
+in locals. The function is built with compile() and cached by address
+and the bytes it was built from.
+
+If an instruction raises, the block stores its registers and leaves the
+program counter on that instruction, as the interpreter would. Only
+instructions which can raise update the block's program counter as they
+go, so the rest cost nothing extra.
+
+Timers must look the same to a block as they would to the interpreter.
+Blocks therefore only touch timers in their first instruction, which
+lets callers advance timers once per block instead of once per
+instruction.
+
+"""
+from random import randrange
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from typing import TYPE_CHECKING
+
+from eightdad.core.bytecode import (
+    DecodedInstruction,
+    IDLE_LOOP_OFFSET,
+    INSTRUCTION_LENGTH,
+    LONG_INSTRUCTION_LENGTH,
+    is_long_instruction
+)
+
+if TYPE_CHECKING:
+    from eightdad.core.vm import Chip8VirtualMachine
+
+
+MAX_BLOCK_INSTRUCTIONS = 64
+
+# How many compiled functions to keep for blocks no longer in memory
+MAX_CACHED_FUNCTIONS = 4096
+
+PAGE_SHIFT = 8
+
+# Instructions only allowed to start a block, see module docstring
+TIMER_INSTRUCTIONS = {0xF007, 0xF015, 0xF018}
+
+BlockFunction = Callable[["Chip8VirtualMachine"], None]
+
+
+class CompiledBlock(NamedTuple):
+    start: int
+    end: int
+    length: int
+    run: BlockFunction
+    source: str
+
+
+class _BlockBuilder:
+    """
+    Accumulates generated source for a single block.
+    """
+
+    def __init__(
+            self,
+            super_chip: bool = False,
+            xo_chip: bool = False,
+            memory: bytes = b""
+    ):
+        # whether SUPER-CHIP and XO-CHIP instructions may be emitted
+        self.super_chip = super_chip or xo_chip
+        self.xo_chip = xo_chip
+        # XO-CHIP skips check what follow them for F000 NNNN
+        self.memory = memory
+        self.body: List[str] = []
+        self.read: Set[int] = set()
+        self.written: Set[int] = set()
+        self.reads_i = False
+        self.writes_i = False
+        self.written_range: Optional[str] = None
+        self.next_pc: Optional[str] = None
+
+    def v(self, register: int, write: bool = False) -> str:
+        if write:
+            self.written.add(register)
+        else:
+            self.read.add(register)
+        return f"v{register:X}"
+
+    def i(self, write: bool = False) -> str:
+        if write:
+            self.writes_i = True
+        else:
+            self.reads_i = True
+        return "i"
+
+    def emit(self, line: str) -> None:
+        self.body.append(line)
+
+    def may_raise(self, address: int) -> None:
+        """
+        Note that the instruction at address can raise, such as by
+        reading past the end of memory.
+        """
+        self.emit(f"pc = {address}")
+
+
+# runs a statement on plane for each selected video plane
+EACH_PLANE = "for plane in vm._selected_video_planes: {}"
+
+SUPER_CHIP_IIII = {
+    0xFB: EACH_PLANE.format("plane.scroll_right(4)"),
+    0xFC: EACH_PLANE.format("plane.scroll_left(4)"),
+    0xFE: "vm.set_high_resolution(False)",
+    0xFF: "vm.set_high_resolution(True)",
+}
+
+
+def _emit_iiii(b: _BlockBuilder, address: int, ins: DecodedInstruction):
+    if ins.lo_byte == 0xE0 and b.xo_chip:
+        b.emit(EACH_PLANE.format("plane.clear_screen()"))
+        return True
+
+    if ins.lo_byte == 0xE0:
+        b.emit("vm.video_ram.clear_screen()")
+        return True
+
+    if ins.lo_byte == 0xEE:
+        b.may_raise(address)
+        b.next_pc = f"vm.call_stack.pop() + {INSTRUCTION_LENGTH}"
+        return True
+
+    if b.super_chip:
+        if ins.lo_byte & 0xF0 == 0xC0:
+            statement = EACH_PLANE.format(f"plane.scroll_down({ins.n})")
+        elif ins.lo_byte & 0xF0 == 0xD0 and b.xo_chip:
+            statement = EACH_PLANE.format(f"plane.scroll_up({ins.n})")
+        else:
+            statement = SUPER_CHIP_IIII.get(ins.lo_byte)
+
+        if statement is not None:
+            b.emit(statement)
+            return True
+
+    return False
+
+
+def _emit_innn(b: _BlockBuilder, address: int, ins: DecodedInstruction):
+    type_nibble = ins.type_nibble
+    nnn = ins.nnn
+
+    if type_nibble == 0x1:
+        if nnn == address or nnn == address - IDLE_LOOP_OFFSET:
+            b.emit(f"vm._idle_jump = {address}")
+        b.next_pc = f"{nnn}"
+
+    elif type_nibble == 0x2:
+        b.emit(f"vm.call_stack.append({address})")
+        b.next_pc = f"{nnn}"
+
+    elif type_nibble == 0xA:
+        b.emit(f"{b.i(write=True)} = {nnn}")
+
+    else:  # Bnnn
+        b.next_pc = f"{nnn} + {b.v(0)}"
+
+    return True
+
+
+def _skip_to(b: _BlockBuilder, address: int, condition: str) -> str:
+    next_pc = address + INSTRUCTION_LENGTH
+    if b.xo_chip and is_long_instruction(b.memory, next_pc):
+        skip_pc = next_pc + LONG_INSTRUCTION_LENGTH
+    else:
+        skip_pc = next_pc + INSTRUCTION_LENGTH
+    return f"{skip_pc} if {condition} else {next_pc}"
+
+
+def _emit_ixkk(b: _BlockBuilder, address: int, ins: DecodedInstruction):
+    type_nibble = ins.type_nibble
+    x = ins.x
+    kk = ins.kk
+
+    if type_nibble == 0x3:
+        b.next_pc = _skip_to(b, address, f"{b.v(x)} == {kk}")
+
+    elif type_nibble == 0x4:
+        b.next_pc = _skip_to(b, address, f"{b.v(x)} != {kk}")
+
+    elif type_nibble == 0x6:
+        b.emit(f"{b.v(x, write=True)} = {kk}")
+
+    elif type_nibble == 0x7:
+        b.emit(f"{b.v(x, write=True)} = ({b.v(x)} + {kk}) & 0xFF")
+
+    else:  # Cxkk
+        b.emit(f"{b.v(x, write=True)} = randrange(0, 0xFF) & {kk}")
+
+    return True
+
+
+def _emit_ixyi(b: _BlockBuilder, address: int, ins: DecodedInstruction):
+    if ins.n != 0:
+        return False
+
+    operator = "==" if ins.type_nibble == 0x5 else "!="
+    b.next_pc = _skip_to(b, address, f"{b.v(ins.x)} {operator} {b.v(ins.y)}")
+    return True
+
+
+MATH_TEMPLATES = {
+    0x0: ("{out} = {vy}",),
+    0x1: ("{out} = {vx} | {vy}",),
+    0x2: ("{out} = {vx} & {vy}",),
+    0x3: ("{out} = {vx} ^ {vy}",),
+    # VF is always written last, x and y may both be F
+    0x4: ("t = {vx} + {vy}", "{out} = t & 0xFF", "{vf} = int(t > 255)"),
+    0x5: ("t = {vx} - {vy}", "{out} = max(t, 0)", "{vf} = int(t >= 0)"),
+    0x6: ("t = {vy}", "{out} = t >> 1", "{vf} = t & 1"),
+    0x7: ("t = {vy} - {vx}", "{out} = max(t, 0)", "{vf} = int(t >= 0)"),
+    0xE: ("t = {vy}", "{out} = (t << 1) & 0xFF", "{vf} = (t >> 7) & 1"),
+}
+
+
+def _emit_math(b: _BlockBuilder, address: int, ins: DecodedInstruction):
+    templates = MATH_TEMPLATES.get(ins.n)
+    if templates is None:
+        return False
+
+    names = dict(
+        vx=b.v(ins.x),
+        vy=b.v(ins.y),
+        out=b.v(ins.x, write=True)
+    )
+    if len(templates) > 1:
+        names["vf"] = b.v(0xF, write=True)
+
+    for template in templates:
+        b.emit(template.format(**names))
+
+    return True
+
+
+def _emit_ixyn(b: _BlockBuilder, address: int, ins: DecodedInstruction):
+    b.may_raise(address)
+
+    if b.xo_chip:
+        b.emit(
+            f"{b.v(0xF, write=True)} = int(vm.draw_plane_sprite("
+            f"{b.v(ins.x)}, {b.v(ins.y)}, {ins.n}, {b.i()}))"
+        )
+        return True
+
+    if ins.n == 0 and b.super_chip:
+        b.emit(
+            f"{b.v(0xF, write=True)} = int(vm.draw_large_sprite("
+            f"{b.v(ins.x)}, {b.v(ins.y)}, {b.i()}))"
+        )
+        return True
+
+    b.emit(
+        f"{b.v(0xF, write=True)} = int(vm.video_ram.draw_sprite("
+        f"{b.v(ins.x)}, {b.v(ins.y)}, memory,"
+        f" num_bytes={ins.n}, offset={b.i()}))"
+    )
+    return True
+
+
+def _emit_ixii(b: _BlockBuilder, address: int, ins: DecodedInstruction):
+    x = ins.x
+    lo_byte = ins.lo_byte
+
+    if ins.type_nibble == 0xE:
+        if lo_byte == 0x9E:
+            condition = f"vm._keystates[{b.v(x)}]"
+        elif lo_byte == 0xA1:
+            condition = f"not vm._keystates[{b.v(x)}]"
+        else:
+            return False
+
+        # Vx may be past the last key
+        b.may_raise(address)
+        b.next_pc = _skip_to(b, address, condition)
+        return True
+
+    if lo_byte == 0x01 and b.xo_chip:
+        b.emit(f"vm.select_planes({x})")
+
+    elif lo_byte == 0x07:
+        b.emit(f"{b.v(x, write=True)} = vm._delay_timer.value")
+
+    elif lo_byte == 0x15:
+        b.emit(f"vm._delay_timer.value = {b.v(x)}")
+
+    elif lo_byte == 0x18:
+        b.emit(f"vm._sound_timer.value = {b.v(x)}")
+
+    elif lo_byte == 0x1E:
+        b.emit(f"{b.i(write=True)} = {b.i()} + {b.v(x)}")
+
+    elif lo_byte == 0x29:
+        b.emit(
+            f"{b.i(write=True)} = vm.digits_memory_location"
+            f" + {b.v(x)} * 5"
+        )
+
+    elif lo_byte == 0x30 and b.super_chip:
+        b.emit(
+            f"{b.i(write=True)} = vm.large_digits_memory_location"
+            f" + {b.v(x)} * 10"
+        )
+
+    elif lo_byte == 0x33:
+        b.may_raise(address)
+        i = b.i()
+        b.emit(f"memory[{i}] = {b.v(x)} // 100")
+        b.emit(f"memory[{i} + 1] = {b.v(x)} // 10 % 10")
+        b.emit(f"memory[{i} + 2] = {b.v(x)} % 10")
+        b.written_range = f"{i}, {i} + 3"
+        b.next_pc = f"{address + INSTRUCTION_LENGTH}"
+
+    elif lo_byte == 0x55:
+        b.may_raise(address)
+        i = b.i()
+        for register in range(x + 1):
+            b.emit(f"memory[{i} + {register}] = {b.v(register)}")
+        b.written_range = f"{i}, {i} + {x + 1}"
+        b.next_pc = f"{address + INSTRUCTION_LENGTH}"
+
+    elif lo_byte == 0x65:
+        b.may_raise(address)
+        i = b.i()
+        for register in range(x + 1):
+            b.emit(f"{b.v(register, write=True)} = memory[{i} + {register}]")
+
+    else:
+        # Fx0A, F000 NNNN and anything unknown is left to the interpreter
+        return False
+
+    return True
+
+
+TYPE_NIBBLE_TO_EMITTER = {
+    0x0: _emit_iiii,
+    0x1: _emit_innn,
+    0x2: _emit_innn,
+    0x3: _emit_ixkk,
+    0x4: _emit_ixkk,
+    0x5: _emit_ixyi,
+    0x6: _emit_ixkk,
+    0x7: _emit_ixkk,
+    0x8: _emit_math,
+    0x9: _emit_ixyi,
+    0xA: _emit_innn,
+    0xB: _emit_innn,
+    0xC: _emit_ixkk,
+    0xD: _emit_ixyn,
+    0xE: _emit_ixii,
+    0xF: _emit_ixii,
+}
+
+
+def _finish_source(b: _BlockBuilder, start: int, end_pc: int) -> str:
+    """
+    Wrap emitted lines in a function with register loads and stores.
+    """
+    lines = [f"def block_{start:03X}(vm):"]
+
+    # written registers are loaded too in case the write is conditional
+    used = b.read | b.written
+
+    lines.append("    memory = vm.memory")
+    if used:
+        lines.append("    registers = vm.v_registers")
+    for register in sorted(used):
+        lines.append(f"    v{register:X} = registers[{register}]")
+    if b.reads_i or b.writes_i:
+        lines.append("    i = vm.i_register")
+
+    # stores happen even if an instruction raises, leaving the
+    # program counter on it
+    lines.append(f"    pc = {start}")
+    lines.append("    try:")
+    lines.extend(f"        {line}" for line in b.body)
+    lines.append(f"        pc = {b.next_pc or end_pc}")
+    lines.append("    finally:")
+
+    for register in sorted(b.written):
+        lines.append(f"        registers[{register}] = v{register:X}")
+    if b.writes_i:
+        lines.append("        vm.i_register = i")
+    lines.append("        vm.program_counter = pc")
+
+    if b.written_range:
+        lines.append(f"    vm._memory_written({b.written_range})")
+
+    return "\n".join(lines) + "\n"
+
+
+class BlockCompiler:
+    """
+    Finds, compiles and caches blocks for a single VM.
+    """
+
+    def __init__(
+        self,
+        vm: "Chip8VirtualMachine",
+        max_block_instructions: int = MAX_BLOCK_INSTRUCTIONS
+    ):
+        self.vm = vm
+        self.max_block_instructions = max_block_instructions
+
+        # blocks currently valid in memory, by start address
+        self._blocks: Dict[int, CompiledBlock] = {}
+        # start addresses of blocks overlapping each page
+        self._pages: Dict[int, Set[int]] = {}
+        # functions by (start address, code bytes), outliving invalidation
+        self._functions: Dict[Tuple[int, bytes], Tuple[BlockFunction, str]] = {}
+
+    def lookup(self, address: int) -> Optional[CompiledBlock]:
+        """
+        Return the block starting at address, compiling it if needed.
+
+        :param address: where the block starts
+        :return: the block, or None if the first instruction there
+                 has to be interpreted.
+        """
+        block = self._blocks.get(address)
+        if block is None:
+            block = self.compile(address)
+        return block
+
+    def compile(self, address: int) -> Optional[CompiledBlock]:
+        """
+        Compile and register the block starting at address.
+
+        :param address: where the block starts
+        :return: the block, or None if nothing there can be compiled
+        """
+        vm = self.vm
+        memory = vm.memory
+        decode_table = vm._decode_table
+        last_address = len(memory) - INSTRUCTION_LENGTH
+
+        builder = _BlockBuilder(vm.super_chip, vm.xo_chip, memory)
+        length = 0
+        pc = address
+
+        while length < self.max_block_instructions and pc <= last_address:
+            instruction = decode_table[(memory[pc] << 8) | memory[pc + 1]]
+
+            if length and instruction.raw & 0xF0FF in TIMER_INSTRUCTIONS:
+                break
+
+            emitter = TYPE_NIBBLE_TO_EMITTER[instruction.type_nibble]
+            if not emitter(builder, pc, instruction):
+                break
+
+            length += 1
+            pc += INSTRUCTION_LENGTH
+
+            if builder.next_pc is not None:
+                break
+
+        if not length:
+            return None
+
+        # an XO-CHIP skip ending the block depends on what follows it
+        key_end = pc + INSTRUCTION_LENGTH if vm.xo_chip else pc
+        key = (address, bytes(memory[address:key_end]))
+        cached = self._functions.get(key)
+
+        if cached is None:
+            source = _finish_source(builder, address, pc)
+            namespace = {"randrange": randrange}
+            exec(compile(source, f"<chip-8 block 0x{address:03X}>", "exec"),
+                 namespace)
+
+            if len(self._functions) >= MAX_CACHED_FUNCTIONS:
+                self._functions.clear()
+            cached = self._functions[key] = (
+                namespace[f"block_{address:03X}"], source)
+
+        function, source = cached
+        block = CompiledBlock(address, pc, length, function, source)
+
+        self._blocks[address] = block
+        for page in range(address >> PAGE_SHIFT, ((pc - 1) >> PAGE_SHIFT) + 1):
+            self._pages.setdefault(page, set()).add(address)
+
+        return block
+
+    def invalidate(self, start: int, end: int) -> None:
+        """
+        Drop every block overlapping memory in [start, end).
+
+        :param start: the first address written
+        :param end: one past the last address written
+        """
+        if start >= end:
+            return
+
+        blocks = self._blocks
+        pages = self._pages
+
+        for page in range(start >> PAGE_SHIFT, ((end - 1) >> PAGE_SHIFT) + 1):
+            starts = pages.get(page)
+            if not starts:
+                continue
+
+            for block_start in tuple(starts):
+                block = blocks[block_start]
+                if block.start < end and start < block.end:
+                    self._drop(block)
+
+    def _drop(self, block: CompiledBlock) -> None:
+        del self._blocks[block.start]
+        first_page = block.start >> PAGE_SHIFT
+        last_page = (block.end - 1) >> PAGE_SHIFT
+        for page in range(first_page, last_page + 1):
+            self._pages[page].discard(block.start)
+
+    def clear(self) -> None:
+        """
+        Forget every compiled block and cached function.
+        """
+        self._blocks.clear()
+        self._pages.clear()
+        self._functions.clear()
@@ -0,0 +1,426 @@
+"""
+Builders for pre-decoded instruction closures
+
+Each closure is specialized for one instruction at one address. Operands
+and the address of the following instruction are captured when the
+closure is built, so running it is a single call with no decoding.
+
+Instructions without a builder here fall back to the VM's interpreter.
+That keeps memory writes, key waits and unhandled instruction errors in
+one place, Chip8VirtualMachine.execute_instruction.
+
+"""
+from random import randrange
+from typing import Callable, Dict, Optional, TYPE_CHECKING
+
+from eightdad.core.bytecode import (
+    DecodedInstruction,
+    IDLE_LOOP_OFFSET,
+    INSTRUCTION_LENGTH,
+    LONG_INSTRUCTION_LENGTH,
+    is_long_instruction
+)
+
+if TYPE_CHECKING:
+    from eightdad.core.vm import Chip8VirtualMachine
+
+
+Step = Callable[[], None]
+StepBuilder = Callable[
+    ["Chip8VirtualMachine", int, DecodedInstruction],
+    Optional[Step]
+]
+
+
+def _skip_pc(vm, next_pc: int) -> int:
+    """
+    Where a skip taken before next_pc lands, stepping over F000 NNNN.
+    """
+    if vm.xo_chip and is_long_instruction(vm.memory, next_pc):
+        return next_pc + LONG_INSTRUCTION_LENGTH
+    return next_pc + INSTRUCTION_LENGTH
+
+
+def _build_iiii(vm, address: int, instruction: DecodedInstruction):
+    next_pc = address + INSTRUCTION_LENGTH
+
+    if instruction.lo_byte == 0xE0 and vm.xo_chip:
+        def clear_planes():
+            for plane in vm._selected_video_planes:
+                plane.clear_screen()
+            vm.program_counter = next_pc
+        return clear_planes
+
+    if instruction.lo_byte == 0xE0:
+        def clear_screen():
+            vm.video_ram.clear_screen()
+            vm.program_counter = next_pc
+        return clear_screen
+
+    if instruction.lo_byte == 0xEE:
+        call_stack = vm.call_stack
+
+        def stack_return():
+            vm.program_counter = call_stack.pop() + INSTRUCTION_LENGTH
+        return stack_return
+
+    if vm.super_chip:
+        return _build_scroll(vm, next_pc, instruction)
+
+    return None
+
+
+def _build_scroll(vm, next_pc: int, instruction: DecodedInstruction):
+    lo_byte = instruction.lo_byte
+    lines = instruction.n
+
+    if lo_byte & 0xF0 == 0xC0:
+        def scroll_down():
+            for plane in vm._selected_video_planes:
+                plane.scroll_down(lines)
+            vm.program_counter = next_pc
+        return scroll_down
+
+    if lo_byte & 0xF0 == 0xD0 and vm.xo_chip:
+        def scroll_up():
+            for plane in vm._selected_video_planes:
+                plane.scroll_up(lines)
+            vm.program_counter = next_pc
+        return scroll_up
+
+    if lo_byte == 0xFB:
+        def scroll_right():
+            for plane in vm._selected_video_planes:
+                plane.scroll_right(4)
+            vm.program_counter = next_pc
+        return scroll_right
+
+    if lo_byte == 0xFC:
+        def scroll_left():
+            for plane in vm._selected_video_planes:
+                plane.scroll_left(4)
+            vm.program_counter = next_pc
+        return scroll_left
+
+    # 00FE and 00FF are interpreted
+    return None
+
+
+def _build_innn(vm, address: int, instruction: DecodedInstruction):
+    type_nibble = instruction.type_nibble
+    nnn = instruction.nnn
+
+    if type_nibble == 0x1:
+        if nnn == address or nnn == address - IDLE_LOOP_OFFSET:
+            def idle_jump():
+                vm._idle_jump = address
+                vm.program_counter = nnn
+            return idle_jump
+
+        def jump():
+            vm.program_counter = nnn
+        return jump
+
+    if type_nibble == 0x2:
+        call_stack = vm.call_stack
+
+        def call():
+            call_stack.append(address)
+            vm.program_counter = nnn
+        return call
+
+    if type_nibble == 0xA:
+        next_pc = address + INSTRUCTION_LENGTH
+
+        def set_i():
+            vm.i_register = nnn
+            vm.program_counter = next_pc
+        return set_i
+
+    # Bnnn is the only type nibble left
+    registers = vm.v_registers
+
+    def jump_offset():
+        vm.program_counter = nnn + registers[0]
+    return jump_offset
+
+
+def _build_ixkk(vm, address: int, instruction: DecodedInstruction):
+    type_nibble = instruction.type_nibble
+    registers = vm.v_registers
+    x = instruction.x
+    kk = instruction.kk
+    next_pc = address + INSTRUCTION_LENGTH
+    skip_pc = _skip_pc(vm, next_pc)
+
+    if type_nibble == 0x3:
+        def skip_equal():
+            vm.program_counter = skip_pc if registers[x] == kk else next_pc
+        return skip_equal
+
+    if type_nibble == 0x4:
+        def skip_not_equal():
+            vm.program_counter = skip_pc if registers[x] != kk else next_pc
+        return skip_not_equal
+
+    if type_nibble == 0x6:
+        def load():
+            registers[x] = kk
+            vm.program_counter = next_pc
+        return load
+
+    if type_nibble == 0x7:
+        def add():
+            registers[x] = (registers[x] + kk) % 0x100
+            vm.program_counter = next_pc
+        return add
+
+    # Cxkk is the only type nibble left
+    def random_and():
+        registers[x] = randrange(0, 0xFF) & kk
+        vm.program_counter = next_pc
+    return random_and
+
+
+def _build_ixyi(vm, address: int, instruction: DecodedInstruction):
+    # XO-CHIP's 5xy2 and 5xy3 are interpreted
+    if instruction.n != 0:
+        return None
+
+    registers = vm.v_registers
+    x = instruction.x
+    y = instruction.y
+    next_pc = address + INSTRUCTION_LENGTH
+    skip_pc = _skip_pc(vm, next_pc)
+
+    if instruction.type_nibble == 0x5:
+        def skip_equal():
+            vm.program_counter = \
+                skip_pc if registers[x] == registers[y] else next_pc
+        return skip_equal
+
+    def skip_not_equal():
+        vm.program_counter = \
+            skip_pc if registers[x] != registers[y] else next_pc
+    return skip_not_equal
+
+
+def _build_math(vm, address: int, instruction: DecodedInstruction):
+    registers = vm.v_registers
+    x = instruction.x
+    y = instruction.y
+    lo_nibble = instruction.n
+    next_pc = address + INSTRUCTION_LENGTH
+
+    if lo_nibble == 0x0:
+        def assign():
+            registers[x] = registers[y]
+            vm.program_counter = next_pc
+        return assign
+
+    if lo_nibble == 0x1:
+        def bitwise_or():
+            registers[x] |= registers[y]
+            vm.program_counter = next_pc
+        return bitwise_or
+
+    if lo_nibble == 0x2:
+        def bitwise_and():
+            registers[x] &= registers[y]
+            vm.program_counter = next_pc
+        return bitwise_and
+
+    if lo_nibble == 0x3:
+        def bitwise_xor():
+            registers[x] ^= registers[y]
+            vm.program_counter = next_pc
+        return bitwise_xor
+
+    if lo_nibble == 0x4:
+        def add():
+            unclamped_sum = registers[x] + registers[y]
+            registers[x] = unclamped_sum & 0xFF
+            registers[0xF] = int(unclamped_sum > 255)
+            vm.program_counter = next_pc
+        return add
+
+    if lo_nibble == 0x5:
+        def subtract():
+            unclamped_diff = registers[x] - registers[y]
+            registers[x] = max(unclamped_diff, 0)
+            registers[0xF] = int(unclamped_diff >= 0)
+            vm.program_counter = next_pc
+        return subtract
+
+    if lo_nibble == 0x6:
+        def shift_right():
+            y_val = registers[y]
+            registers[x] = y_val >> 1
+            registers[0xF] = y_val & 1
+            vm.program_counter = next_pc
+        return shift_right
+
+    if lo_nibble == 0x7:
+        def subtract_reverse():
+            unclamped_diff = registers[y] - registers[x]
+            registers[x] = max(unclamped_diff, 0)
+            registers[0xF] = int(unclamped_diff >= 0)
+            vm.program_counter = next_pc
+        return subtract_reverse
+
+    if lo_nibble == 0xE:
+        def shift_left():
+            y_val = registers[y]
+            registers[x] = (y_val << 1) & 0xFF
+            registers[0xF] = (y_val >> 7) & 1
+            vm.program_counter = next_pc
+        return shift_left
+
+    return None
+
+
+def _build_ixyn(vm, address: int, instruction: DecodedInstruction):
+    registers = vm.v_registers
+    memory = vm.memory
+    x = instruction.x
+    y = instruction.y
+    n = instruction.n
+    next_pc = address + INSTRUCTION_LENGTH
+
+    if vm.xo_chip:
+        def draw_planes():
+            registers[0xF] = int(vm.draw_plane_sprite(
+                registers[x], registers[y], n, vm.i_register))
+            vm.program_counter = next_pc
+        return draw_planes
+
+    if n == 0 and vm.super_chip:
+        def draw_large():
+            registers[0xF] = int(vm.draw_large_sprite(
+                registers[x], registers[y], vm.i_register))
+            vm.program_counter = next_pc
+        return draw_large
+
+    def draw():
+        registers[0xF] = int(
+            vm.video_ram.draw_sprite(
+                registers[x],
+                registers[y],
+                memory,
+                num_bytes=n,
+                offset=vm.i_register
+            )
+        )
+        vm.program_counter = next_pc
+    return draw
+
+
+def _build_ixii(vm, address: int, instruction: DecodedInstruction):
+    if instruction.type_nibble != 0xF:
+        return None
+
+    registers = vm.v_registers
+    x = instruction.x
+    lo_byte = instruction.lo_byte
+    next_pc = address + INSTRUCTION_LENGTH
+
+    if lo_byte == 0x00 and x == 0 and vm.xo_chip:
+        memory = vm.memory
+        long_i = (memory[address + 2] << 8) | memory[address + 3]
+        long_next_pc = address + LONG_INSTRUCTION_LENGTH
+
+        def set_long_i():
+            vm.i_register = long_i
+            vm.program_counter = long_next_pc
+        return set_long_i
+
+    if lo_byte == 0x01 and vm.xo_chip:
+        def select_planes():
+            vm.select_planes(x)
+            vm.program_counter = next_pc
+        return select_planes
+
+    if lo_byte == 0x07:
+        def load_delay():
+            registers[x] = vm._delay_timer.value
+            vm.program_counter = next_pc
+        return load_delay
+
+    if lo_byte == 0x15:
+        def set_delay():
+            vm._delay_timer.value = registers[x]
+            vm.program_counter = next_pc
+        return set_delay
+
+    if lo_byte == 0x18:
+        def set_sound():
+            vm._sound_timer.value = registers[x]
+            vm.program_counter = next_pc
+        return set_sound
+
+    if lo_byte == 0x1E:
+        def add_i():
+            vm.i_register += registers[x]
+            vm.program_counter = next_pc
+        return add_i
+
+    if lo_byte == 0x65:
+        memory = vm.memory
+        count = x + 1
+
+        def load_registers():
+            i = vm.i_register
+            loaded = memory[i:i + count]
+            # load what's there first, as the interpreter does
+            registers[0:len(loaded)] = loaded
+            if len(loaded) != count:
+                raise IndexError("Fx65 read past the end of memory")
+            vm.program_counter = next_pc
+        return load_registers
+
+    # Fx0A, Fx29, Fx33, Fx55 and unknown instructions are interpreted
+    return None
+
+
+TYPE_NIBBLE_TO_BUILDER: Dict[int, StepBuilder] = {
+    0x0: _build_iiii,
+    0x1: _build_innn,
+    0x2: _build_innn,
+    0x3: _build_ixkk,
+    0x4: _build_ixkk,
+    0x5: _build_ixyi,
+    0x6: _build_ixkk,
+    0x7: _build_ixkk,
+    0x8: _build_math,
+    0x9: _build_ixyi,
+    0xA: _build_innn,
+    0xB: _build_innn,
+    0xC: _build_ixkk,
+    0xD: _build_ixyn,
+    0xE: _build_ixii,
+    0xF: _build_ixii,
+}
+
+
+def build_step(vm: "Chip8VirtualMachine", address: int) -> Step:
+    """
+    Build a closure that executes the instruction at address on vm.
+
+    The closure leaves the program counter on the next instruction to
+    run. Instructions without a specialized builder get the VM's own
+    execute_instruction instead.
+
+    :param vm: the VM whose memory and registers the closure will use
+    :param address: the address of the instruction to build for
+    :return: a callable taking no arguments
+    """
+    memory = vm.memory
+    instruction = vm._decode_table[(memory[address] << 8) | memory[address + 1]]
+
+    builder = TYPE_NIBBLE_TO_BUILDER[instruction.type_nibble]
+    step = builder(vm, address, instruction)
+
+    if step is None:
+        return vm.execute_instruction
+
+    return step
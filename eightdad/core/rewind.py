@@ -0,0 +1,245 @@
+"""
+Rewind history for a VM, kept within a memory budget
+
+Every so often a full snapshot is stored as a keyframe. Frames in
+between only store the VM's registers plus the 256-byte memory pages
+and video RAM rows which changed since the frame before, since most
+frames only touch a few bytes. Rebuilding a frame starts from the
+keyframe before it and applies the deltas after that in order.
+
+When the budget is exceeded, the oldest keyframe is dropped along with
+the deltas which depend on it.
+
+If the VM tracks dirty pages, only those are compared for deltas, and
+the buffer clears them each time it records.
+
+A frame whose video RAM is a different size from the frame before, such
+as after a SUPER-CHIP resolution change, is always stored as a keyframe.
+
+"""
+from collections import deque
+from typing import Deque, Iterable, NamedTuple, Optional, Tuple, Union
+
+from eightdad.core.vm import (
+    Chip8VirtualMachine, MEMORY_PAGE_SIZE, SNAPSHOT_HEADER
+)
+
+# rough cost of keeping an entry beyond its data, for budgeting
+ENTRY_OVERHEAD = 128
+
+Chunks = Tuple[Tuple[int, bytes], ...]
+
+
+class Keyframe(NamedTuple):
+    snapshot: bytes
+
+
+class Delta(NamedTuple):
+    registers: bytes  # the snapshot without memory and video RAM
+    pages: Chunks  # (page index, contents) for each changed page
+    rows: Chunks  # (row index, contents) for each changed row
+
+
+Entry = Union[Keyframe, Delta]
+
+
+def _entry_size(entry: Entry) -> int:
+    if isinstance(entry, Keyframe):
+        return ENTRY_OVERHEAD + len(entry.snapshot)
+
+    return ENTRY_OVERHEAD + len(entry.registers) + sum(
+        ENTRY_OVERHEAD + len(chunk)
+        for _, chunk in entry.pages + entry.rows
+    )
+
+
+class RewindBuffer:
+    """
+    A bounded history of a VM's frames which can be stepped back through.
+
+    Call record() once per frame, after running it. step_back() then
+    returns the VM to the frame recorded before the newest, forgetting
+    the newest. Recording after stepping back continues from there.
+    """
+
+    def __init__(
+            self,
+            vm: Chip8VirtualMachine,
+            keyframe_interval: int = 60,
+            memory_budget: int = 4 * 1024 * 1024
+    ):
+        """
+        Create an empty history for a VM.
+
+        :param vm: the VM to record
+        :param keyframe_interval: how many frames to store per keyframe
+        :param memory_budget: roughly how many bytes history may use
+        """
+        if keyframe_interval < 1:
+            raise ValueError("Keyframe interval must be at least 1")
+
+        self.vm = vm
+        self.keyframe_interval = keyframe_interval
+        self.memory_budget = memory_budget
+
+        self._entries: Deque[Entry] = deque()
+        self._frames_since_keyframe = 0
+        self.memory_used = 0
+
+        # screens whose width isn't a whole number of bytes are
+        # stored as a single row. Rows stay this size if the screen
+        # is resized, so they may cover part of a line or several.
+        width = vm.video_ram.width
+        self._row_size = width // 8 if width % 8 == 0 else None
+
+        # what the newest entry holds, to compare the next frame to
+        self._last_memory = b""
+        self._last_pixels = b""
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """
+        Forget all recorded frames.
+        """
+        self._entries.clear()
+        self._frames_since_keyframe = 0
+        self.memory_used = 0
+
+    @staticmethod
+    def _split(snapshot: bytes) -> Tuple[bytes, bytes, bytes]:
+        """
+        Split a snapshot into registers, memory and video RAM.
+        """
+        # the memory and video RAM sizes end the header
+        *_, memory_size, video_size = SNAPSHOT_HEADER.unpack_from(snapshot)
+        pixels_start = len(snapshot) - video_size
+        memory_start = pixels_start - memory_size
+        return (
+            snapshot[:memory_start],
+            snapshot[memory_start:pixels_start],
+            snapshot[pixels_start:]
+        )
+
+    def record(self) -> None:
+        """
+        Add the VM's current state as the newest frame.
+        """
+        vm = self.vm
+        # taking pixels from the snapshot covers every XO-CHIP plane
+        snapshot = vm.snapshot()
+        registers, memory, pixels = self._split(snapshot)
+
+        if vm.tracks_dirty_pages:
+            candidate_pages = sorted(vm.dirty_pages)
+            vm.clear_dirty_pages()
+        else:
+            candidate_pages = None
+
+        if not self._entries \
+                or self._frames_since_keyframe >= self.keyframe_interval \
+                or len(pixels) != len(self._last_pixels):
+            self._last_memory = memory
+            self._last_pixels = pixels
+            self._append(Keyframe(snapshot))
+            self._frames_since_keyframe = 0
+            return
+
+        pages = self._changed_chunks(
+            self._last_memory, memory, MEMORY_PAGE_SIZE, candidate_pages)
+        rows = self._changed_chunks(
+            self._last_pixels, pixels, self._row_size or len(pixels))
+
+        self._last_memory = memory
+        self._last_pixels = pixels
+        self._append(Delta(registers, pages, rows))
+        self._frames_since_keyframe += 1
+
+    @staticmethod
+    def _changed_chunks(
+            old: bytes,
+            new: bytes,
+            chunk_size: int,
+            candidates: Optional[Iterable[int]] = None
+    ) -> Chunks:
+        """
+        Return the chunks of new which differ from old.
+
+        :param candidates: the only chunk indices which might differ,
+                           or None to check all of them
+        """
+        if candidates is None:
+            if old == new:
+                return ()
+            candidates = range((len(new) + chunk_size - 1) // chunk_size)
+
+        changed = []
+        for index in candidates:
+            start = index * chunk_size
+            chunk = new[start:start + chunk_size]
+            if old[start:start + chunk_size] != chunk:
+                changed.append((index, chunk))
+        return tuple(changed)
+
+    def _append(self, entry: Entry) -> None:
+        self._entries.append(entry)
+        self.memory_used += _entry_size(entry)
+
+        # drop whole keyframe groups from the oldest end, but always
+        # keep the group being recorded into
+        entries = self._entries
+        while self.memory_used > self.memory_budget:
+            later_keyframe = next(
+                (
+                    index for index in range(1, len(entries))
+                    if isinstance(entries[index], Keyframe)
+                ),
+                None
+            )
+            if later_keyframe is None:
+                break
+
+            for _ in range(later_keyframe):
+                self.memory_used -= _entry_size(entries.popleft())
+
+    def step_back(self) -> bool:
+        """
+        Forget the newest frame and return the VM to the one before it.
+
+        :return: False, leaving the VM alone, if there's no earlier frame
+        """
+        entries = self._entries
+        if len(entries) < 2:
+            return False
+
+        self.memory_used -= _entry_size(entries.pop())
+
+        # find the keyframe the new newest frame is built on
+        keyframe_index = len(entries) - 1
+        while not isinstance(entries[keyframe_index], Keyframe):
+            keyframe_index -= 1
+
+        registers, memory, pixels = self._split(
+            entries[keyframe_index].snapshot)
+        memory = bytearray(memory)
+        pixels = bytearray(pixels)
+        row_size = self._row_size or len(pixels)
+
+        for index in range(keyframe_index + 1, len(entries)):
+            delta = entries[index]
+            registers = delta.registers
+            for page, contents in delta.pages:
+                start = page * MEMORY_PAGE_SIZE
+                memory[start:start + MEMORY_PAGE_SIZE] = contents
+            for row, contents in delta.rows:
+                start = row * row_size
+                pixels[start:start + row_size] = contents
+
+        self._last_memory = bytes(memory)
+        self._last_pixels = bytes(pixels)
+        self._frames_since_keyframe = len(entries) - 1 - keyframe_index
+        vm = self.vm
+        vm.restore(b"".join((registers, memory, pixels)))
+        vm.clear_dirty_pages()
+        return True
@@ -7,10 +7,14 @@ An exception is made for print_vram as it's meant for debugging, not
 general use.
 
 """
-from typing import Tuple
+import zlib
+from functools import lru_cache
+from typing import FrozenSet, List, NamedTuple, Optional, Set, Tuple
 from itertools import islice
 from bitarray import bitarray
-from bitarray.util import zeros
+from bitarray.util import any_and, ba2int, int2ba, zeros
+
+from eightdad.types import Buffer
 
 DEFAULT_DIGITS = [
     b'\xf0\x90\x90\x90\xf0',
@@ -31,6 +35,97 @@ DEFAULT_DIGITS = [
     b'\xf0\x80\xf0\x80\x80'
 ]
 
+# SUPER-CHIP's 8x10 digits, as used by Fx30
+DEFAULT_LARGE_DIGITS = [
+    b'\xff\xff\xc3\xc3\xc3\xc3\xc3\xc3\xff\xff',
+    b'\x18\x78\x78\x18\x18\x18\x18\x18\xff\xff',
+    b'\xff\xff\x03\x03\xff\xff\xc0\xc0\xff\xff',
+    b'\xff\xff\x03\x03\xff\xff\x03\x03\xff\xff',
+    b'\xc3\xc3\xc3\xc3\xff\xff\x03\x03\x03\x03',
+    b'\xff\xff\xc0\xc0\xff\xff\x03\x03\xff\xff',
+    b'\xff\xff\xc0\xc0\xff\xff\xc3\xc3\xff\xff',
+    b'\xff\xff\x03\x03\x06\x0c\x18\x18\x18\x18',
+    b'\xff\xff\xc3\xc3\xff\xff\xc3\xc3\xff\xff',
+    b'\xff\xff\xc3\xc3\xff\xff\x03\x03\xff\xff',
+    b'\x7e\xff\xc3\xc3\xc3\xff\xff\xc3\xc3\xc3',
+    b'\xfc\xfc\xc3\xc3\xfc\xfc\xc3\xc3\xfc\xfc',
+    b'\x3c\xff\xc3\xc0\xc0\xc0\xc0\xc3\xff\x3c',
+    b'\xfc\xfe\xc3\xc3\xc3\xc3\xc3\xc3\xfe\xfc',
+    b'\xff\xff\xc0\xc0\xff\xff\xc0\xc0\xff\xff',
+    b'\xff\xff\xc0\xc0\xff\xff\xc0\xc0\xc0\xc0'
+]
+
+
+# The row of 8 pixels each byte value draws as a sprite line. These are
+# shared, so they must never be modified in place.
+BYTE_ROWS = tuple(int2ba(value, 8, endian='big') for value in range(256))
+
+
+# how many sprite masks to keep for reuse
+SPRITE_MASK_CACHE_SIZE = 4096
+
+
+class SpriteMask(NamedTuple):
+    lines: bitarray  # whole screen lines, with the sprite already placed
+    visible: bool  # whether any of the sprite's pixels are on screen
+
+
+@lru_cache(maxsize=SPRITE_MASK_CACHE_SIZE)
+def sprite_mask(data: bytes, x: int, width: int, wrap: bool) -> SpriteMask:
+    """
+    Return a sprite pre-shifted to x, as a run of whole screen lines.
+
+    XORing the mask into the screen at the start of the sprite's first
+    line draws the whole sprite at once. Pixels past the right edge are
+    clipped, or wrapped to the left edge of the same line.
+
+    Results are cached by content, so the returned mask is shared and
+    must never be modified in place.
+
+    :param data: the sprite, one byte per line
+    :param x: where the sprite's left edge is, with 0 <= x < width
+    :param width: the width of the screen, at least 8
+    :param wrap: whether pixels past the right edge wrap around
+    :return: the mask and whether it has any pixels set
+    """
+    row_mask = (1 << width) - 1
+    shift = 2 * width - 8 - x
+    lines = 0
+
+    for byte in data:
+        placed = byte << shift
+        line = placed >> width
+        if wrap:
+            line |= placed & row_mask
+        lines = (lines << width) | line
+
+    return SpriteMask(
+        int2ba(lines, len(data) * width, endian='big'), lines != 0)
+
+
+@lru_cache(maxsize=None)
+def edge_mask(width: int, height: int, columns: int, left: bool) -> bitarray:
+    """
+    Return a screen with columns pixels at one edge of every line unset.
+
+    ANDing it into a screen shifted sideways as a whole blanks the
+    pixels that moved from one line onto the next. The result is
+    shared, so it must never be modified in place.
+
+    :param width: the width of the screen
+    :param height: the height of the screen
+    :param columns: how many pixels to unset, with 0 < columns < width
+    :param left: whether to unset the left edge rather than the right
+    :return: the mask, as long as the screen
+    """
+    line = bitarray(width, endian='big')
+    line.setall(True)
+    if left:
+        line[:columns] = False
+    else:
+        line[width - columns:] = False
+    return line * height
+
 
 class VideoRam:
     """
@@ -39,8 +134,16 @@ class VideoRam:
     It is intended for both implementing a Chip-8 VM and writing prototypes of
     Chip-8 programs in python.
 
+    generation goes up whenever a method changes at least one pixel, so
+    comparing it against a saved value tells whether the screen needs
+    redrawing. Writing to pixels directly doesn't change it.
+
     """
 
+    # whether draw_sprite may draw whole sprites at once from cached
+    # masks, rather than calling xor_row for each line
+    use_sprite_masks = True
+
     def __init__(self, width: int = 64, height: int = 32, wrap: bool = False):
         """
         Create a VideoRam instance.
@@ -64,6 +167,11 @@ class VideoRam:
         # See the bitarray documentation for more details.
         self.pixels: bitarray = zeros(width * height, endian='big')
 
+        self.generation = 0
+        # frame_hash is cached until the generation changes
+        self._frame_hash = 0
+        self._frame_hash_generation = -1
+
     @property
     def size(self) -> Tuple[int, int]:
         """
@@ -72,6 +180,67 @@ class VideoRam:
         """
         return self.width, self.height
 
+    @property
+    def frame_hash(self) -> int:
+        """
+        A crc32 of the screen, computed at most once per generation.
+
+        :return: the hash as an unsigned int
+        """
+        if self._frame_hash_generation != self.generation:
+            self._frame_hash = zlib.crc32(self.pixels.tobytes())
+            self._frame_hash_generation = self.generation
+        return self._frame_hash
+
+    def as_array(self, packed: bool = False):
+        """
+        Return the screen as a NumPy array, without looping per pixel.
+
+        By default, this is a new (height, width) array of bools. Passing
+        packed=True returns a read-only uint8 view of the buffer behind
+        pixels instead, with no copying, shaped (height, width // 8)
+        when the width is a multiple of 8 and flat otherwise. Since some
+        VideoRam types only update pixels when it's accessed, call this
+        again rather than keeping a view around between frames.
+
+        NumPy isn't a required dependency, so it must be installed,
+        such as through the batch extra, for this to work.
+
+        :param packed: whether to return the packed bytes as a view
+        :return: a NumPy array of the screen
+        """
+        import numpy as np
+
+        width, height = self.width, self.height
+        view = np.frombuffer(self.pixels, dtype=np.uint8)
+        view.flags.writeable = False
+
+        if packed:
+            if width % 8 == 0:
+                return view.reshape(height, width // 8)
+            return view
+
+        unpacked = np.unpackbits(view, count=width * height)
+        return unpacked.view(np.bool_).reshape(height, width)
+
+    def resize(self, width: int, height: int) -> None:
+        """
+        Change the size of the screen, leaving it blank.
+
+        The pixels bitarray is replaced, so anything holding on to the
+        old one should read pixels again afterward.
+
+        :param width: the new width in pixels
+        :param height: the new height in pixels
+        """
+        if width < 1 or height < 1:
+            raise ValueError("Video memory dimensions must be at least 1px")
+
+        self.width = width
+        self.height = height
+        self.pixels = zeros(width * height, endian='big')
+        self.generation += 1
+
     def __getitem__(self, coordinates: Tuple[int, int]) -> bool:
         """
         Convenient access to pixels in the form video_ram[x,y]
@@ -112,15 +281,158 @@ class VideoRam:
 
         old_value = pixels[pixel_index]
         pixels[pixel_index] = old_value ^ value
+        if value:
+            self.generation += 1
         return bool(old_value & value)
 
+    def xor_row(self, x: int, y: int, row: bitarray) -> bool:
+        """
+        XOR a row of pixels onto the screen at (x, y), like xor_pixel.
+
+        The row is applied as at most two slices. Without wrap, pixels
+        past the right edge are clipped. With wrap, they continue from
+        the left edge of the same line.
+
+        Assumes 0 <= x < width, 0 <= y < height and len(row) <= width.
+
+        :param x: x position of the row's first pixel
+        :param y: y position of the row
+        :param row: the pixels to xor in, leftmost first
+        :return: true only if the call unset a pixel
+        """
+        pixels = self.pixels
+        line_start = y * self.width
+        start = line_start + x
+        line_end = line_start + self.width
+        end = start + len(row)
+
+        if end <= line_end:
+            old = pixels[start:end]
+            pixels[start:end] = old ^ row
+            if row.any():
+                self.generation += 1
+            return any_and(old, row)
+
+        head = row[:line_end - start]
+        old = pixels[start:line_end]
+        pixels[start:line_end] = old ^ head
+        unset = any_and(old, head)
+        changed = head.any()
+
+        if self.wrap:
+            tail = row[line_end - start:]
+            tail_end = line_start + len(tail)
+            old = pixels[line_start:tail_end]
+            pixels[line_start:tail_end] = old ^ tail
+            unset |= any_and(old, tail)
+            changed |= tail.any()
+
+        if changed:
+            self.generation += 1
+        return unset
+
+    def _xor_row_bits(self, x: int, y: int, bits: int, length: int) -> bool:
+        """
+        XOR a row given as an int, leftmost pixel highest, like xor_row.
+        """
+        return self.xor_row(x, y, int2ba(bits, length, endian='big'))
+
     def clear_screen(self):
         """
         Clear the screen, setting it to blank.
 
         :return:
         """
-        self.pixels.setall(False)
+        if self.pixels.any():
+            self.pixels.setall(False)
+            self.generation += 1
+
+    def scroll_down(self, lines: int) -> None:
+        """
+        Move the whole screen down, blanking lines at the top.
+
+        Lines are stored one after another, so this is a single shift
+        of the whole buffer. Pixels moved past the bottom are dropped,
+        even when drawing wraps.
+
+        :param lines: how many lines to move the screen by
+        """
+        pixels = self.pixels
+        if lines <= 0 or not pixels.any():
+            return
+        if lines >= self.height:
+            self.clear_screen()
+            return
+
+        pixels >>= lines * self.width
+        self.generation += 1
+
+    def scroll_up(self, lines: int) -> None:
+        """
+        Move the whole screen up, blanking lines at the bottom.
+
+        :param lines: how many lines to move the screen by
+        """
+        pixels = self.pixels
+        if lines <= 0 or not pixels.any():
+            return
+        if lines >= self.height:
+            self.clear_screen()
+            return
+
+        pixels <<= lines * self.width
+        self.generation += 1
+
+    def scroll_right(self, columns: int = 4) -> None:
+        """
+        Move the whole screen right, blanking columns at the left edge.
+
+        The buffer is shifted as a whole, then the pixels which moved
+        onto the start of the next line are masked off.
+
+        :param columns: how many pixels to move the screen by
+        """
+        self._scroll_sideways(columns, True)
+
+    def scroll_left(self, columns: int = 4) -> None:
+        """
+        Move the whole screen left, blanking columns at the right edge.
+
+        :param columns: how many pixels to move the screen by
+        """
+        self._scroll_sideways(columns, False)
+
+    def _scroll_sideways(self, columns: int, right: bool) -> None:
+        pixels = self.pixels
+        if columns <= 0 or not pixels.any():
+            return
+        if columns >= self.width:
+            self.clear_screen()
+            return
+
+        if right:
+            pixels >>= columns
+        else:
+            pixels <<= columns
+        pixels &= edge_mask(self.width, self.height, columns, right)
+        self.generation += 1
+
+    def load_pixels(self, data: Buffer) -> None:
+        """
+        Replace the whole screen with packed rows from pixels.tobytes().
+
+        Raises ValueError if data isn't the same size as the screen.
+
+        :param data: the packed screen contents
+        """
+        with memoryview(self.pixels) as pixels:
+            if len(data) != pixels.nbytes:
+                raise ValueError(
+                    f"Expected {pixels.nbytes} bytes of pixels,"
+                    f" got {len(data)}")
+            if pixels.tobytes() != bytes(data):
+                pixels[:] = data
+                self.generation += 1
 
     def draw_sprite(
             self,
@@ -149,16 +461,168 @@ class VideoRam:
         :return: whether or any pixels were unset by this draw operation
         """
 
-        bits_were_unset = False
         num_bytes = num_bytes or len(source_bytes) - offset
-
         source_iterator = islice(source_bytes, offset, offset + num_bytes)
 
+        width = self.width
+        height = self.height
+        if width < 8 or x < 0 or y < 0:
+            # rows could overlap themselves when wrapped, or index from
+            # the end of the screen, so go pixel by pixel
+            return self._draw_sprite_by_pixel(x, y, source_iterator, num_bytes)
+
+        wrap = self.wrap
+        if wrap:
+            x %= width
+        elif x >= width:
+            # nothing is visible, but reading past the end of the
+            # source should fail the same way as a visible sprite
+            for _ in range(num_bytes):
+                next(source_iterator)
+            return False
+
+        if self.use_sprite_masks \
+                and isinstance(source_bytes, (bytes, bytearray, memoryview)) \
+                and offset >= 0 and 0 < num_bytes <= height:
+            data = bytes(source_bytes[offset:offset + num_bytes])
+            # a short source has to fail partway through, so draw
+            # those by line
+            if len(data) == num_bytes:
+                return self._draw_sprite_mask(x, y, data)
+
+        bits_were_unset = False
+        xor_row = self.xor_row
+
         for current_y in range(y, y + num_bytes):
             current_byte = next(source_iterator)
-            for current_x in range(x, x + 8):
+
+            if current_y >= height:
+                if not wrap:
+                    continue
+                current_y %= height
+
+            if current_byte:
+                bits_were_unset |= xor_row(
+                    x, current_y, BYTE_ROWS[current_byte])
+
+        return bits_were_unset
+
+    def draw_wide_sprite(
+            self,
+            x: int,
+            y: int,
+            source_bytes,
+            num_lines: int = 16,
+            offset: int = 0) -> bool:
+        """
+        Draw a 16-pixel-wide sprite, two bytes per line, like draw_sprite.
+
+        Raises IndexError if the source ends before the sprite does.
+
+        :param x: the x-position to start drawing at
+        :param y: the y-position to start drawing at
+        :param source_bytes: the source object to use for bytes
+        :param num_lines: how many lines tall the sprite is
+        :param offset: where in the source the sprite starts
+        :return: whether any pixels were unset by this draw operation
+        """
+        data = bytes(source_bytes[offset:offset + 2 * num_lines])
+        if offset < 0 or len(data) != 2 * num_lines:
+            raise IndexError("Sprite extends past the end of its source")
+
+        lines = [
+            (data[index] << 8) | data[index + 1]
+            for index in range(0, len(data), 2)
+        ]
+
+        width = self.width
+        height = self.height
+        if width < 16 or x < 0 or y < 0:
+            return self._draw_sprite_by_pixel(
+                x, y, iter(lines), num_lines, sprite_width=16)
+
+        wrap = self.wrap
+        if wrap:
+            x %= width
+        elif x >= width:
+            return False
+
+        bits_were_unset = False
+        xor_row_bits = self._xor_row_bits
+
+        for current_y, line in enumerate(lines, y):
+            if current_y >= height:
+                if not wrap:
+                    break
+                current_y %= height
+
+            if line:
+                bits_were_unset |= xor_row_bits(x, current_y, line, 16)
+
+        return bits_were_unset
+
+    def _draw_sprite_mask(self, x: int, y: int, data: bytes) -> bool:
+        """
+        Draw a sprite at once by XORing in its cached mask.
+
+        Assumes 0 <= x < width and that the sprite is no taller than
+        the screen.
+        """
+        width = self.width
+        height = self.height
+        lines, visible = sprite_mask(data, x, width, self.wrap)
+
+        if self.wrap:
+            y %= height
+        elif y >= height:
+            return False
+
+        # lines below the bottom are clipped, or wrapped to the top
+        parts = [(y, lines)]
+        below = y + len(data) - height
+        if below > 0:
+            split = (len(data) - below) * width
+            parts = [(y, lines[:split])]
+            if self.wrap:
+                parts.append((0, lines[split:]))
+            visible = any(part.any() for _, part in parts)
+
+        if not visible:
+            return False
+
+        pixels = self.pixels
+        unset = False
+        for line, part in parts:
+            start = line * width
+            end = start + len(part)
+            old = pixels[start:end]
+            pixels[start:end] = old ^ part
+            if any_and(old, part):
+                unset = True
+
+        self.generation += 1
+        return unset
+
+    def _draw_sprite_by_pixel(
+            self,
+            x: int,
+            y: int,
+            source_iterator,
+            num_bytes: int,
+            sprite_width: int = 8) -> bool:
+        """
+        Draw a sprite one pixel at a time, for cases rows can't handle.
+
+        Each line is an int sprite_width bits wide, leftmost highest.
+        """
+        bits_were_unset = False
+        top_bit = 1 << (sprite_width - 1)
+
+        for current_y in range(y, y + num_bytes):
+            current_byte = next(source_iterator)
+            for current_x in range(x, x + sprite_width):
                 # get the current pixel
-                current_bit = bool(0b10000000 & current_byte)
+                current_bit = bool(top_bit & current_byte)
 
                 # only draw if pixel isn't blank
                 if current_bit:
@@ -174,6 +638,350 @@ class VideoRam:
         return bits_were_unset
 
 
+class IntRowVideoRam(VideoRam):
+    """
+    A VideoRam storing each line of the screen as one int.
+
+    The leftmost pixel of a line is its highest bit. Drawing a sprite
+    line is one shift, AND and XOR on the line's int rather than work
+    per pixel, and clearing resets a list.
+
+    pixels is still available for frontends, but is only brought up to
+    date when it's accessed after a change. It must be treated as read
+    only, with load_pixels used to replace the screen instead.
+    """
+
+    def __init__(self, width: int = 64, height: int = 32, wrap: bool = False):
+        self.rows: List[int] = [0] * height
+        self._pixels_stale = False
+        super().__init__(width, height, wrap)
+        # every pixel of a line set
+        self._row_mask = (1 << width) - 1
+
+    @property
+    def pixels(self) -> bitarray:
+        pixels = self._pixels
+        if self._pixels_stale:
+            width = self.width
+            screen = 0
+            for row in self.rows:
+                screen = (screen << width) | row
+
+            with memoryview(pixels) as view:
+                padding = view.nbytes * 8 - len(pixels)
+                view[:] = (screen << padding).to_bytes(view.nbytes, 'big')
+            self._pixels_stale = False
+
+        return pixels
+
+    @pixels.setter
+    def pixels(self, pixels: bitarray) -> None:
+        self._pixels = pixels
+        self._load_rows()
+
+    def _load_rows(self) -> None:
+        width = self.width
+        pixels = self._pixels
+        self.rows[:] = [
+            ba2int(pixels[start:start + width], signed=False)
+            for start in range(0, len(pixels), width)
+        ]
+        self._pixels_stale = False
+
+    def __getitem__(self, coordinates: Tuple[int, int]) -> bool:
+        x, y = coordinates
+        return bool((self.rows[y] >> (self.width - 1 - x)) & 1)
+
+    def xor_pixel(self, x: int, y: int, value: bool) -> bool:
+        if x >= self.width:
+            if not self.wrap:
+                return False
+            x = x % self.width
+
+        if y >= self.height:
+            if not self.wrap:
+                return False
+            y = y % self.height
+
+        if not value:
+            return False
+
+        bit = 1 << (self.width - 1 - x)
+        old = self.rows[y]
+        self.rows[y] = old ^ bit
+        self._pixels_stale = True
+        self.generation += 1
+        return bool(old & bit)
+
+    def xor_row(self, x: int, y: int, row: bitarray) -> bool:
+        return self._xor_row_bits(x, y, ba2int(row, signed=False), len(row))
+
+    def _xor_row_bits(self, x: int, y: int, bits: int, length: int) -> bool:
+        """
+        XOR length bits in at (x, y), following the rules of xor_row.
+        """
+        width = self.width
+
+        # line the row up at x in a line twice as wide, so the half
+        # past the right edge is either dropped or wrapped around
+        placed = bits << (2 * width - length - x)
+        line = placed >> width
+        if self.wrap:
+            line |= placed & self._row_mask
+
+        if not line:
+            return False
+
+        rows = self.rows
+        old = rows[y]
+        rows[y] = old ^ line
+        self._pixels_stale = True
+        self.generation += 1
+        return bool(old & line)
+
+    def clear_screen(self):
+        if any(self.rows):
+            self.rows[:] = [0] * self.height
+            self._pixels_stale = True
+            self.generation += 1
+
+    def resize(self, width: int, height: int) -> None:
+        super().resize(width, height)
+        self._row_mask = (1 << width) - 1
+
+    def scroll_down(self, lines: int) -> None:
+        rows = self.rows
+        if lines <= 0 or not any(rows):
+            return
+        if lines >= self.height:
+            self.clear_screen()
+            return
+
+        rows[lines:] = rows[:-lines]
+        rows[:lines] = [0] * lines
+        self._pixels_stale = True
+        self.generation += 1
+
+    def scroll_up(self, lines: int) -> None:
+        rows = self.rows
+        if lines <= 0 or not any(rows):
+            return
+        if lines >= self.height:
+            self.clear_screen()
+            return
+
+        rows[:-lines] = rows[lines:]
+        rows[-lines:] = [0] * lines
+        self._pixels_stale = True
+        self.generation += 1
+
+    def _scroll_sideways(self, columns: int, right: bool) -> None:
+        rows = self.rows
+        if columns <= 0 or not any(rows):
+            return
+        if columns >= self.width:
+            self.clear_screen()
+            return
+
+        if right:
+            rows[:] = [row >> columns for row in rows]
+        else:
+            mask = self._row_mask
+            rows[:] = [(row << columns) & mask for row in rows]
+        self._pixels_stale = True
+        self.generation += 1
+
+    def load_pixels(self, data: Buffer) -> None:
+        pixels = self.pixels
+        with memoryview(pixels) as view:
+            if len(data) != view.nbytes:
+                raise ValueError(
+                    f"Expected {view.nbytes} bytes of pixels,"
+                    f" got {len(data)}")
+            if view.tobytes() == bytes(data):
+                return
+            view[:] = data
+        self._load_rows()
+        self.generation += 1
+
+    def draw_sprite(
+            self,
+            x: int,
+            y: int,
+            source_bytes,
+            num_bytes: int = 0,
+            offset: int = 0) -> bool:
+        num_bytes = num_bytes or len(source_bytes) - offset
+        source_iterator = islice(source_bytes, offset, offset + num_bytes)
+
+        width = self.width
+        height = self.height
+        if width < 8 or x < 0 or y < 0:
+            return self._draw_sprite_by_pixel(x, y, source_iterator, num_bytes)
+
+        wrap = self.wrap
+        if wrap:
+            x %= width
+        elif x >= width:
+            for _ in range(num_bytes):
+                next(source_iterator)
+            return False
+
+        rows = self.rows
+        mask = self._row_mask
+        shift = 2 * width - 8 - x
+        bits_were_unset = False
+        changed = False
+
+        for current_y in range(y, y + num_bytes):
+            current_byte = next(source_iterator)
+
+            if current_y >= height:
+                if not wrap:
+                    continue
+                current_y %= height
+
+            if current_byte:
+                placed = current_byte << shift
+                line = placed >> width
+                if wrap:
+                    line |= placed & mask
+
+                if line:
+                    old = rows[current_y]
+                    rows[current_y] = old ^ line
+                    changed = True
+                    if old & line:
+                        bits_were_unset = True
+
+        if changed:
+            self._pixels_stale = True
+            self.generation += 1
+        return bits_were_unset
+
+
+class DirtyRegion(NamedTuple):
+    """
+    The part of a screen which changed, as lines and a bounding box.
+
+    right and bottom are exclusive. A sprite wrapping around an edge
+    gives a box spanning the screen in that direction, but rows still
+    only holds the lines which changed.
+    """
+    rows: FrozenSet[int]
+    left: int
+    top: int
+    right: int
+    bottom: int
+
+
+class DirtyTrackingVideoRam(VideoRam):
+    """
+    A VideoRam which records where drawing changed the screen.
+
+    Renderers can call consume_dirty() once per frame and redraw only
+    the region it returns, or nothing at all if it returns None. The
+    whole screen starts dirty, so the first call covers everything.
+    """
+
+    # tracking relies on sprites being drawn through xor_row
+    use_sprite_masks = False
+
+    def __init__(self, width: int = 64, height: int = 32, wrap: bool = False):
+        super().__init__(width, height, wrap)
+        self._dirty_rows: Set[int] = set()
+        self._left = width
+        self._right = 0
+        self._mark_all()
+
+    def _mark(self, x_start: int, x_end: int, y: int) -> None:
+        self._dirty_rows.add(y)
+        if x_start < self._left:
+            self._left = x_start
+        if x_end > self._right:
+            self._right = x_end
+
+    def _mark_all(self) -> None:
+        self._dirty_rows.update(range(self.height))
+        self._left = 0
+        self._right = self.width
+
+    def consume_dirty(self) -> Optional[DirtyRegion]:
+        """
+        Return what changed since the last call, and mark it all clean.
+
+        :return: the changed region, or None if nothing changed
+        """
+        rows = self._dirty_rows
+        if not rows:
+            return None
+
+        region = DirtyRegion(
+            frozenset(rows), self._left, min(rows), self._right, max(rows) + 1)
+
+        rows.clear()
+        self._left = self.width
+        self._right = 0
+        return region
+
+    def xor_pixel(self, x: int, y: int, value: bool) -> bool:
+        if x >= self.width:
+            if not self.wrap:
+                return False
+            x = x % self.width
+
+        if y >= self.height:
+            if not self.wrap:
+                return False
+            y = y % self.height
+
+        if value:
+            self._mark(x, x + 1, y)
+        return super().xor_pixel(x, y, value)
+
+    def xor_row(self, x: int, y: int, row: bitarray) -> bool:
+        width = self.width
+        end = x + len(row)
+
+        if end <= width:
+            self._mark(x, end, y)
+        else:
+            self._mark(x, width, y)
+            if self.wrap:
+                self._mark(0, end - width, y)
+
+        return super().xor_row(x, y, row)
+
+    def clear_screen(self):
+        if self.pixels.any():
+            self._mark_all()
+        super().clear_screen()
+
+    def load_pixels(self, data: Buffer) -> None:
+        super().load_pixels(data)
+        self._mark_all()
+
+    def resize(self, width: int, height: int) -> None:
+        super().resize(width, height)
+        self._dirty_rows.clear()
+        self._mark_all()
+
+    def scroll_down(self, lines: int) -> None:
+        if lines > 0 and self.pixels.any():
+            self._mark_all()
+        super().scroll_down(lines)
+
+    def scroll_up(self, lines: int) -> None:
+        if lines > 0 and self.pixels.any():
+            self._mark_all()
+        super().scroll_up(lines)
+
+    def _scroll_sideways(self, columns: int, right: bool) -> None:
+        if columns > 0 and self.pixels.any():
+            self._mark_all()
+        super()._scroll_sideways(columns, right)
+
+
 def print_vram(
         vram: VideoRam,
         pixel_on: str = "#",
@@ -4,59 +4,208 @@ Core VM-related functionality for executing programs
 Timer and VM are implemented here.
 
 """
+import enum
+import struct
+from collections import deque
 from dataclasses import dataclass
-from typing import Tuple, Iterable, Union
+from typing import (
+    Tuple, Iterable, Union, List, Optional, Set, Deque, FrozenSet
+)
 from random import randrange
 
-from eightdad.types import Buffer, DigitTooTall, DigitTooWide
+from eightdad.types import (
+    Buffer,
+    DigitTooTall,
+    DigitTooWide,
+    InvalidSnapshotError,
+    UnhandledInstructionError
+)
 from eightdad.core.bytecode import (
-    PATTERN_IXII,
-    PATTERN_INNN,
-    PATTERN_IIII,
-    PATTERN_IXKK,
-    PATTERN_IXYI,
-    PATTERN_IXYN
+    DecodedInstruction,
+    FIRST_NIBBLE_TO_HANDLER,
+    IDLE_LOOP_OFFSET,
+    INSTRUCTION_LENGTH,
+    get_decode_table,
+    is_long_instruction
+)
+from eightdad.core.predecode import Step, build_step
+from eightdad.core.jit import BlockCompiler
+from eightdad.core.video import (
+    VideoRam, DEFAULT_DIGITS, DEFAULT_LARGE_DIGITS
 )
-from eightdad.core.bytecode import Chip8Instruction
-from eightdad.core.video import VideoRam, DEFAULT_DIGITS
 
 
 # Constant according to the mattmik spec
 DIGIT_HEIGHT = 5  # 5 lines / bytes of data
 
+# SUPER-CHIP's large digits, loaded right after the small ones
+LARGE_DIGIT_HEIGHT = 10
+
 
 DEFAULT_EXECUTION_START = 0x200
-INSTRUCTION_LENGTH = 2 # 2 bytes, 16 bits
+
+DEFAULT_MEMORY_SIZE = 4096
+XO_CHIP_MEMORY_SIZE = 0x10000
+
+# XO-CHIP has two bitplanes, selected by Fn01
+XO_CHIP_PLANES = 2
+
+
+# granularity of dirty memory tracking
+MEMORY_PAGE_SIZE = 256
+
+
+SNAPSHOT_MAGIC = b"8DAD"
+SNAPSHOT_VERSION = 3
+
+# The fixed-size start of a snapshot. The call stack, queued key events,
+# memory and video RAM follow it, in that order. Video RAM holds each
+# plane's packed rows one after another.
+SNAPSHOT_HEADER = struct.Struct(
+    "<"
+    "4s"  # magic
+    "B"  # version
+    "H"  # program counter
+    "Q"  # I register
+    "16s"  # V registers
+    "BI"  # delay timer value and elapsed
+    "BI"  # sound timer value and elapsed
+    "16s"  # key states, one byte per key
+    "?B"  # waiting for key and the register to store it in
+    "?"  # SUPER-CHIP high resolution mode
+    "B"  # XO-CHIP selected planes
+    "Q"  # cycle count
+    "H"  # call stack size
+    "H"  # queued key event count
+    "I"  # memory size
+    "I"  # video RAM size in bytes, for all planes
+)
+
+
+@enum.unique
+class ExecutionMode(enum.Enum):
+    """
+    How a VM runs the instruction at the program counter.
+
+    INTERPRET decodes and dispatches every instruction as it runs.
+
+    PREDECODE builds a closure for each address the first time it runs
+    and reuses it afterward. Memory written through the VM invalidates
+    the closures under it, but writing to vm.memory directly does not.
+
+    JIT compiles straight-line runs of instructions into Python functions.
+    Blocks only run through execute_block and tick_block, while tick
+    still steps one instruction at a time with the interpreter. Memory
+    writes invalidate blocks the same way as in PREDECODE.
+    """
+    INTERPRET = enum.auto()
+    PREDECODE = enum.auto()
+    JIT = enum.auto()
+
+
+@enum.unique
+class StopReason(enum.Enum):
+    """
+    Why a call to run_cycles or run_frame returned.
+    """
+    CYCLE_LIMIT = enum.auto()  # ran every cycle requested
+    FRAME_END = enum.auto()  # reached the end of the current frame
+    KEY_WAIT = enum.auto()  # blocked on Fx0A, remaining cycles idled
+    UNHANDLED = enum.auto()  # hit an instruction the VM can't execute
+    BREAKPOINT = enum.auto()  # about to execute an address in breakpoints
+    HALTED = enum.auto()  # jumped to itself, remaining cycles idled
 
 
 class Timer:
     """
-    Simple timer that decrements at 60hz, per the spec
+    Timer that decrements at 60hz, per the spec, counted in VM cycles.
+
+    Each cycle adds hz_decrement_rate to elapsed, and every
+    cycles_per_second of elapsed is one decrement. Everything stays an
+    integer, so there's no drift from float rounding, and any number of
+    cycles can be applied at once.
     """
 
-    def __init__(self, hz_decrement_rate: float = 60.0):
-        self.decrement_threshold = 1.0 / hz_decrement_rate
-        self.elapsed = 0.0
+    def __init__(
+            self,
+            cycles_per_second: int = 600,
+            hz_decrement_rate: int = 60
+    ):
+        self.cycles_per_second = cycles_per_second
+        self.hz_decrement_rate = hz_decrement_rate
+        self.elapsed = 0
         self.value = 0
+        # part of a cycle left over from tick, carried to the next one
+        self._cycle_remainder = 0.0
+
+    def advance(self, num_cycles: int) -> None:
+        """
+        Advance the timer by a number of cycles.
+
+        Applies exactly as many decrements as the cycles cover, however
+        many that is.
+
+        :param num_cycles: how many cycles to advance by
+        :return:
+        """
+        decrements, self.elapsed = divmod(
+            self.elapsed + num_cycles * self.hz_decrement_rate,
+            self.cycles_per_second
+        )
+
+        if decrements:
+            self.value = max(self.value - decrements, 0)
 
     def tick(self, dt: float) -> None:
         """
-        Advance the timer by dt seconds.
+        Advance the timer by dt seconds, rounded to whole cycles.
 
-        Assumes only small values of dt will be sent, doesn't apply multiple
-        decrements per dt. Values of dt larger than decrement threshold may
-        cause issues.
+        Whatever rounding drops or adds is carried into the next call,
+        so many short ticks add up to the same time as one long one.
 
         :param dt: how large a time step to apply
         :return:
         """
-        self.elapsed += dt
+        cycles = dt * self.cycles_per_second + self._cycle_remainder
+        num_cycles = round(cycles)
+        self._cycle_remainder = cycles - num_cycles
+        self.advance(num_cycles)
+
+    def cycles_until_decrement(self) -> int:
+        """
+        Return which upcoming cycle will apply the next decrement.
 
-        if self.elapsed >= self.decrement_threshold:
-            self.elapsed -= self.decrement_threshold
+        :return: the number of cycles, counting from 1
+        """
+        # ceiling division of the distance to the next decrement
+        return -(
+            (self.elapsed - self.cycles_per_second) // self.hz_decrement_rate
+        ) or 1
+
+    def cycles_until_zero(self) -> int:
+        """
+        Return how many cycles until the value reaches zero.
+
+        :return: the number of cycles, or 0 if it's already zero
+        """
+        if not self.value:
+            return 0
+        return -(
+            (self.elapsed - self.value * self.cycles_per_second)
+            // self.hz_decrement_rate
+        )
 
-            if self.value > 0:
-                self.value -= 1
+    def value_after(self, num_cycles: int) -> int:
+        """
+        Return what the value will be after num_cycles more cycles.
+
+        :param num_cycles: how many cycles ahead to look
+        :return: the value at that point
+        """
+        decrements = (
+            self.elapsed + num_cycles * self.hz_decrement_rate
+        ) // self.cycles_per_second
+        return max(self.value - decrements, 0)
 
 
 def upper_hex(src: Union[int, Iterable[int]]) -> str:
@@ -108,6 +257,36 @@ def report_state(state: VMState):
     )
 
 
+class _InstructionParser:
+    """
+    Stands in for the Chip8Instruction the VM used to decode with.
+
+    Fields are read from the VM's current_instruction, and decode
+    replaces it, so code written against the old parser keeps working.
+    """
+
+    def __init__(self, vm: "Chip8VirtualMachine"):
+        self._vm = vm
+
+    def decode(self, source: Buffer, offset: int = 0) -> None:
+        """
+        Decode an instruction into the VM's current_instruction.
+
+        :param source: the bytes-like object to read from
+        :param offset: how far into the code to start reading
+        :return:
+        """
+        vm = self._vm
+        vm.current_instruction = vm._decode_table[
+            (source[offset] << 8) | source[offset + 1]]
+
+    def __getattr__(self, name: str):
+        # private names never read through, so copying can't recurse
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._vm.current_instruction, name)
+
+
 class Chip8VirtualMachine:
 
     def load_to_memory(self, data: Buffer, location: int) -> None:
@@ -139,6 +318,7 @@ class Chip8VirtualMachine:
             ) from e
 
         self.memory[location:end] = view
+        self._memory_written(location, end)
 
     def load_digits(
             self,
@@ -188,16 +368,55 @@ class Chip8VirtualMachine:
 
         self.digits_memory_location = location
 
+    def load_large_digits(
+            self,
+            raw_digit_data: Iterable[Buffer],
+            location: int
+    ) -> None:
+        """
+        Load SUPER-CHIP's large hex digits, as used by Fx30.
+
+        Large digits are 8 pixels wide by 10 pixels tall.
+
+        :param raw_digit_data: 16 buffer protocol objects in an iterable
+        :param location: start address to load to
+        """
+        self.large_digits_memory_location = None
+
+        digits = tuple(raw_digit_data)
+        if len(digits) != 16:
+            raise IndexError(
+                f"Digit data must have exactly 16 entries but got"
+                f" {len(digits)} instead."
+            )
+
+        for digit_index, digit_data in enumerate(digits):
+            if len(digit_data) > LARGE_DIGIT_HEIGHT:
+                raise DigitTooTall(
+                    f"Large digit {digit_index} must be"
+                    f" {LARGE_DIGIT_HEIGHT} lines or fewer, but"
+                    f" got {digit_data!r}"
+                )
+
+            self.load_to_memory(
+                digit_data, location + digit_index * LARGE_DIGIT_HEIGHT)
+
+        self.large_digits_memory_location = location
+
     def __init__(
             self,
             display_size: Tuple[int, int] = (64, 32),
             display_wrap: bool = False,
-            memory_size: int = 4096,
+            memory_size: Optional[int] = None,
             execution_start: int = DEFAULT_EXECUTION_START,
             digit_start: int = 0x0,
             ticks_per_frame: int = 20,
             frames_per_second: int = 30,
-            video_ram_type: type = VideoRam
+            video_ram_type: type = VideoRam,
+            execution_mode: ExecutionMode = ExecutionMode.INTERPRET,
+            track_dirty_pages: bool = False,
+            super_chip: bool = False,
+            xo_chip: bool = False
     ):
         """
 
@@ -210,18 +429,44 @@ class Chip8VirtualMachine:
         Avoiding redraw of unchanged pixels is the major intended
         usecase for this feature. For example, a curses frontend
         using braille characters as pixel blocks is one possibility.
+        DirtyTrackingVideoRam implements this, and IntRowVideoRam
+        draws faster.
 
         :param display_size: A pair of values for the screen type.
         :param display_wrap: whether drawing wraps
-        :param memory_size: how big RAM should be
+        :param memory_size: how big RAM should be, 4096 bytes by
+                            default or 64KB for XO-CHIP
         :param execution_start: where to start execution
         :param digit_start: where digits should start in ram
         :param ticks_per_frame: how many instructions execute per frame
         :param frames_per_second: how many frames/sec execute
         :param video_ram_type: a VideoRam class or subclass
+        :param execution_mode: how instructions should be executed
+        :param track_dirty_pages: whether to record which memory pages
+                                  are written
+        :param super_chip: whether to run SUPER-CHIP instructions. This
+                           changes Dxy0 to draw 16 line sprites, and
+                           00FF doubles the display size.
+        :param xo_chip: whether to run XO-CHIP instructions, which
+                        include SUPER-CHIP's. This adds a second plane
+                        of video RAM, and skips step over F000 NNNN.
         """
+        if memory_size is None:
+            memory_size = \
+                XO_CHIP_MEMORY_SIZE if xo_chip else DEFAULT_MEMORY_SIZE
+
         # initialize display-related functionality
         self.memory = bytearray(memory_size)
+
+        # indices of MEMORY_PAGE_SIZE pages written since the last
+        # clear_dirty_pages(), if tracking. Must exist before digits load.
+        self._dirty_pages: Optional[Set[int]] = \
+            set() if track_dirty_pages else None
+
+        # per-address closures, only allocated in predecode mode
+        self._predecoded: Optional[List[Optional[Step]]] = None
+        # compiled blocks, only used in JIT mode
+        self._jit: Optional[BlockCompiler] = None
         width, height = display_size
 
         if not isinstance(video_ram_type, type) \
@@ -233,9 +478,32 @@ class Chip8VirtualMachine:
 
         self.video_ram = video_ram_type(width, height, display_wrap)
 
+        # every plane of video RAM, with video_ram as the first. Each
+        # is drawn to, cleared and scrolled on its own.
+        self.video_planes: Tuple[VideoRam, ...] = (self.video_ram,)
+        if xo_chip:
+            self.video_planes += tuple(
+                video_ram_type(width, height, display_wrap)
+                for _ in range(XO_CHIP_PLANES - 1)
+            )
+        # a bit mask of the planes drawing applies to, set by Fn01
+        self.selected_planes = 1
+        self._selected_video_planes = self.video_planes[:1]
+
+        self.xo_chip = xo_chip
+        self.super_chip = super_chip or xo_chip
+        # the display size outside of high resolution mode
+        self._low_resolution_size = (width, height)
+        self._high_resolution = False
+
         self.digits_memory_location: int = None
         self.load_digits(DEFAULT_DIGITS, digit_start)
 
+        self.large_digits_memory_location: Optional[int] = None
+        if self.super_chip:
+            self.load_large_digits(
+                DEFAULT_LARGE_DIGITS, digit_start + 16 * DIGIT_HEIGHT)
+
         # set up execution-related state
 
         self.program_counter = execution_start
@@ -249,18 +517,99 @@ class Chip8VirtualMachine:
         self.waiting_for_key = False
         self.waiting_register = None
         self._keystates = [False] * 16  # Whether each key is down
-        
-        self._delay_timer = Timer()
-        self._sound_timer = Timer()
+        # keys pressed while waiting on Fx0A, oldest first
+        self._key_events: Deque[int] = deque()
 
         self.ticks_per_frame = ticks_per_frame
         self.frames_per_second = frames_per_second
         self.ticks_per_second = ticks_per_frame * frames_per_second
         self.tick_length = 1.0 / self.ticks_per_second
 
-        self.instruction_parser = Chip8Instruction()
+        self._delay_timer = Timer(self.ticks_per_second)
+        self._sound_timer = Timer(self.ticks_per_second)
+        # part of a cycle left over from the last dt, see _dt_to_cycles
+        self._cycle_remainder = 0.0
+
+        # how many cycles have been executed or waited through
+        self.cycle_count = 0
+        # addresses run_cycles stops before executing
+        self.breakpoints: Set[int] = set()
+        # address of the last jump that might close an idle loop
+        self._idle_jump: Optional[int] = None
+
+        # decoding is a lookup into a table shared by all VMs, and each
+        # entry names the method to run it. Bind those once up front.
+        self._decode_table = get_decode_table()
+        self._build_dispatch_tables()
+        self._handlers = {
+            name: getattr(self, name)
+            for name in set(FIRST_NIBBLE_TO_HANDLER.values())
+        }
+        self.current_instruction: DecodedInstruction = self._decode_table[0]
+        self._instruction_parser = _InstructionParser(self)
         self.instruction_unhandled = False
 
+        self.execution_mode = execution_mode
+        if execution_mode == ExecutionMode.PREDECODE:
+            self._predecoded = [None] * memory_size
+            self._execute_next = self.execute_predecoded
+        else:
+            if execution_mode == ExecutionMode.JIT:
+                self._jit = BlockCompiler(self)
+            self._execute_next = self.execute_instruction
+
+    @property
+    def instruction_parser(self) -> _InstructionParser:
+        """
+        The old decoding interface, kept for older handler code.
+
+        Its fields read through to current_instruction, and its decode
+        method replaces current_instruction.
+
+        :return: a parser bound to this VM
+        """
+        return self._instruction_parser
+
+    @property
+    def high_resolution(self) -> bool:
+        return self._high_resolution
+
+    def set_high_resolution(self, high_resolution: bool) -> None:
+        """
+        Switch the display between SUPER-CHIP's low and high resolution.
+
+        High resolution is twice the display_size in each direction.
+        Switching clears the screen, while asking for the current
+        resolution does nothing.
+
+        :param high_resolution: whether to use high resolution
+        """
+        if high_resolution == self._high_resolution:
+            return
+
+        self._high_resolution = high_resolution
+        size = self._display_size(high_resolution)
+        for plane in self.video_planes:
+            plane.resize(*size)
+
+    def select_planes(self, planes: int) -> None:
+        """
+        Choose which video planes drawing, clearing and scrolling apply to.
+
+        :param planes: a bit mask, with bit 0 for the first plane
+        """
+        self.selected_planes = planes
+        self._selected_video_planes = tuple(
+            plane for index, plane in enumerate(self.video_planes)
+            if planes & (1 << index)
+        )
+
+    def _display_size(self, high_resolution: bool) -> Tuple[int, int]:
+        width, height = self._low_resolution_size
+        if high_resolution:
+            return 2 * width, 2 * height
+        return width, height
+
     @property
     def delay_timer(self):
         return self._delay_timer.value
@@ -279,7 +628,9 @@ class Chip8VirtualMachine:
 
     def press(self, key: int) -> None:
         self._keystates[key] = True
-   
+        if self.waiting_for_key:
+            self._key_events.append(key)
+
     def pressed(self, key: int) -> bool:
         return self._keystates[key]
 
@@ -312,11 +663,226 @@ class Chip8VirtualMachine:
             tuple(self._keystates)
         )
 
+    def snapshot(self) -> bytes:
+        """
+        Return the complete VM state as a compact bytes object.
+
+        Unlike dump_state, this covers everything needed to pick up
+        where the VM left off, including memory, video RAM and timer
+        progress. Breakpoints, the execution mode and whether SUPER-CHIP
+        or XO-CHIP is enabled aren't included.
+
+        :return: a snapshot that restore() accepts
+        """
+        call_stack = self.call_stack
+        key_events = self._key_events
+        delay_timer = self._delay_timer
+        sound_timer = self._sound_timer
+        planes = [plane.pixels for plane in self.video_planes]
+
+        return b"".join((
+            SNAPSHOT_HEADER.pack(
+                SNAPSHOT_MAGIC,
+                SNAPSHOT_VERSION,
+                self.program_counter,
+                self.i_register,
+                self.v_registers,
+                delay_timer.value,
+                delay_timer.elapsed,
+                sound_timer.value,
+                sound_timer.elapsed,
+                bytes(self._keystates),
+                self.waiting_for_key,
+                # only meaningful while waiting, so don't keep stale ones
+                self.waiting_register if self.waiting_for_key else 0,
+                self._high_resolution,
+                self.selected_planes,
+                self.cycle_count,
+                len(call_stack),
+                len(key_events),
+                len(self.memory),
+                sum(pixels.nbytes for pixels in planes)
+            ),
+            struct.pack(f"<{len(call_stack)}H", *call_stack),
+            bytes(key_events),
+            self.memory,
+            *planes
+        ))
+
+    def restore(self, snapshot: Buffer) -> None:
+        """
+        Load state from a snapshot taken by a VM with the same layout.
+
+        Memory, registers and video RAM are copied into the existing
+        objects rather than replaced. Memory is only copied when it
+        differs, so cached code for it is only thrown away when it has
+        to be.
+
+        Raises InvalidSnapshotError if the snapshot is malformed or
+        its memory or video RAM size doesn't match this VM's.
+
+        :param snapshot: bytes returned by snapshot()
+        """
+        view = memoryview(snapshot)
+        try:
+            (
+                magic, version,
+                program_counter, i_register, v_registers,
+                delay_value, delay_elapsed,
+                sound_value, sound_elapsed,
+                keys, waiting_for_key, waiting_register,
+                high_resolution, selected_planes,
+                cycle_count, stack_size, num_key_events,
+                memory_size, video_size
+            ) = SNAPSHOT_HEADER.unpack_from(view)
+        except struct.error as e:
+            raise InvalidSnapshotError(f"Snapshot too short: {e}") from e
+
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise InvalidSnapshotError(
+                f"Unsupported snapshot format {magic!r} v{version}")
+
+        memory = self.memory
+        if memory_size != len(memory):
+            raise InvalidSnapshotError(
+                f"Snapshot has {memory_size} bytes of memory,"
+                f" but VM has {len(memory)}")
+
+        stack_end = SNAPSHOT_HEADER.size + 2 * stack_size
+        events_end = stack_end + num_key_events
+        memory_end = events_end + memory_size
+
+        if high_resolution and not self.super_chip:
+            raise InvalidSnapshotError(
+                "Snapshot is in high resolution, but the VM isn't SUPER-CHIP")
+
+        if high_resolution == self._high_resolution:
+            plane_size = self.video_ram.pixels.nbytes
+        else:
+            width, height = self._display_size(high_resolution)
+            plane_size = (width * height + 7) // 8
+
+        planes = self.video_planes
+        if video_size != plane_size * len(planes) \
+                or len(view) != memory_end + video_size:
+            raise InvalidSnapshotError(
+                "Snapshot video RAM doesn't match the VM's")
+
+        self.set_high_resolution(high_resolution)
+        for index, plane in enumerate(planes):
+            plane_start = memory_end + index * plane_size
+            plane.load_pixels(view[plane_start:plane_start + plane_size])
+        self.select_planes(selected_planes)
+
+        new_memory = view[events_end:memory_end]
+        if memory != new_memory:
+            # only invalidate the pages that actually changed
+            for start in range(0, memory_size, MEMORY_PAGE_SIZE):
+                end = min(start + MEMORY_PAGE_SIZE, memory_size)
+                page = new_memory[start:end]
+                if memory[start:end] != page:
+                    memory[start:end] = page
+                    self._memory_written(start, end)
+
+        self.call_stack[:] = struct.unpack_from(
+            f"<{stack_size}H", view, SNAPSHOT_HEADER.size)
+        self._key_events.clear()
+        self._key_events.extend(view[stack_end:events_end])
+        self._keystates[:] = map(bool, keys)
+
+        self.program_counter = program_counter
+        self.i_register = i_register
+        self.v_registers[:] = v_registers
+
+        self._delay_timer.value = delay_value
+        self._delay_timer.elapsed = delay_elapsed
+        self._sound_timer.value = sound_value
+        self._sound_timer.elapsed = sound_elapsed
+
+        self.waiting_for_key = waiting_for_key
+        self.waiting_register = waiting_register if waiting_for_key else None
+        self.cycle_count = cycle_count
+        self.instruction_unhandled = False
+        self._idle_jump = None
+
     def skip_next_instruction(self):
         """
         Sugar to skip instructions.
+
+        On XO-CHIP, this skips both halves of F000 NNNN.
         """
         self.program_increment += INSTRUCTION_LENGTH
+        if self.xo_chip and is_long_instruction(
+                self.memory, self.program_counter + INSTRUCTION_LENGTH):
+            self.program_increment += INSTRUCTION_LENGTH
+
+    def _build_dispatch_tables(self) -> None:
+        """
+        Bind per-instruction handlers into lookup tables for each family.
+
+        Family handlers pick an entry with one dict lookup instead of
+        walking a chain of comparisons, so late entries such as 8xyE
+        and Fx65 cost the same as early ones.
+        """
+        self._iiii_handlers = {
+            0xE0: self._handle_00e0,
+            0xEE: self._handle_00ee,
+        }
+        self._innn_handlers = {
+            0x1: self._handle_1nnn,
+            0x2: self._handle_2nnn,
+            0xA: self._handle_annn,
+            0xB: self._handle_bnnn,
+        }
+        self._ixkk_handlers = {
+            0x3: self._handle_3xkk,
+            0x4: self._handle_4xkk,
+            0x6: self._handle_6xkk,
+            0x7: self._handle_7xkk,
+            0xC: self._handle_cxkk,
+        }
+        self._math_handlers = {
+            0x0: self._handle_8xy0,
+            0x1: self._handle_8xy1,
+            0x2: self._handle_8xy2,
+            0x3: self._handle_8xy3,
+            0x4: self._handle_8xy4,
+            0x5: self._handle_8xy5,
+            0x6: self._handle_8xy6,
+            0x7: self._handle_8xy7,
+            0xE: self._handle_8xye,
+        }
+        # keyed by the instruction with x masked out
+        self._ixii_handlers = {
+            0xE09E: self._handle_ex9e,
+            0xE0A1: self._handle_exa1,
+            0xF007: self._handle_fx07,
+            0xF00A: self._handle_fx0a,
+            0xF015: self._handle_fx15,
+            0xF018: self._handle_fx18,
+            0xF01E: self._handle_fx1e,
+            0xF029: self._handle_fx29,
+            0xF033: self._handle_fx33,
+            0xF055: self._handle_fx55,
+            0xF065: self._handle_fx65,
+        }
+
+        if self.super_chip:
+            self._iiii_handlers.update({
+                0xFB: self._handle_00fb,
+                0xFC: self._handle_00fc,
+                0xFE: self._handle_00fe,
+                0xFF: self._handle_00ff,
+            })
+            for lo_byte in range(0xC0, 0xD0):
+                self._iiii_handlers[lo_byte] = self._handle_00cn
+            self._ixii_handlers[0xF030] = self._handle_fx30
+
+        if self.xo_chip:
+            for lo_byte in range(0xD0, 0xE0):
+                self._iiii_handlers[lo_byte] = self._handle_00dn
+            self._ixii_handlers[0xF000] = self._handle_f000
+            self._ixii_handlers[0xF001] = self._handle_fn01
 
     def handle_ixii(self):
         """
@@ -328,77 +894,100 @@ class Chip8VirtualMachine:
             - some manipulation of I register (sprites, addition)
             - bulk register save/load to/from location I in memory
         """
-        type_nibble = self.instruction_parser.type_nibble
-        lo_byte = self.instruction_parser.lo_byte
-        x = self.instruction_parser.x
-        
-        if type_nibble == 0xF:
-            
-            if lo_byte == 0x07:
-                self.v_registers[x] = self._delay_timer.value
-
-            elif lo_byte == 0x0A:  # Enter wait state until the VM gets a keypress
-                self.waiting_for_key = True
-                self.waiting_register = x
-
-            # Timers
-            elif lo_byte == 0x15:
-                self._delay_timer.value = self.v_registers[x]
-            elif lo_byte == 0x18:
-                self._sound_timer.value = self.v_registers[x]
-            
-            # I manipulation
-            elif lo_byte == 0x1E:
-                self.i_register += self.v_registers[x]
-            elif lo_byte == 0x29:  # Fx29, I = Address of digit for value in Vx
-                digit = self.v_registers[x]
-                self.i_register = self.digits_memory_location +\
-                                  (digit * DIGIT_HEIGHT)
-
-            # Store BCD of Vx at I, I+1, I+2
-            elif lo_byte == 0x33:
-                reg_value = self.v_registers[x]
-
-                ones = reg_value % 10
-                tens = ((reg_value - ones) % 100) // 10
-                hundreds = reg_value // 100
-
-                self.memory[self.i_register] = hundreds
-                self.memory[self.i_register + 1] = tens
-                self.memory[self.i_register + 2] = ones
-
-            elif lo_byte == 0x55:  # save registers to memory starting at I
-                i = self.i_register
-
-                for register in range(0, x + 1):
-                    self.memory[i + register] = self.v_registers[register]
-
-            elif lo_byte == 0x65:  # Load register from memory starting at I
-                i = self.i_register
-
-                for register in range(0, x + 1):
-                    self.v_registers[register] = self.memory[i + register]
+        instruction = self.current_instruction
+        handler = self._ixii_handlers.get(instruction.raw & 0xF0FF)
 
-            else:
-                self.instruction_unhandled = True
-        elif type_nibble == 0xE:
-            # one of the keypress skip instructions
-
-            # get the key for value in VX
-            key_pressed = self._keystates[self.v_registers[x]]
-            
-            if lo_byte == 0xA1:
-                if not key_pressed:
-                    self.skip_next_instruction()
-
-            elif lo_byte == 0x9E:
-                # skip next instruction if key in register X is pressed
-                if key_pressed:
-                    self.skip_next_instruction()
-            else:
-                self.instruction_unhandled = True
+        if handler is None:
+            self.instruction_unhandled = True
         else:
+            handler(instruction.x)
+
+    def _handle_ex9e(self, x: int) -> None:
+        # skip next instruction if key in register X is pressed
+        if self._keystates[self.v_registers[x]]:
+            self.skip_next_instruction()
+
+    def _handle_exa1(self, x: int) -> None:
+        # skip next instruction if key in register X isn't pressed
+        if not self._keystates[self.v_registers[x]]:
+            self.skip_next_instruction()
+
+    def _handle_fx07(self, x: int) -> None:
+        self.v_registers[x] = self._delay_timer.value
+
+    def _handle_fx0a(self, x: int) -> None:
+        # A key that's already down satisfies the wait right away
+        keys = self._keystates
+        if True in keys:
+            self.v_registers[x] = keys.index(True)
+            return
+
+        # Otherwise wait for press() to queue a key
+        self._key_events.clear()
+        self.waiting_for_key = True
+        self.waiting_register = x
+
+    def _handle_fx15(self, x: int) -> None:
+        self._delay_timer.value = self.v_registers[x]
+
+    def _handle_fx18(self, x: int) -> None:
+        self._sound_timer.value = self.v_registers[x]
+
+    def _handle_fx1e(self, x: int) -> None:
+        self.i_register += self.v_registers[x]
+
+    def _handle_fx29(self, x: int) -> None:
+        # I = Address of digit for value in Vx
+        digit = self.v_registers[x]
+        self.i_register = self.digits_memory_location +\
+                          (digit * DIGIT_HEIGHT)
+
+    def _handle_f000(self, x: int) -> None:
+        # F000 NNNN loads I from the 16 bits after it
+        if x != 0:
             self.instruction_unhandled = True
+            return
+
+        pc = self.program_counter
+        self.i_register = (self.memory[pc + 2] << 8) | self.memory[pc + 3]
+        self.program_increment += INSTRUCTION_LENGTH
+
+    def _handle_fn01(self, x: int) -> None:
+        self.select_planes(x)
+
+    def _handle_fx30(self, x: int) -> None:
+        # I = Address of large digit for value in Vx
+        digit = self.v_registers[x]
+        self.i_register = self.large_digits_memory_location +\
+                          (digit * LARGE_DIGIT_HEIGHT)
+
+    def _handle_fx33(self, x: int) -> None:
+        # Store BCD of Vx at I, I+1, I+2
+        reg_value = self.v_registers[x]
+
+        ones = reg_value % 10
+        tens = ((reg_value - ones) % 100) // 10
+        hundreds = reg_value // 100
+
+        self.memory[self.i_register] = hundreds
+        self.memory[self.i_register + 1] = tens
+        self.memory[self.i_register + 2] = ones
+        self._memory_written(self.i_register, self.i_register + 3)
+
+    def _handle_fx55(self, x: int) -> None:
+        # save registers to memory starting at I
+        i = self.i_register
+
+        for register in range(0, x + 1):
+            self.memory[i + register] = self.v_registers[register]
+        self._memory_written(i, i + x + 1)
+
+    def _handle_fx65(self, x: int) -> None:
+        # Load register from memory starting at I
+        i = self.i_register
+
+        for register in range(0, x + 1):
+            self.v_registers[register] = self.memory[i + register]
 
     def _handle_innn(self) -> None:
         """
@@ -408,117 +997,294 @@ class Chip8VirtualMachine:
 
         :return: None
         """
-        nnn = self.instruction_parser.nnn
-        type_nibble = self.instruction_parser.type_nibble
-
-        if type_nibble == 0xA:  # set I to nnn
-            self.i_register = nnn
+        instruction = self.current_instruction
+        self._innn_handlers[instruction.type_nibble](instruction.nnn)
 
-        elif type_nibble == 0x2:  # call instruction
-            self.program_increment = 0
-            self.stack_call(nnn)
+    def _handle_1nnn(self, nnn: int) -> None:
+        self.program_increment = 0
+        address = self.program_counter
+        if nnn == address or nnn == address - IDLE_LOOP_OFFSET:
+            self._idle_jump = address
+        self.program_counter = nnn
 
+    def _handle_2nnn(self, nnn: int) -> None:
+        self.program_increment = 0
+        self.stack_call(nnn)
 
-        elif type_nibble == 0x1 or type_nibble == 0xB:  # jump instruction
-            self.program_increment = 0
-            self.program_counter = nnn
-            if type_nibble == 0xB:  # includes a shift
-                self.program_counter += self.v_registers[0]
+    def _handle_annn(self, nnn: int) -> None:
+        self.i_register = nnn
 
-        else:
-            self.instruction_unhandled = True
+    def _handle_bnnn(self, nnn: int) -> None:
+        # jump that includes a shift
+        self.program_increment = 0
+        self.program_counter = nnn + self.v_registers[0]
 
     def handle_ixkk(self) -> None:
-        x = self.instruction_parser.x
-        kk = self.instruction_parser.kk
-        type_nibble = self.instruction_parser.type_nibble
+        instruction = self.current_instruction
+        self._ixkk_handlers[instruction.type_nibble](
+            instruction.x, instruction.kk)
 
-        if type_nibble == 0x3:
-            if self.v_registers[x] == kk:
-                self.skip_next_instruction()
+    def _handle_3xkk(self, x: int, kk: int) -> None:
+        if self.v_registers[x] == kk:
+            self.skip_next_instruction()
 
-        elif type_nibble == 0x4:
-            if self.v_registers[x] != kk:
-                self.skip_next_instruction()
+    def _handle_4xkk(self, x: int, kk: int) -> None:
+        if self.v_registers[x] != kk:
+            self.skip_next_instruction()
 
-        elif type_nibble == 0x6:
-            self.v_registers[x] = kk
+    def _handle_6xkk(self, x: int, kk: int) -> None:
+        self.v_registers[x] = kk
 
-        elif type_nibble == 0x7:
-            self.v_registers[x] = (self.v_registers[x] + kk) % 0x100
+    def _handle_7xkk(self, x: int, kk: int) -> None:
+        self.v_registers[x] = (self.v_registers[x] + kk) % 0x100
 
-        elif type_nibble == 0xC:
-            self.v_registers[x] = randrange(0, 0xFF) & kk
+    def _handle_cxkk(self, x: int, kk: int) -> None:
+        self.v_registers[x] = randrange(0, 0xFF) & kk
 
-        else:
+    def _handle_math(self):
+        instruction = self.current_instruction
+        handler = self._math_handlers.get(instruction.n)
+
+        if handler is None:
             self.instruction_unhandled = True
+        else:
+            handler(instruction.x, instruction.y)
 
-    def _handle_math(self):
-        x = self.instruction_parser.x
-        y = self.instruction_parser.y
-        lo_nibble = self.instruction_parser.lo_byte & 0xF
+    def _handle_8xy0(self, x: int, y: int) -> None:
+        # register assignment
+        self.v_registers[x] = self.v_registers[y]
+
+    def _handle_8xy1(self, x: int, y: int) -> None:
+        self.v_registers[x] = self.v_registers[x] | self.v_registers[y]
 
-        if lo_nibble == 0:  # register assignment
-            self.v_registers[x] = self.v_registers[y]
+    def _handle_8xy2(self, x: int, y: int) -> None:
+        self.v_registers[x] = self.v_registers[x] & self.v_registers[y]
 
-        elif lo_nibble == 0x1:
-            self.v_registers[x] = self.v_registers[x] | self.v_registers[y]
+    def _handle_8xy3(self, x: int, y: int) -> None:
+        self.v_registers[x] = self.v_registers[x] ^ self.v_registers[y]
 
-        elif lo_nibble == 0x2:
-            self.v_registers[x] = self.v_registers[x] & self.v_registers[y]
+    def _handle_8xy4(self, x: int, y: int) -> None:
+        unclamped_sum = self.v_registers[x] + self.v_registers[y]
 
-        elif lo_nibble == 0x3:
-            self.v_registers[x] = self.v_registers[x] ^ self.v_registers[y]
+        # store the result, masking anything higher than 256
+        # to imitate rollover. may be faster than modulo.
+        self.v_registers[x] = unclamped_sum & 0xFF
+        # set vf to 1 if the operation overflowed
+        self.v_registers[0xF] = int(unclamped_sum > 255)
 
-        elif lo_nibble == 0x4:
-            unclamped_sum = self.v_registers[x] + self.v_registers[y]
+    def _handle_8xy5(self, x: int, y: int) -> None:
+        unclamped_diff = self.v_registers[x] - self.v_registers[y]
 
-            # store the result, masking anything higher than 256
-            # to imitate rollover. may be faster than modulo.
-            self.v_registers[x] = unclamped_sum & 0xFF
-            # set vf to 1 if the operation overflowed
-            self.v_registers[0xF] = int(unclamped_sum > 255)
+        # store the difference clamped to 0 as the minimum
+        self.v_registers[x] = max(unclamped_diff, 0)
 
-        elif lo_nibble == 0x5:
-            unclamped_diff = self.v_registers[x] - self.v_registers[y]
+        # set VF to 1 if a borrow didn't occur, otherwise 0
+        self.v_registers[0xF] = int(unclamped_diff >= 0)
 
-            # store the difference clamped to 0 as the minimum
-            self.v_registers[x] = max(unclamped_diff, 0)
+    def _handle_8xy6(self, x: int, y: int) -> None:
+        # vx = vy >> 1, vf = least bit of vy
 
-            # set VF to 1 if a borrow didn't occur, otherwise 0
-            self.v_registers[0xF] = int(unclamped_diff >= 0)
+        # we need to store the least bit ahead of time because
+        # x could == y and both could be 0xF.
+        y_val = self.v_registers[y]
 
-        elif lo_nibble == 0x6:  # vx = vy >> 1, vf = least bit of vy
+        self.v_registers[x] = y_val >> 1
+        self.v_registers[0xF] = y_val & 1
 
-            # we need to store the least bit ahead of time because
-            # x could == y and both could be 0xF.
-            y_val = self.v_registers[y]
+    def _handle_8xy7(self, x: int, y: int) -> None:
+        unclamped_diff = self.v_registers[y] - self.v_registers[x]
 
-            self.v_registers[x] = y_val >> 1
-            self.v_registers[0xF] = y_val & 1
+        # store the difference clamped to 0 as the minimum
+        self.v_registers[x] = max(unclamped_diff, 0)
 
-        elif lo_nibble == 0x7:
-            unclamped_diff = self.v_registers[y] - self.v_registers[x]
+        # set VF to 1 if a borrow didn't occur, otherwise 0
+        self.v_registers[0xF] = int(unclamped_diff >= 0)
 
-            # store the difference clamped to 0 as the minimum
-            self.v_registers[x] = max(unclamped_diff, 0)
+    def _handle_8xye(self, x: int, y: int) -> None:
+        # vx = vy << 1, vf = greatest bit of vy
 
-            # set VF to 1 if a borrow didn't occur, otherwise 0
-            self.v_registers[0xF] = int(unclamped_diff >= 0)
+        # we need to store the least bit ahead of time because
+        # x could == y and both could be 0xF.
+        y_val = self.v_registers[y]
 
-        elif lo_nibble == 0xE:  # vx = vy << 1, vf = greatest bit of vy
+        self.v_registers[x] = (y_val << 1) & 0xFF
+        self.v_registers[0xF] = (y_val >> 7) & 1
 
-            # we need to store the least bit ahead of time because
-            # x could == y and both could be 0xF.
-            y_val = self.v_registers[y]
+    def _handle_iiii(self) -> None:
+        """
+        Execute 0 type nibble instructions, clearing and returning.
+        """
+        instruction = self.current_instruction
 
-            self.v_registers[x] = (y_val << 1) & 0xFF
-            self.v_registers[0xF] = (y_val >> 7) & 1
+        # don't need hi byte, all base chip 8 IIII
+        # instructions have 00 hi byte
+        handler = self._iiii_handlers.get(instruction.lo_byte)
 
+        if handler is None:
+            self.instruction_unhandled = True
+        else:
+            handler()
 
+    def _handle_00e0(self) -> None:
+        if self.xo_chip:
+            for plane in self._selected_video_planes:
+                plane.clear_screen()
         else:
+            self.video_ram.clear_screen()
+
+    def _handle_00ee(self) -> None:
+        self.stack_return()
+
+    def _handle_00cn(self) -> None:
+        lines = self.current_instruction.n
+        for plane in self._selected_video_planes:
+            plane.scroll_down(lines)
+
+    def _handle_00dn(self) -> None:
+        lines = self.current_instruction.n
+        for plane in self._selected_video_planes:
+            plane.scroll_up(lines)
+
+    def _handle_00fb(self) -> None:
+        for plane in self._selected_video_planes:
+            plane.scroll_right(4)
+
+    def _handle_00fc(self) -> None:
+        for plane in self._selected_video_planes:
+            plane.scroll_left(4)
+
+    def _handle_00fe(self) -> None:
+        self.set_high_resolution(False)
+
+    def _handle_00ff(self) -> None:
+        self.set_high_resolution(True)
+
+    def _handle_ixyi(self) -> None:
+        """
+        Execute the 5xy0 and 9xy0 register comparison skips.
+
+        On XO-CHIP, this also runs 5xy2 and 5xy3.
+        """
+        instruction = self.current_instruction
+        x = instruction.x
+        y = instruction.y
+
+        if self.xo_chip and instruction.type_nibble == 0x5 \
+                and instruction.n in (2, 3):
+            self._save_load_range(x, y, instruction.n == 2)
+
+        elif instruction.n != 0:
             self.instruction_unhandled = True
 
+        elif instruction.type_nibble == 0x5:
+            if self.v_registers[x] == self.v_registers[y]:
+                self.skip_next_instruction()
+
+        elif self.v_registers[x] != self.v_registers[y]:
+            self.skip_next_instruction()
+
+    def _save_load_range(self, x: int, y: int, save: bool) -> None:
+        """
+        Copy Vx through Vy to or from memory at I, leaving I alone.
+
+        y may be below x, in which case the registers go in reverse.
+
+        :param save: True to write the registers to memory, as 5xy2 does
+        """
+        registers = range(x, y + 1) if x <= y else range(x, y - 1, -1)
+        start = self.i_register
+        end = start + len(registers)
+        if end > len(self.memory):
+            raise IndexError(
+                f"Register range at {start:#06x} ends past end of memory")
+
+        if save:
+            self.memory[start:end] = bytes(
+                self.v_registers[r] for r in registers)
+            self._memory_written(start, end)
+        else:
+            for r, value in zip(registers, self.memory[start:end]):
+                self.v_registers[r] = value
+
+    def _handle_ixyn(self) -> None:
+        """
+        Execute Dxyn, drawing a sprite and setting VF on collision.
+        """
+        instruction = self.current_instruction
+
+        if self.xo_chip:
+            self.v_registers[0xF] = int(self.draw_plane_sprite(
+                self.v_registers[instruction.x],
+                self.v_registers[instruction.y],
+                instruction.n,
+                self.i_register
+            ))
+            return
+
+        if instruction.n == 0 and self.super_chip:
+            self.v_registers[0xF] = int(self.draw_large_sprite(
+                self.v_registers[instruction.x],
+                self.v_registers[instruction.y],
+                self.i_register
+            ))
+            return
+
+        self.v_registers[0xF] = int(
+            self.video_ram.draw_sprite(
+                self.v_registers[instruction.x],
+                self.v_registers[instruction.y],
+                self.memory,
+                num_bytes=instruction.n,
+                offset=self.i_register
+            )
+        )
+
+    def draw_large_sprite(self, x: int, y: int, offset: int) -> bool:
+        """
+        Draw the sprite SUPER-CHIP's Dxy0 draws, returning any collision.
+
+        It's 16x16, two bytes per line, in high resolution, and 8x16
+        otherwise.
+
+        :param x: the x-position to draw at
+        :param y: the y-position to draw at
+        :param offset: where the sprite starts in memory
+        :return: whether any pixels were unset
+        """
+        if self._high_resolution:
+            return self.video_ram.draw_wide_sprite(
+                x, y, self.memory, offset=offset)
+
+        return self.video_ram.draw_sprite(
+            x, y, self.memory, num_bytes=16, offset=offset)
+
+    def draw_plane_sprite(
+            self, x: int, y: int, num_lines: int, offset: int) -> bool:
+        """
+        Draw the sprite XO-CHIP's Dxyn draws to each selected plane.
+
+        Each plane's data follows the previous plane's. When num_lines
+        is 0, each is a 16x16 sprite, even in low resolution.
+
+        :param x: the x-position to draw at
+        :param y: the y-position to draw at
+        :param num_lines: n from Dxyn
+        :param offset: where the first plane's sprite starts in memory
+        :return: whether any pixels were unset on any plane
+        """
+        memory = self.memory
+        unset = False
+
+        for plane in self._selected_video_planes:
+            if num_lines:
+                unset |= plane.draw_sprite(
+                    x, y, memory, num_bytes=num_lines, offset=offset)
+                offset += num_lines
+            else:
+                unset |= plane.draw_wide_sprite(x, y, memory, offset=offset)
+                offset += 32
+
+        return unset
 
     def stack_return(self) -> None:
         """
@@ -568,79 +1334,16 @@ class Chip8VirtualMachine:
         self.program_increment = INSTRUCTION_LENGTH
         self.instruction_unhandled = False
 
-
         # start interpretation
-        self.instruction_parser.decode(self.memory, self.program_counter)
-
-        pattern = self.instruction_parser.pattern
-
-        if pattern == PATTERN_IXII:
-            self.handle_ixii()
-
-        elif pattern == PATTERN_INNN:
-            self._handle_innn()
-
-        elif pattern == PATTERN_IXKK:
-            self.handle_ixkk()
-
-        elif pattern == PATTERN_IIII:
-            # don't need hi byte, all base chip 8 IIII
-            # instructions have 00 hi byte
-            lo_byte = self.instruction_parser.lo_byte
-
-            if lo_byte == 0xEE:
-                self.stack_return()
-
-            elif lo_byte == 0xE0:
-                self.video_ram.clear_screen()
-
-            else:
-                self.instruction_unhandled = True
-
-        elif pattern == PATTERN_IXYI:
-
-            type_nibble = self.instruction_parser.type_nibble
-
-            if type_nibble == 0x8:
-                self._handle_math()
-
-            else:
-                x = self.instruction_parser.x
-                y = self.instruction_parser.y
-                end_nibble = self.instruction_parser.lo_byte & 0xF
-
-                if type_nibble == 0x5 and end_nibble == 0:
-                    if self.v_registers[x] == self.v_registers[y]:
-                        self.skip_next_instruction()
-
-                elif type_nibble == 0x9 and end_nibble == 0:
-                    if self.v_registers[x] != self.v_registers[y]:
-                        self.skip_next_instruction()
-
-                else:
-                    self.instruction_unhandled = True
-
-        elif pattern == PATTERN_IXYN:
-
-            x = self.instruction_parser.x
-            y = self.instruction_parser.y
-            n = self.instruction_parser.n
-
-            self.v_registers[0xF] = int(
-                self.video_ram.draw_sprite(
-                    self.v_registers[x],
-                    self.v_registers[y],
-                    self.memory,
-                    num_bytes=n,
-                    offset=self.i_register
-                )
-            )
+        memory = self.memory
+        pc = self.program_counter
+        instruction = self._decode_table[(memory[pc] << 8) | memory[pc + 1]]
+        self.current_instruction = instruction
 
-        else:
-            self.instruction_unhandled = True
+        self._handlers[instruction.handler]()
 
         if self.instruction_unhandled:
-            raise ValueError(
+            raise UnhandledInstructionError(
                 f"Unrecognized instruction "
                 f"{self.dump_current_pc_instruction_raw()}"
             )
@@ -659,29 +1362,414 @@ class Chip8VirtualMachine:
         """
 
         # Advance timers, happens even when waiting for keypress.
-        dt = dt or self.tick_length
-        
-        self._delay_timer.tick(dt)
-        self._sound_timer.tick(dt)
-        
-#        self.waiting_for_key = False
-#        self.waiting_register = None
-#        self._keystates = [False] * 16  # Whether each key is down
-
-        # this is crude and only registers the first keypress
-        # numerically. in the future an event queueing method may be
-        # better for this. YAGNI applies for now though.
-        if self.waiting_for_key:
-            keys = self._keystates
-            if self.waiting_register != None:
-                pressed_indices = [i for i, v in enumerate(keys) if v]
-                if pressed_indices:
-                    self.v_registers[self.waiting_register] = pressed_indices[0]
-                    self.waiting_for_key = False
-
-        # check again because we might have had a keypress happen
-        if not self.waiting_for_key:
-           self.execute_instruction()
+        self._advance_timers(self._dt_to_cycles(dt))
+        self.cycle_count += 1
+
+        if not self._still_waiting_for_key():
+           self._execute_next()
+
+    def run_frame(self) -> StopReason:
+        """
+        Run until the end of the current frame.
+
+        Frames are ticks_per_frame cycles long, counted from VM creation,
+        so a frame cut short by a breakpoint can be finished by calling
+        this again.
+
+        :return: FRAME_END, or whatever stopped the run early
+        """
+        ticks_per_frame = self.ticks_per_frame
+        reason = self.run_cycles(
+            ticks_per_frame - (self.cycle_count % ticks_per_frame))
+
+        if reason == StopReason.CYCLE_LIMIT:
+            return StopReason.FRAME_END
+        return reason
+
+    def run_cycles(self, num_cycles: int) -> StopReason:
+        """
+        Run up to num_cycles instructions in a tight loop.
+
+        The result is the same as calling tick num_cycles times with the
+        default dt, but much cheaper. Timers are only touched when an
+        instruction is due to see a 60hz decrement, and the key wait and
+        breakpoint checks are folded into the loop.
+
+        Waiting for a key idles through the rest of the cycles, so
+        timers keep running, then returns KEY_WAIT. Breakpoints aren't
+        checked for the first instruction, which lets a VM stopped on
+        one be resumed.
+
+        Idle loops are skipped rather than run when no breakpoints are
+        set. A jump to itself idles the rest of the cycles and returns
+        HALTED. A loop spinning on the delay timer, Fx07 then 3x00 then
+        a jump back to the Fx07, jumps to its last iteration at once.
+
+        :param num_cycles: the most cycles to run
+        :return: why the run stopped
+        """
+        if self.waiting_for_key and self._still_waiting_for_key():
+            self._advance_timers(num_cycles)
+            self.cycle_count += num_cycles
+            return StopReason.KEY_WAIT
+
+        self._idle_jump = None
+        if self._jit is not None and not self.breakpoints:
+            return self._run_blocks(num_cycles)
+
+        reason = StopReason.CYCLE_LIMIT
+        execute = self._execute_next
+        breakpoints = self.breakpoints
+
+        # timers are only brought up to date when an instruction might
+        # see a decrement. synced is how far they've been advanced.
+        executed = 0
+        synced = 0
+        deadline = self._cycles_until_timer_decrement()
+
+        try:
+            while executed < num_cycles:
+                if breakpoints and executed \
+                        and self.program_counter in breakpoints:
+                    reason = StopReason.BREAKPOINT
+                    break
+
+                if executed + 1 >= deadline:
+                    self._advance_timers(executed + 1 - synced)
+                    synced = executed + 1
+                    deadline = synced + self._cycles_until_timer_decrement()
+
+                execute()
+                executed += 1
+
+                if self.waiting_for_key and self._still_waiting_for_key():
+                    executed = num_cycles
+                    reason = StopReason.KEY_WAIT
+
+                elif self._idle_jump is not None and not breakpoints:
+                    if self.halted:
+                        executed = num_cycles
+                        reason = StopReason.HALTED
+                        break
+
+                    self._advance_timers(executed - synced)
+                    executed += self._skip_delay_loop(num_cycles - executed)
+                    synced = executed
+                    deadline = synced + self._cycles_until_timer_decrement()
+
+        except UnhandledInstructionError:
+            reason = StopReason.UNHANDLED
+
+        finally:
+            self._advance_timers(executed - synced)
+            self.cycle_count += executed
+
+        return reason
+
+    def _run_blocks(self, num_cycles: int) -> StopReason:
+        """
+        The run_cycles loop for JIT mode, advancing timers per block.
+        """
+        reason = StopReason.CYCLE_LIMIT
+        execute_block = self.execute_block
+
+        executed = 0
+        synced = 0
+        deadline = self._cycles_until_timer_decrement()
+        block_start = None
+
+        try:
+            while executed < num_cycles:
+                # only the first instruction of a block may touch timers
+                if executed + 1 >= deadline:
+                    self._advance_timers(executed + 1 - synced)
+                    synced = executed + 1
+                    deadline = synced + self._cycles_until_timer_decrement()
+
+                block_start = self.program_counter
+                executed += execute_block(num_cycles - executed)
+                block_start = None
+
+                if self.waiting_for_key and self._still_waiting_for_key():
+                    executed = num_cycles
+                    reason = StopReason.KEY_WAIT
+
+                elif self._idle_jump is not None:
+                    if self.halted:
+                        executed = num_cycles
+                        reason = StopReason.HALTED
+                        break
+
+                    self._advance_timers(executed - synced)
+                    executed += self._skip_delay_loop(num_cycles - executed)
+                    synced = executed
+                    deadline = synced + self._cycles_until_timer_decrement()
+
+        except UnhandledInstructionError:
+            reason = StopReason.UNHANDLED
+
+        except Exception:
+            # count what a block finished before the instruction that raised
+            if block_start is not None:
+                executed += self._instructions_since(block_start)
+            raise
+
+        finally:
+            self._advance_timers(executed - synced)
+            self.cycle_count += executed
+
+        return reason
+
+    def tick_block(self, dt: float = None) -> int:
+        """
+        Like tick, but runs a whole compiled block in JIT mode.
+
+        Timers advance by dt once per instruction executed, the same as
+        calling tick that many times. Outside of JIT mode, this is the
+        same as tick.
+
+        :param dt: float, how long each instruction takes to execute.
+        :return: how many instructions were executed or waited through
+        """
+        self._advance_timers(self._dt_to_cycles(dt))
+
+        if self._still_waiting_for_key():
+            self.cycle_count += 1
+            return 1
+
+        block_start = self.program_counter
+        try:
+            num_executed = self.execute_block()
+        except Exception:
+            # count the instruction which raised, as tick would
+            num_executed = self._instructions_since(block_start) + 1
+            raise
+        finally:
+            self._advance_timers(self._dt_to_cycles(dt, num_executed - 1))
+            self.cycle_count += num_executed
+
+        return num_executed
+
+    def execute_block(self, max_instructions: int = None) -> int:
+        """
+        Execute the compiled block at the program counter.
+
+        Like execute_instruction, this doesn't advance timers. Blocks only
+        touch timers in their first instruction, so the caller can
+        advance them once for the block as a whole.
+
+        Falls back to executing one instruction when not in JIT mode, when
+        the instruction at the program counter can't be compiled, or when
+        the block is longer than max_instructions.
+
+        :param max_instructions: the most instructions to execute
+        :return: how many instructions were executed
+        """
+        jit = self._jit
+        block = jit.lookup(self.program_counter) if jit else None
+
+        if block is None or (
+                max_instructions and block.length > max_instructions):
+            self._execute_next()
+            return 1
+
+        block.run(self)
+        return block.length
+
+    def _instructions_since(self, block_start: int) -> int:
+        """
+        How many instructions a block finished before raising.
+
+        Blocks are straight-line code and leave the program counter on
+        the instruction which raised.
+        """
+        return (self.program_counter - block_start) // INSTRUCTION_LENGTH
+
+    @property
+    def halted(self) -> bool:
+        """
+        True when the program counter is on a jump to itself.
+
+        A halted program can't change anything but its timers until a
+        frontend changes its state from outside.
+        """
+        pc = self.program_counter
+        memory = self.memory
+        return pc + 1 < len(memory) \
+            and memory[pc] == 0x10 | (pc >> 8) \
+            and memory[pc + 1] == pc & 0xFF
+
+    def _skip_delay_loop(self, max_cycles: int) -> int:
+        """
+        Skip the iterations of a delay timer spin loop that can't exit.
+
+        The loop must start at the program counter, and timers must be
+        up to date. Vx and the timers are left as if the skipped
+        iterations had run, so the next one is the first to see the
+        delay timer at zero, or the last to fit in max_cycles.
+
+        :param max_cycles: the most cycles to skip
+        :return: how many cycles were skipped
+        """
+        self._idle_jump = None
+        pc = self.program_counter
+        memory = self.memory
+        x = memory[pc] & 0xF
+
+        if bytes(memory[pc:pc + 6]) != bytes((
+            0xF0 | x, 0x07,
+            0x30 | x, 0x00,
+            0x10 | (pc >> 8), pc & 0xFF
+        )):
+            return 0
+
+        # each iteration is 3 cycles, and reads the timer on its first
+        delay_timer = self._delay_timer
+        iterations = min(
+            (delay_timer.cycles_until_zero() + 1) // 3,
+            max_cycles // 3
+        )
+        if not iterations:
+            return 0
+
+        skipped = 3 * iterations
+        self.v_registers[x] = delay_timer.value_after(skipped - 2)
+        self._advance_timers(skipped)
+        return skipped
+
+    def _dt_to_cycles(self, dt: Optional[float], num_ticks: int = 1) -> int:
+        """
+        Convert tick lengths in seconds to whole timer cycles.
+
+        The fraction of a cycle lost to rounding is carried into the
+        next call, so timers don't drift when dt isn't a whole number
+        of cycles.
+
+        :param dt: a time step, or None for the default tick length
+        :param num_ticks: how many ticks of length dt to convert
+        :return: the number of cycles they cover
+        """
+        if dt is None:
+            return num_ticks
+        cycles = (
+            dt * self.ticks_per_second * num_ticks + self._cycle_remainder
+        )
+        num_cycles = round(cycles)
+        self._cycle_remainder = cycles - num_cycles
+        return num_cycles
+
+    def _cycles_until_timer_decrement(self) -> int:
+        """
+        Return which upcoming cycle will decrement the timers, from 1.
+        """
+        # both timers are always advanced together, so they share a phase
+        return self._delay_timer.cycles_until_decrement()
+
+    def _advance_timers(self, num_cycles: int) -> None:
+        """
+        Advance both timers by num_cycles cycles in constant time.
+
+        :param num_cycles: how many cycles to advance by
+        """
+        if num_cycles > 0:
+            self._delay_timer.advance(num_cycles)
+            self._sound_timer.advance(num_cycles)
+
+    @property
+    def blocked_on_input(self) -> bool:
+        """
+        True when the VM can't run until a key is pressed.
+
+        Ticking a blocked VM only advances its timers, so a scheduler
+        can leave it alone until press() is called.
+        """
+        return self.waiting_for_key and not self._key_events
+
+    def _still_waiting_for_key(self) -> bool:
+        """
+        Resolve a pending Fx0A if a key was pressed while waiting.
+
+        :return: whether execution should stay paused
+        """
+        if self.waiting_for_key and self._key_events:
+            self.v_registers[self.waiting_register] = \
+                self._key_events.popleft()
+            self._key_events.clear()
+            self.waiting_for_key = False
+
+        return self.waiting_for_key
+
+    def execute_predecoded(self) -> None:
+        """
+        Execute the instruction at the program counter as a closure.
+
+        The closure is built on the first visit to an address and reused
+        until memory under it is written through the VM.
+        """
+        pc = self.program_counter
+        step = self._predecoded[pc]
+
+        if step is None:
+            step = self._predecoded[pc] = build_step(self, pc)
+
+        step()
+
+    def _memory_written(self, start: int, end: int) -> None:
+        """
+        Invalidate anything derived from memory in [start, end).
+
+        Everything that writes to memory on the VM's behalf must call
+        this afterward.
+
+        :param start: the first address written
+        :param end: one past the last address written
+        """
+        dirty_pages = self._dirty_pages
+        if dirty_pages is not None and end > start:
+            dirty_pages.update(range(
+                start // MEMORY_PAGE_SIZE,
+                (end - 1) // MEMORY_PAGE_SIZE + 1
+            ))
+
+        if self.xo_chip:
+            # skips and F000 NNNN also read the two bytes after them
+            start = max(start - INSTRUCTION_LENGTH, 0)
+
+        predecoded = self._predecoded
+        if predecoded is not None:
+            # instructions starting one byte early overlap the write too
+            start = max(start - 1, 0)
+            end = min(end, len(predecoded))
+            predecoded[start:end] = [None] * (end - start)
+
+        if self._jit is not None:
+            self._jit.invalidate(start, end)
+
+    @property
+    def tracks_dirty_pages(self) -> bool:
+        return self._dirty_pages is not None
+
+    @property
+    def dirty_pages(self) -> FrozenSet[int]:
+        """
+        Indices of the memory pages written since the last clear.
+
+        Page n covers addresses n * MEMORY_PAGE_SIZE up to the next
+        page. Always empty unless the VM was built with
+        track_dirty_pages=True.
+
+        :return: the dirty page indices
+        """
+        if self._dirty_pages is None:
+            return frozenset()
+        return frozenset(self._dirty_pages)
+
+    def clear_dirty_pages(self) -> None:
+        """
+        Mark every memory page clean, as a checkpoint for dirty_pages.
+        """
+        if self._dirty_pages is not None:
+            self._dirty_pages.clear()
 
     def dump_current_pc_instruction_raw(self) -> str:
         """
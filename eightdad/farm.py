@@ -0,0 +1,273 @@
+"""
+Run whole collections of ROMs headlessly across every core.
+
+Each ROM runs in its own worker process for a fixed cycle budget, and
+comes back as a FarmResult. It's meant for checking a ROM collection
+still behaves after changes to the interpreter, without opening a
+window per ROM:
+
+    eightdad-farm --frames 600 path/to/roms/
+
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from eightdad.core import Chip8VirtualMachine
+from eightdad.core.vm import ExecutionMode, StopReason, upper_hex
+from eightdad.frontend.common.util import PathOrStr, load_rom_to_vm
+from eightdad.frontend.headless import run_headless
+
+
+# file extensions picked up when searching directories for ROMs
+ROM_SUFFIXES = (".ch8", ".c8", ".rom")
+
+
+@dataclass
+class FarmJob:
+    rom_path: str
+    max_cycles: Optional[int] = None
+    max_frames: Optional[int] = None
+    execution_mode: ExecutionMode = ExecutionMode.JIT
+    super_chip: bool = False
+    xo_chip: bool = False
+
+
+@dataclass
+class FarmResult:
+    rom_path: str
+    cycles: int = 0
+    stop_reason: Optional[StopReason] = None
+    unhandled_instruction: Optional[int] = None
+    unhandled_address: Optional[int] = None
+    framebuffer_hash: Optional[str] = None
+    seconds: float = 0.0
+    error: Optional[str] = None  # why the ROM couldn't be run, or crashed
+    error_address: Optional[int] = None  # where it crashed, if it did
+
+    @property
+    def ok(self) -> bool:
+        """
+        False if the ROM couldn't be loaded, crashed the VM or hit an
+        unhandled instruction.
+        """
+        return self.error is None \
+            and self.stop_reason != StopReason.UNHANDLED
+
+    def to_dict(self) -> dict:
+        """
+        Return the result as a dict of JSON-friendly values.
+        """
+        result = asdict(self)
+        if self.stop_reason is not None:
+            result["stop_reason"] = self.stop_reason.name
+        return result
+
+
+def find_roms(paths: Iterable[PathOrStr]) -> List[Path]:
+    """
+    Expand files and directories into a sorted list of ROM files.
+
+    Files are used as given, while directories contribute the files
+    directly inside them with a suffix in ROM_SUFFIXES.
+
+    :param paths: files and directories to search
+    :return: ROM file paths, without duplicates
+    """
+    found = set()
+
+    for raw_path in paths:
+        path = Path(raw_path)
+        if path.is_dir():
+            found.update(
+                child for child in path.iterdir()
+                if child.is_file() and child.suffix.lower() in ROM_SUFFIXES
+            )
+        else:
+            found.add(path)
+
+    return sorted(found)
+
+
+def run_job(job: FarmJob) -> FarmResult:
+    """
+    Run a single ROM headlessly, as a worker process would.
+
+    Errors loading the ROM, and anything the VM raises while running
+    it, are reported in the result's error field rather than raised.
+
+    :param job: which ROM to run, and for how long
+    :return: what happened
+    """
+    result = FarmResult(job.rom_path)
+
+    try:
+        vm = load_rom_to_vm(
+            job.rom_path,
+            Chip8VirtualMachine(
+                execution_mode=job.execution_mode,
+                super_chip=job.super_chip,
+                xo_chip=job.xo_chip
+            )
+        )
+    except (IOError, IndexError) as e:
+        result.error = f"Could not load rom: {e!r}"
+        return result
+
+    max_cycles = job.max_cycles
+    if job.max_frames is not None:
+        max_cycles = job.max_frames * vm.ticks_per_frame
+
+    start_time = time.perf_counter()
+    try:
+        headless = run_headless(vm, max_cycles)
+    except Exception as e:
+        # a bad ROM shouldn't take the rest of the farm down with it
+        result.error = f"Crashed: {e!r}"
+        result.error_address = vm.program_counter
+        result.cycles = vm.cycle_count
+        return result
+    finally:
+        result.seconds = time.perf_counter() - start_time
+
+    result.cycles = headless.cycles
+    result.stop_reason = headless.stop_reason
+    result.framebuffer_hash = headless.framebuffer_hash
+
+    if headless.stop_reason == StopReason.UNHANDLED:
+        pc = vm.program_counter
+        memory = vm.memory
+        result.unhandled_address = pc
+        result.unhandled_instruction = (memory[pc] << 8) | memory[pc + 1]
+
+    return result
+
+
+def run_farm(
+        rom_paths: Iterable[PathOrStr],
+        max_cycles: Optional[int] = None,
+        max_frames: Optional[int] = None,
+        execution_mode: ExecutionMode = ExecutionMode.JIT,
+        max_workers: Optional[int] = None,
+        super_chip: bool = False,
+        xo_chip: bool = False
+) -> List[FarmResult]:
+    """
+    Run each ROM for a budget of cycles or frames in a pool of processes.
+
+    Exactly one of max_cycles and max_frames should be passed. A ROM
+    that halts or waits for a key with no input coming stops early.
+
+    :param rom_paths: the ROM files to run
+    :param max_cycles: the most cycles to run each ROM for
+    :param max_frames: the most frames to run each ROM for
+    :param execution_mode: how each VM should execute instructions
+    :param max_workers: how many processes to use, all cores by default
+    :param super_chip: whether the VMs run SUPER-CHIP instructions
+    :param xo_chip: whether the VMs run XO-CHIP instructions
+    :return: one result per ROM, in the same order as rom_paths
+    """
+    if (max_cycles is None) == (max_frames is None):
+        raise ValueError("Pass exactly one of max_cycles and max_frames")
+
+    jobs = [
+        FarmJob(
+            str(path), max_cycles, max_frames, execution_mode,
+            super_chip, xo_chip
+        )
+        for path in rom_paths
+    ]
+    if not jobs:
+        return []
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run_job, jobs))
+
+
+def format_result(result: FarmResult) -> str:
+    """
+    Return a one line summary of a result.
+    """
+    if result.error is not None:
+        line = f"{result.rom_path}: ERROR {result.error}"
+        if result.error_address is not None:
+            line += f" @ 0x{upper_hex(result.error_address)}"
+        return line
+
+    line = (
+        f"{result.rom_path}: {result.stop_reason.name}"
+        f" cycles={result.cycles}"
+        f" seconds={result.seconds:.3f}"
+        f" framebuffer={result.framebuffer_hash}"
+    )
+    if result.unhandled_address is not None:
+        line += (
+            f" unhandled=0x{upper_hex(result.unhandled_instruction)}"
+            f" @ 0x{upper_hex(result.unhandled_address)}"
+        )
+    return line
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='Run a collection of Chip-8 ROMs without a display')
+    parser.add_argument(
+        'paths', nargs='+',
+        help="ROM files, or directories containing them")
+
+    budget = parser.add_mutually_exclusive_group(required=True)
+    budget.add_argument(
+        '-c', '--cycles', type=int, help="Run each ROM this many cycles")
+    budget.add_argument(
+        '-f', '--frames', type=int, help="Run each ROM this many frames")
+
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help="How many worker processes to use, all cores by default")
+    parser.add_argument(
+        '-m', '--mode', type=str.upper, default=ExecutionMode.JIT.name,
+        choices=[mode.name for mode in ExecutionMode],
+        help="Which execution mode to run the VMs in")
+    parser.add_argument(
+        '-S', '--super-chip', action='store_true',
+        help="Run SUPER-CHIP instructions")
+    parser.add_argument(
+        '-X', '--xo-chip', action='store_true',
+        help="Run XO-CHIP instructions and use 64KB of memory")
+    parser.add_argument(
+        '--json', action='store_true',
+        help="Print one JSON object per ROM instead of text")
+
+    return parser
+
+
+def main() -> None:
+    args = build_arg_parser().parse_args()
+
+    results = run_farm(
+        find_roms(args.paths),
+        max_cycles=args.cycles,
+        max_frames=args.frames,
+        execution_mode=ExecutionMode[args.mode],
+        max_workers=args.jobs,
+        super_chip=args.super_chip,
+        xo_chip=args.xo_chip
+    )
+
+    for result in results:
+        if args.json:
+            print(json.dumps(result.to_dict()))
+        else:
+            print(format_result(result))
+
+    if not all(result.ok for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Run many short jobs against copies of one preloaded VM.
+
+Starting a process, importing everything and building a VM can take
+longer than a short fuzzing or input search job itself. A ForkServer
+does that once: it holds a VM with the ROM loaded, and possibly run
+past its boot code, then forks a child per job. Each child starts with
+a copy-on-write copy of that VM, runs the job on it and sends the result
+back over a pipe. The server's own VM is never changed.
+
+    server = ForkServer(load_warm_vm("game.ch8", boot_frames=60))
+    results = server.map(
+        lambda vm, inputs: run_headless(vm, 600, inputs),
+        candidate_input_scripts
+    )
+
+Jobs don't need to be picklable since they're inherited by the child,
+but their results must be. This needs os.fork(), so it's unavailable
+on Windows, and shouldn't be used from a process running other threads.
+
+"""
+import os
+import pickle
+from collections import deque
+from typing import Callable, Deque, Iterable, List, Tuple, TypeVar
+
+from eightdad.core import Chip8VirtualMachine
+from eightdad.core.vm import ExecutionMode
+from eightdad.frontend.common.util import PathOrStr, load_rom_to_vm
+
+
+Item = TypeVar("Item")
+Result = TypeVar("Result")
+
+Job = Callable[[Chip8VirtualMachine, Item], Result]
+
+
+def load_warm_vm(
+        rom_path: PathOrStr,
+        boot_frames: int = 0,
+        execution_mode: ExecutionMode = ExecutionMode.JIT,
+        super_chip: bool = False,
+        xo_chip: bool = False
+) -> Chip8VirtualMachine:
+    """
+    Build a VM with a ROM loaded, and optionally run it for a while.
+
+    In JIT mode, the blocks compiled while booting are inherited by
+    every forked child too.
+
+    :param rom_path: the ROM file to load
+    :param boot_frames: how many frames to run before returning
+    :param execution_mode: how the VM should execute instructions
+    :param super_chip: whether the VM runs SUPER-CHIP instructions
+    :param xo_chip: whether the VM runs XO-CHIP instructions, implying
+                    super_chip
+    :return: the VM
+    """
+    vm = load_rom_to_vm(
+        rom_path,
+        Chip8VirtualMachine(
+            execution_mode=execution_mode,
+            super_chip=super_chip,
+            xo_chip=xo_chip
+        )
+    )
+    vm.run_cycles(boot_frames * vm.ticks_per_frame)
+    return vm
+
+
+class ForkServer:
+    """
+    Forks a copy of a warmed-up VM for each job it runs.
+    """
+
+    def __init__(self, vm: Chip8VirtualMachine, max_workers: int = None):
+        """
+        Create a server for a VM.
+
+        :param vm: the VM each child starts from
+        :param max_workers: the most children to run at once, the
+                            number of cores by default
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        self.vm = vm
+        self.max_workers = max_workers
+
+    def _start(self, job: Job, item: Item) -> Tuple[int, int]:
+        """
+        Fork a child to run a job on an item.
+
+        :return: the child's pid and the pipe to read its result from
+        """
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+
+        if pid == 0:
+            # never return into the caller's code from the child
+            status = 1
+            try:
+                os.close(read_fd)
+                try:
+                    payload = pickle.dumps((True, job(self.vm, item)))
+                except Exception as e:
+                    payload = pickle.dumps((False, e))
+                with os.fdopen(write_fd, "wb") as pipe:
+                    pipe.write(payload)
+                status = 0
+            finally:
+                os._exit(status)
+
+        os.close(write_fd)
+        return pid, read_fd
+
+    @staticmethod
+    def _finish(pid: int, read_fd: int) -> Result:
+        """
+        Wait for a child and return its result.
+
+        Re-raises anything the job raised. Raises ChildProcessError if
+        the child died without sending a result.
+        """
+        with os.fdopen(read_fd, "rb") as pipe:
+            payload = pipe.read()
+        _, status = os.waitpid(pid, 0)
+
+        if not payload:
+            raise ChildProcessError(
+                f"Worker {pid} exited without a result, status {status}")
+
+        succeeded, value = pickle.loads(payload)
+        if not succeeded:
+            raise value
+        return value
+
+    def run(self, job: Job, item: Item) -> Result:
+        """
+        Run a single job in a child process.
+
+        :param job: called with the child's VM and the item
+        :param item: passed to the job
+        :return: whatever the job returned
+        """
+        return self._finish(*self._start(job, item))
+
+    def map(self, job: Job, items: Iterable[Item]) -> List[Result]:
+        """
+        Run a job once per item, up to max_workers children at a time.
+
+        If a job raises, the children still running are waited for
+        before the exception is re-raised.
+
+        :param job: called with a fresh child's VM and each item
+        :param items: what to pass to each job
+        :return: the results, in the same order as items
+        """
+        running: Deque[Tuple[int, int]] = deque()
+        results = []
+
+        try:
+            for item in items:
+                if len(running) >= self.max_workers:
+                    results.append(self._finish(*running.popleft()))
+                running.append(self._start(job, item))
+
+            while running:
+                results.append(self._finish(*running.popleft()))
+        finally:
+            for pid, read_fd in running:
+                os.close(read_fd)
+                os.waitpid(pid, 0)
+
+        return results
@@ -17,6 +17,13 @@ BASE_ARG_PARSER.add_argument(
     '-r', '--rom-file', type=str, required=True, help="Which ROM file to run")
 BASE_ARG_PARSER.add_argument(
     '-P', '--start-paused', help="Start the VM paused", action='store_true')
+BASE_ARG_PARSER.add_argument(
+    '-S', '--super-chip', action='store_true',
+    help="Run SUPER-CHIP instructions, such as for high resolution")
+BASE_ARG_PARSER.add_argument(
+    '-X', '--xo-chip', action='store_true',
+    help="Run XO-CHIP instructions and use 64KB of memory."
+         " Only the first plane is shown.")
 BASE_ARG_PARSER.set_defaults(start_paused=False)
 
 
@@ -52,6 +59,9 @@ class Frontend(ABC):
     Inherit from it to set up your own frontends.
     """
 
+    # which VideoRam class loaded VMs should use
+    video_ram_type: type = VideoRam
+
     def __init__(self, arg_parser=BASE_ARG_PARSER):
 
         self.launch_args = vars(arg_parser.parse_args())
@@ -105,14 +115,21 @@ class Frontend(ABC):
         self.rom_path = clean_path(raw_path)
 
         try:
-            self._vm = load_rom_to_vm(self.rom_path)
+            self._vm = load_rom_to_vm(
+                self.rom_path,
+                Chip8VirtualMachine(
+                    video_ram_type=self.video_ram_type,
+                    super_chip=self.launch_args['super_chip'],
+                    xo_chip=self.launch_args['xo_chip']
+                )
+            )
         except IOError as e:
             exit_with_error(f"Could not read file {self.rom_path!r} : {e!r}")
         except IndexError as e:
             exit_with_error(f"Could not load rom: {e!r}")
 
         self._vm_display = self._vm.video_ram
-        self.breakpoints = set()
+        self.breakpoints = self._vm.breakpoints
 
     @abstractmethod
     def run(self) -> None:
@@ -0,0 +1,148 @@
+"""
+Run VMs as asyncio tasks, so one event loop can host many sessions.
+
+Each run() call paces its VM against a deadline per frame and awaits
+between frames, so other sessions and network code get the loop in
+between. Keys come in through an asyncio.Queue of KeyEvents, and each
+finished frame goes out to every subscriber of a FramePublisher:
+
+    publisher = FramePublisher()
+    keys = asyncio.Queue()
+    session = asyncio.create_task(run(vm, keys=keys, publisher=publisher))
+
+    frames = publisher.subscribe()
+    await keys.put(KeyEvent(0x5, True))
+    frame = await frames.get()
+
+"""
+import asyncio
+from typing import List, NamedTuple, Optional
+
+from eightdad.core import Chip8VirtualMachine
+from eightdad.core.vm import StopReason
+from eightdad.frontend.headless import FINAL_STOP_REASONS
+
+
+class KeyEvent(NamedTuple):
+    key: int
+    pressed: bool
+
+
+class Frame(NamedTuple):
+    number: int  # frames since the VM was created
+    pixels: bytes  # the screen as packed rows, as in VideoRam.pixels
+
+
+class FramePublisher:
+    """
+    Hands each published frame to every subscriber's queue.
+
+    A subscriber which falls behind loses its oldest frames rather than
+    slowing down the VM or growing its queue without bound.
+    """
+
+    def __init__(self):
+        self._subscribers: List[asyncio.Queue] = []
+
+    def subscribe(self, maxsize: int = 1) -> asyncio.Queue:
+        """
+        Return a new queue which will receive published frames.
+
+        :param maxsize: how many frames to keep before dropping old ones
+        :return: a queue of Frame instances
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+
+        queue = asyncio.Queue(maxsize)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """
+        Stop sending frames to a queue returned by subscribe().
+        """
+        self._subscribers.remove(queue)
+
+    def publish(self, frame: Frame) -> None:
+        """
+        Put a frame on every subscriber's queue without waiting.
+        """
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(frame)
+
+
+def apply_key_events(vm: Chip8VirtualMachine, keys: asyncio.Queue) -> None:
+    """
+    Press or release keys for every event currently waiting in keys.
+    """
+    while not keys.empty():
+        event = keys.get_nowait()
+        if event.pressed:
+            vm.press(event.key)
+        else:
+            vm.release(event.key)
+
+
+async def run(
+        vm: Chip8VirtualMachine,
+        fps: Optional[float] = None,
+        keys: Optional[asyncio.Queue] = None,
+        publisher: Optional[FramePublisher] = None,
+        max_frames: Optional[int] = None
+) -> StopReason:
+    """
+    Run a VM a frame at a time, on schedule, until it stops.
+
+    Each frame is due 1 / fps seconds after the last. When the VM falls
+    more than a frame behind, the schedule restarts from the current
+    time rather than running a burst of frames to catch up. The loop is
+    yielded to after every frame, even when running late.
+
+    Cancelling the task is the usual way to end a session. It also
+    returns if the program halts, hits a breakpoint or an unhandled
+    instruction, or once max_frames frames have run.
+
+    :param vm: the VM to run
+    :param fps: frames per second, the VM's frames_per_second by default
+    :param keys: a queue of KeyEvents to apply before each frame
+    :param publisher: where to publish each frame once it's run
+    :param max_frames: the most frames to run, or None for no limit
+    :return: why the run stopped
+    """
+    if fps is None:
+        fps = vm.frames_per_second
+    if fps <= 0:
+        raise ValueError("fps must be greater than 0")
+
+    loop = asyncio.get_running_loop()
+    frame_length = 1.0 / fps
+    deadline = loop.time()
+    frames_run = 0
+    reason = StopReason.FRAME_END
+
+    while max_frames is None or frames_run < max_frames:
+        if keys is not None:
+            apply_key_events(vm, keys)
+
+        reason = vm.run_frame()
+        frames_run += 1
+
+        if publisher is not None:
+            publisher.publish(Frame(
+                vm.cycle_count // vm.ticks_per_frame,
+                vm.video_ram.pixels.tobytes()
+            ))
+
+        if reason in FINAL_STOP_REASONS:
+            break
+
+        deadline += frame_length
+        now = loop.time()
+        if now > deadline + frame_length:
+            deadline = now
+        await asyncio.sleep(max(deadline - now, 0))
+
+    return reason
@@ -0,0 +1,207 @@
+"""
+Run a VM on its own thread, at a fixed frame rate.
+
+Frontends which run frames inline in their update handler stall input
+and drawing whenever a frame is slow, and a slow draw delays the next
+frame. An EmulationThread owns the VM instead. The frontend sends it key
+presses, which are applied between frames, and reads the newest
+finished frame from a FrameBuffer without waiting for the VM.
+
+"""
+import queue
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from eightdad.core import Chip8VirtualMachine
+from eightdad.core.vm import StopReason
+
+
+# run_frame results which pause the thread
+PAUSING_STOP_REASONS = {StopReason.UNHANDLED, StopReason.BREAKPOINT}
+
+
+class FrameBuffer:
+    """
+    A double-buffered copy of a screen, written by one thread.
+
+    The writer fills the back buffer without holding the lock, then
+    swaps it to the front. Readers only hold the lock long enough to
+    copy the front buffer.
+    """
+
+    def __init__(self, size: int):
+        """
+        Create a buffer for screens of a fixed size.
+
+        :param size: the size of a screen, in bytes
+        """
+        self._front = bytearray(size)
+        self._back = bytearray(size)
+        self._lock = threading.Lock()
+        # how many screens have been published
+        self.generation = 0
+
+    def publish(self, pixels) -> None:
+        """
+        Copy a screen into the back buffer and make it the front.
+
+        Only one thread should publish to a buffer.
+
+        :param pixels: a buffer of exactly the right size
+        """
+        back = self._back
+        back[:] = pixels
+
+        with self._lock:
+            self._back = self._front
+            self._front = back
+            self.generation += 1
+
+    def read(self) -> Tuple[int, bytes]:
+        """
+        Return the newest screen along with its generation.
+
+        :return: a (generation, pixels) pair
+        """
+        with self._lock:
+            return self.generation, bytes(self._front)
+
+
+class EmulationThread(threading.Thread):
+    """
+    Runs a VM's frames on schedule and publishes them to a FrameBuffer.
+
+    Frames are only published when the screen changed.
+
+    Once started, only this thread should touch the VM. Other threads
+    change it through press(), release(), step() or submit(), which are
+    queued and applied before the next frame.
+
+    If a frame or a queued command raises, the thread keeps the
+    exception in last_error and pauses rather than dying.
+    """
+
+    def __init__(
+            self,
+            vm: Chip8VirtualMachine,
+            fps: Optional[float] = None,
+            paused: bool = False
+    ):
+        """
+        Create a stopped thread for a VM.
+
+        :param vm: the VM to run
+        :param fps: frames per second, the VM's frames_per_second by default
+        :param paused: whether to start paused
+        """
+        super().__init__(name="eightdad-emulation", daemon=True)
+
+        if fps is None:
+            fps = vm.frames_per_second
+        if fps <= 0:
+            raise ValueError("fps must be greater than 0")
+
+        self.vm = vm
+        self.frame_length = 1.0 / fps
+
+        with memoryview(vm.video_ram.pixels) as pixels:
+            self.frame_buffer = FrameBuffer(pixels.nbytes)
+        self.frame_buffer.publish(vm.video_ram.pixels.tobytes())
+        self._published_generation = vm.video_ram.generation
+
+        # why the last frame ended early, if one did
+        self.last_stop_reason: Optional[StopReason] = None
+        # what the VM or a command last raised, pausing the thread
+        self.last_error: Optional[Exception] = None
+
+        self._commands: "queue.SimpleQueue[Callable]" = queue.SimpleQueue()
+        self._running = threading.Event()
+        if not paused:
+            self._running.set()
+        self._stopping = threading.Event()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    @paused.setter
+    def paused(self, paused: bool):
+        if paused:
+            self._running.clear()
+        else:
+            self._running.set()
+
+    def submit(self, command: Callable[[Chip8VirtualMachine], None]) -> None:
+        """
+        Queue a function to call with the VM before the next frame.
+        """
+        self._commands.put(command)
+
+    def press(self, key: int) -> None:
+        self.submit(lambda vm: vm.press(key))
+
+    def release(self, key: int) -> None:
+        self.submit(lambda vm: vm.release(key))
+
+    def step(self) -> None:
+        """
+        Queue a single instruction, such as for stepping while paused.
+        """
+        self.submit(lambda vm: vm.tick())
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Ask the thread to exit after its current frame, and wait for it.
+
+        :param timeout: the most seconds to wait, or None to wait forever
+        """
+        self._stopping.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def _run_commands(self) -> None:
+        commands = self._commands
+        vm = self.vm
+        while True:
+            try:
+                command = commands.get_nowait()
+            except queue.Empty:
+                return
+            command(vm)
+
+    def run(self) -> None:
+        vm = self.vm
+        video_ram = vm.video_ram
+        frame_length = self.frame_length
+        stopping = self._stopping
+        deadline = time.perf_counter()
+        published_generation = self._published_generation
+
+        while not stopping.is_set():
+            try:
+                self._run_commands()
+
+                if self._running.is_set():
+                    reason = vm.run_frame()
+                    if reason in PAUSING_STOP_REASONS:
+                        self.last_stop_reason = reason
+                        self.last_error = None
+                        self._running.clear()
+
+            except Exception as e:
+                # pause on the error, as for an unhandled instruction
+                self.last_stop_reason = None
+                self.last_error = e
+                self._running.clear()
+
+            if video_ram.generation != published_generation:
+                published_generation = video_ram.generation
+                self.frame_buffer.publish(video_ram.pixels)
+
+            # don't try to catch up after falling more than a frame behind
+            deadline += frame_length
+            now = time.perf_counter()
+            if now > deadline + frame_length:
+                deadline = now
+            stopping.wait(max(deadline - now, 0))
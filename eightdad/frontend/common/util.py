@@ -1,7 +1,8 @@
 import sys
 from pathlib import Path
 from eightdad.core import Chip8VirtualMachine as VM
-from typing import Union, Iterator, Tuple
+from eightdad.core.video import DirtyRegion
+from typing import Union, Iterator, Optional, Tuple
 
 
 PathOrStr = Union[Path, str]
@@ -10,7 +11,8 @@ PathOrStr = Union[Path, str]
 def screen_coordinates(
         vm: VM,
         x_step: int = 1,
-        y_step: int = 1
+        y_step: int = 1,
+        region: Optional[DirtyRegion] = None
     ) -> Iterator[Tuple[int, int]]:
     """
     Generator yielding screen coordinates within a VM's video RAM.
@@ -18,13 +20,26 @@ def screen_coordinates(
     The step parameters are useful for renderers which handle chunks of
     pixels rather than single pixels.
 
+    If a region is passed, only chunks overlapping its bounding box are
+    yielded.
+
     :param vm: the VM to access the video ram for
     :param x_step: how many pixels to step x by each time
     :param y_step: how many pixels to step y by each time
+    :param region: an optional part of the screen to stay within
     """
     vram = vm.video_ram
-    for x in range(0, vram.width, x_step):
-        for y in range(0, vram.height, y_step):
+    x_start, y_start = 0, 0
+    x_end, y_end = vram.width, vram.height
+
+    if region is not None:
+        x_start = region.left - region.left % x_step
+        y_start = region.top - region.top % y_step
+        x_end = region.right
+        y_end = region.bottom
+
+    for x in range(x_start, x_end, x_step):
+        for y in range(y_start, y_end, y_step):
             yield x, y
 
 
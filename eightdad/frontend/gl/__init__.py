@@ -5,7 +5,9 @@ A modified version of einarf's Chip-8 display example in the arcade
 library. Original is under MIT license.
 
 """
+import argparse
 from pathlib import Path
+from typing import Optional
 
 import pyglet
 import arcade
@@ -13,8 +15,9 @@ from arcade.types import RGBA255, Color
 from arcade.gl import geometry
 
 from eightdad.core import Chip8VirtualMachine
-from eightdad.core.vm import upper_hex, report_state
-from eightdad.frontend import build_window_title, Frontend
+from eightdad.core.vm import StopReason, report_state
+from eightdad.frontend import BASE_ARG_PARSER, build_window_title, Frontend
+from eightdad.frontend.common.emulation_thread import EmulationThread
 from eightdad.frontend.common.keymap import ControlButton
 
 from eightdad.types import PathLike
@@ -29,6 +32,16 @@ DEFAULT_OFF_PIXEL_COLOR = Color.from_hex_string("#b05e00")
 DEFAULT_ON_PIXEL_COLOR = Color.from_hex_string("#ffc400")
 
 
+GL_ARG_PARSER = argparse.ArgumentParser(
+    description='EightDAD Chip-8 Emulator',
+    parents=[BASE_ARG_PARSER],
+    add_help=False
+)
+GL_ARG_PARSER.add_argument(
+    '-T', '--threaded', action='store_true',
+    help="Run the VM on its own thread, separately from drawing")
+
+
 def _read_shader_source_from(path: PathLike) -> str:
     path = Path(path).resolve()
     return path.read_text()
@@ -46,7 +59,8 @@ class ArcadeWindow(arcade.Window):
             off_pixel_color: RGBA255 = DEFAULT_OFF_PIXEL_COLOR,
             on_pixel_color: RGBA255 = DEFAULT_ON_PIXEL_COLOR,
             vertex_shader_path: PathLike = VERTEX_SHADER_PATH,
-            fragment_shader_path: PathLike = FRAGMENT_SHADER_PATH
+            fragment_shader_path: PathLike = FRAGMENT_SHADER_PATH,
+            threaded: bool = False
     ):
         # Non-GL setup
         super().__init__(
@@ -69,18 +83,25 @@ class ArcadeWindow(arcade.Window):
 
         # Allocate resources for use in shaders
         self.quad = geometry.screen_rectangle(0, 0, self.width, self.height)
-        self.texture = self.ctx.texture((8, 32), components=1, dtype='i1')
-
-        # Ideally, this would use .toreadonly() on the memoryview, but
-        # there's an unclosed ctypes ticket blocking this.
-        # https://github.com/python/cpython/issues/72832
-        self.screen_buffer = memoryview(self.vm.video_ram.pixels)
+        width, height = vm.video_ram.size
+        self.texture = self.ctx.texture(
+            (width // 8, height), components=1, dtype='i1')
+
+        # When threaded, the VM runs on its own thread and frames are
+        # read from its frame buffer instead of video RAM.
+        self.emulation: Optional[EmulationThread] = None
+        # generation of the frame last uploaded to the texture
+        self._uploaded_generation = -1
+        if threaded:
+            self.emulation = EmulationThread(vm, paused=paused)
+            self.emulation.start()
 
         # Bind resources to shader program inputs
         program['projection'] = self.projection
         program['off_pixel_color'] = Color.from_iterable(off_pixel_color).normalized
         program['on_pixel_color'] = Color.from_iterable(on_pixel_color).normalized
         program['raw_vm_pixels'] = 0
+        program['screen_width'] = width
 
     @property
     def paused(self) -> bool:
@@ -89,6 +110,8 @@ class ArcadeWindow(arcade.Window):
     @paused.setter
     def paused(self, paused: bool):
         self._paused = paused
+        if self.emulation is not None:
+            self.emulation.paused = paused
         self.set_caption(build_window_title(paused, self._current_file))
 
     def set_update_rate(self, rate: float):
@@ -101,22 +124,80 @@ class ArcadeWindow(arcade.Window):
         super().set_update_rate(rate)
         self.update_rate = rate
 
+    def _report_unhandled(self) -> None:
+        print(
+            f"INSTRUCTION UNHANDLED! "
+            f"{self.vm.dump_current_pc_instruction_raw()}")
+
+    def _upload(self, pixels, width: int, height: int) -> None:
+        # SUPER-CHIP resolution changes resize the screen
+        size = (width // 8, height)
+        if self.texture.size != size:
+            self.texture = self.ctx.texture(size, components=1, dtype='i1')
+            self.program['screen_width'] = width
+
+        self.texture.use(0)
+        self.texture.write(pixels)  # type: ignore
+
+    def _update_threaded(self) -> None:
+        emulation = self.emulation
+
+        # the thread pauses itself on unhandled instructions, breakpoints
+        # and errors
+        if emulation.paused and not self.paused:
+            if emulation.last_stop_reason == StopReason.UNHANDLED:
+                self._report_unhandled()
+            elif emulation.last_error is not None:
+                print(f"EMULATION ERROR! {emulation.last_error!r}")
+            self.paused = True
+
+        generation, pixels = emulation.frame_buffer.read()
+        if generation == self._uploaded_generation:
+            return
+
+        # frames published before a resize are the wrong size, so skip them
+        width, height = self.vm.video_ram.size
+        if len(pixels) == width // 8 * height:
+            self._uploaded_generation = generation
+            self._upload(pixels, width, height)
+
     def on_update(self, delta_time: float):
+        if self.emulation is not None:
+            self._update_threaded()
+            return
+
         # only update when executing?
         vm = self.vm
 
         if not self.paused:
-            for i in range(vm.ticks_per_frame):
-                vm_state = vm.dump_state()
-                report_state(vm_state)
-                vm.tick()
+            reason = vm.run_frame()
+            report_state(vm.dump_state())
 
-                if self.vm.instruction_unhandled:
-                    print("INSTRUCTION UNHANDLED!")
-                    self.paused = True
+            if reason == StopReason.UNHANDLED:
+                self._report_unhandled()
+                self.paused = True
 
-        self.texture.use(0)
-        self.texture.write(self.screen_buffer)  # type: ignore
+            elif reason == StopReason.BREAKPOINT:
+                self.paused = True
+
+        # nothing to upload if no pixels changed
+        video_ram = vm.video_ram
+        if video_ram.generation == self._uploaded_generation:
+            return
+        self._uploaded_generation = video_ram.generation
+
+        # Read pixels each time, since some VideoRam types only bring
+        # them up to date when accessed. Ideally, this would use
+        # .toreadonly() on the memoryview, but there's an unclosed
+        # ctypes ticket blocking this.
+        # https://github.com/python/cpython/issues/72832
+        with memoryview(video_ram.pixels) as screen_buffer:
+            self._upload(screen_buffer, video_ram.width, video_ram.height)
+
+    def on_close(self):
+        if self.emulation is not None:
+            self.emulation.stop()
+        super().on_close()
 
     def on_draw(self):
         self.clear()
@@ -128,7 +209,7 @@ class ArcadeWindow(arcade.Window):
             mapped = self.keymap[symbol]
             value = mapped.value
             if value <= 0xF:
-                self.vm.release(value)
+                (self.emulation or self.vm).release(value)
             print(
                 f"Released {chr(symbol)!r}, maps to control"
                 f"{mapped!r}"
@@ -144,7 +225,7 @@ class ArcadeWindow(arcade.Window):
 
         # if it's a hex key
         if mapped_value <= 0xF:
-            self.vm.press(mapped_value)
+            (self.emulation or self.vm).press(mapped_value)
             print(
                 f"Pressed {chr(symbol)!r}, maps to control"
                 f" {mapped_button!r}"
@@ -158,13 +239,16 @@ class ArcadeWindow(arcade.Window):
 
         if self.paused:
             if symbol == arcade.key.ENTER:
-                self.vm.tick()
+                if self.emulation is not None:
+                    self.emulation.step()
+                else:
+                    self.vm.tick()
 
 
 class ArcadeFrontend(Frontend):
 
     def __init__(self, pixel_size: int = 10):
-        super().__init__()
+        super().__init__(GL_ARG_PARSER)
 
         display_width_px = self._vm_display.width * pixel_size
         display_height_px = self._vm_display.height * pixel_size
@@ -174,7 +258,8 @@ class ArcadeFrontend(Frontend):
             self._vm,
             self.rom_path,
             self._key_mapping,
-            self.launch_args['start_paused']
+            self.launch_args['start_paused'],
+            threaded=self.launch_args['threaded']
         )
 
     def run(self):
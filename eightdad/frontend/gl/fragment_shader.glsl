@@ -7,6 +7,7 @@ in      vec2       v_uv;           // input translated from pixels to uv coords
 uniform vec4       off_pixel_color;
 uniform vec4       on_pixel_color;
 uniform usampler2D raw_vm_pixels;  // unsigned sampler reading from texture
+uniform float      screen_width;   // width of the VM's screen in pixels
 
 // Outputs
 out vec4           out_color;
@@ -14,7 +15,7 @@ out vec4           out_color;
 
 void main() {
     // Calculate the bit position on the x axis
-    uint bit_pos_x = uint(round((v_uv.x * 64) - 0.5)) % 8u;
+    uint bit_pos_x = uint(round((v_uv.x * screen_width) - 0.5)) % 8u;
 
     // Create bit mask we can AND the fragment with to extract the pixel value
     uint bit_selection_mask = uint(pow(2u, 7u - bit_pos_x));
@@ -0,0 +1,280 @@
+"""
+Display-free runner for smoke tests and benchmarking.
+
+Loads a ROM, runs it without a window for a number of cycles, a number
+of frames, or until it halts, then reports how fast it ran and what the
+screen looked like at the end.
+
+Key input can be scripted with a plain text file. Each line holds a
+frame number, press or release, and a hex key, with # for comments:
+
+    # hold 5 for the first second
+    0 press 5
+    60 release 5
+
+Events are applied at the start of the frame they name, with frames
+counted from when the VM was created.
+
+"""
+import argparse
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, List, NamedTuple, Optional
+
+from eightdad.core import Chip8VirtualMachine
+from eightdad.core.vm import ExecutionMode, StopReason
+from eightdad.frontend import exit_with_error
+from eightdad.frontend.common.util import PathOrStr, load_rom_to_vm
+
+
+# run_cycles results which end a headless run early
+FINAL_STOP_REASONS = {
+    StopReason.UNHANDLED,
+    StopReason.BREAKPOINT,
+    StopReason.HALTED
+}
+
+
+class InputEvent(NamedTuple):
+    frame: int
+    key: int
+    pressed: bool
+
+
+@dataclass
+class HeadlessResult:
+    stop_reason: StopReason
+    cycles: int
+    frames: int
+    seconds: float
+    framebuffer_hash: str
+
+    @property
+    def instructions_per_second(self) -> float:
+        """
+        Cycles run per second of wall time, idle cycles included.
+        """
+        if not self.seconds:
+            return 0.0
+        return self.cycles / self.seconds
+
+
+def parse_input_script(lines: Iterable[str]) -> List[InputEvent]:
+    """
+    Parse scripted key input into events ordered by frame.
+
+    Raises ValueError naming the line number of any malformed line.
+
+    :param lines: the lines of an input script
+    :return: a list of events, earliest first
+    """
+    events = []
+
+    for line_number, line in enumerate(lines, start=1):
+        content = line.split("#", 1)[0].split()
+        if not content:
+            continue
+
+        try:
+            raw_frame, action, raw_key = content
+            frame = int(raw_frame)
+            key = int(raw_key, 16)
+            if frame < 0 or not 0 <= key <= 0xF:
+                raise ValueError()
+            if action not in ("press", "release"):
+                raise ValueError()
+        except ValueError:
+            raise ValueError(
+                f"Line {line_number}: expected '<frame> press|release <key>'"
+                f", got {line.strip()!r}"
+            )
+
+        events.append(InputEvent(frame, key, action == "press"))
+
+    # stable, so same-frame events stay in file order
+    events.sort(key=lambda event: event.frame)
+    return events
+
+
+def framebuffer_hash(vm: Chip8VirtualMachine) -> str:
+    """
+    Return the VM's VideoRam.frame_hash as a hex string.
+
+    XO-CHIP VMs get one hash per plane, in order, joined with dashes.
+
+    :param vm: the VM to hash the screen of
+    :return: a hex string
+    """
+    return "-".join(f"{plane.frame_hash:08x}" for plane in vm.video_planes)
+
+
+def run_headless(
+        vm: Chip8VirtualMachine,
+        max_cycles: Optional[int] = None,
+        inputs: Iterable[InputEvent] = ()
+) -> HeadlessResult:
+    """
+    Run a VM with no display, applying scripted input between frames.
+
+    The run ends after max_cycles cycles, or when run_cycles reports the
+    program halted, hit a breakpoint or an unhandled instruction. With
+    no max_cycles, it also ends if the program waits for a key once
+    there's no scripted input left to give it.
+
+    :param vm: the VM to run
+    :param max_cycles: the most cycles to run, or None for no limit
+    :param inputs: key events to apply, in frame order
+    :return: a summary of the run
+    """
+    events = deque(inputs)
+    ticks_per_frame = vm.ticks_per_frame
+    start_cycle = vm.cycle_count
+    reason = StopReason.CYCLE_LIMIT
+
+    start_time = time.perf_counter()
+
+    while max_cycles is None or vm.cycle_count - start_cycle < max_cycles:
+        frame = vm.cycle_count // ticks_per_frame
+        while events and events[0].frame <= frame:
+            event = events.popleft()
+            if event.pressed:
+                vm.press(event.key)
+            else:
+                vm.release(event.key)
+
+        budget = ticks_per_frame - (vm.cycle_count % ticks_per_frame)
+        if max_cycles is not None:
+            budget = min(budget, max_cycles - (vm.cycle_count - start_cycle))
+
+        reason = vm.run_cycles(budget)
+        if reason in FINAL_STOP_REASONS:
+            break
+        if max_cycles is None and reason == StopReason.KEY_WAIT \
+                and not events:
+            break
+
+    seconds = time.perf_counter() - start_time
+    cycles = vm.cycle_count - start_cycle
+
+    return HeadlessResult(
+        reason,
+        cycles,
+        cycles // ticks_per_frame,
+        seconds,
+        framebuffer_hash(vm)
+    )
+
+
+def report_result(result: HeadlessResult) -> None:
+    print(
+        f"== result ==\n"
+        f"exit reason: {result.stop_reason.name}\n"
+        f"cycles     : {result.cycles}\n"
+        f"frames     : {result.frames}\n"
+        f"seconds    : {result.seconds:.3f}\n"
+        f"ips        : {result.instructions_per_second:.0f}\n"
+        f"framebuffer: {result.framebuffer_hash}"
+    )
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='Run a Chip-8 ROM without a display')
+    parser.add_argument(
+        '-r', '--rom-file', type=str, required=True,
+        help="Which ROM file to run")
+
+    length = parser.add_mutually_exclusive_group(required=True)
+    length.add_argument(
+        '-c', '--cycles', type=int, help="Run this many cycles")
+    length.add_argument(
+        '-f', '--frames', type=int, help="Run this many frames")
+    length.add_argument(
+        '-u', '--until-halt', action='store_true',
+        help="Run until the ROM halts or stops for another reason")
+
+    parser.add_argument(
+        '-i', '--input-file', type=str,
+        help="Scripted key input to apply")
+    parser.add_argument(
+        '-m', '--mode', type=str.upper, default=ExecutionMode.JIT.name,
+        choices=[mode.name for mode in ExecutionMode],
+        help="Which execution mode to run the VM in")
+    parser.add_argument(
+        '-S', '--super-chip', action='store_true',
+        help="Run SUPER-CHIP instructions")
+    parser.add_argument(
+        '-X', '--xo-chip', action='store_true',
+        help="Run XO-CHIP instructions and use 64KB of memory")
+
+    return parser
+
+
+def run_rom(
+        rom_path: PathOrStr,
+        max_cycles: Optional[int] = None,
+        max_frames: Optional[int] = None,
+        input_path: Optional[PathOrStr] = None,
+        execution_mode: ExecutionMode = ExecutionMode.JIT,
+        super_chip: bool = False,
+        xo_chip: bool = False
+) -> HeadlessResult:
+    """
+    Load a ROM into a new VM and run it headless.
+
+    At most one of max_cycles and max_frames should be passed. Passing
+    neither runs until the program halts.
+
+    :param rom_path: the ROM file to load
+    :param max_cycles: the most cycles to run
+    :param max_frames: the most frames to run
+    :param input_path: an optional input script to apply
+    :param execution_mode: how the VM should execute instructions
+    :param super_chip: whether the VM runs SUPER-CHIP instructions
+    :param xo_chip: whether the VM runs XO-CHIP instructions
+    :return: a summary of the run
+    """
+    inputs = []
+    if input_path is not None:
+        with open(input_path, "r") as input_file:
+            inputs = parse_input_script(input_file)
+
+    vm = load_rom_to_vm(rom_path, Chip8VirtualMachine(
+        execution_mode=execution_mode,
+        super_chip=super_chip,
+        xo_chip=xo_chip
+    ))
+
+    if max_frames is not None:
+        max_cycles = max_frames * vm.ticks_per_frame
+
+    return run_headless(vm, max_cycles, inputs)
+
+
+def main() -> None:
+    args = build_arg_parser().parse_args()
+
+    try:
+        result = run_rom(
+            args.rom_file,
+            max_cycles=args.cycles,
+            max_frames=args.frames,
+            input_path=args.input_file,
+            execution_mode=ExecutionMode[args.mode],
+            super_chip=args.super_chip,
+            xo_chip=args.xo_chip
+        )
+    except IOError as e:
+        exit_with_error(f"Could not read file: {e!r}")
+    except (IndexError, ValueError) as e:
+        exit_with_error(f"Could not run rom: {e}")
+
+    report_result(result)
+    if result.stop_reason == StopReason.UNHANDLED:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
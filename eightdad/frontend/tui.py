@@ -11,14 +11,16 @@ Implemented so far:
     [x] rough non-square pixel rendering system
     [x] half-height rendering to fake square pixels
     [ ] braille unicode rendering
-    [ ] optimizations for only drawing changed pixels
+    [x] optimizations for only drawing changed pixels
 
 """
-from typing import Tuple
+from typing import Optional, Tuple
 
 from asciimatics.screen import Screen
 from asciimatics.event import KeyboardEvent
-from eightdad.core import Chip8VirtualMachine
+from eightdad.core import Chip8VirtualMachine, DirtyTrackingVideoRam
+from eightdad.core.video import DirtyRegion
+from eightdad.core.vm import StopReason
 from eightdad.frontend import Frontend
 from eightdad.frontend.common.util import screen_coordinates
 from eightdad.frontend.common.keymap import ControlButton, to_lower
@@ -43,6 +45,10 @@ HALF_CHAR_TABLE = (
 )
 
 
+# run_frame results which should pause the emulator
+PAUSING_STOP_REASONS = {StopReason.UNHANDLED, StopReason.BREAKPOINT}
+
+
 DEFAULT_COLORS = (
     Screen.COLOUR_BLACK,
     Screen.COLOUR_WHITE
@@ -54,7 +60,8 @@ def render_fullchars(
         vm: Chip8VirtualMachine,
         x_start: int = 0, y_start: int = 1,
         colours=DEFAULT_COLORS,
-        block_char: str = FULL) -> None:
+        block_char: str = FULL,
+        region: Optional[DirtyRegion] = None) -> None:
     """
     Helper to render the screen using full-height characters.
 
@@ -72,9 +79,10 @@ def render_fullchars(
     :param y_start: where to to start drawing the display area
     :param colours: a list of asciimatics colors to draw in
     :param block_char: what tile to use for showing a full pixel.
+    :param region: only redraw this part of the screen, if passed
     """
     vram = vm.video_ram
-    for x, y in screen_coordinates(vm):
+    for x, y in screen_coordinates(vm, region=region):
         screen.print_at(
             block_char if vram[x, y] else ' ',
             x + x_start, y + y_start,
@@ -89,6 +97,7 @@ def render_halfchars(
         x_start: int = 0, y_start: int = 1,
         colours=DEFAULT_COLORS,
         char_table: Tuple[str] = HALF_CHAR_TABLE,
+        region: Optional[DirtyRegion] = None
 ) -> None:
     """
     Render the screen with half-height block characters.
@@ -99,9 +108,10 @@ def render_halfchars(
     :param y_start: where  to start drawing the display area
     :param colours: a list of asciimatics colors to draw with.
     :param char_table:
+    :param region: only redraw this part of the screen, if passed
     """
     vram = vm.video_ram
-    for x, y in screen_coordinates(vm, y_step=2):
+    for x, y in screen_coordinates(vm, y_step=2, region=region):
         char_selection = 0
 
         # Use the current pixel and the one below it to choose the
@@ -135,9 +145,10 @@ def render_braille(
         draw_x_start: int = 0, draw_y_start: int = 1,
         colours=DEFAULT_COLORS,
         char_table: Tuple[int, int, int] = BRAILLE_TABLE,
+        region: Optional[DirtyRegion] = None
 ) -> None:
     vram = vm.video_ram
-    for x, y in screen_coordinates(vm, x_step=2, y_step=4):
+    for x, y in screen_coordinates(vm, x_step=2, y_step=4, region=region):
         char_base_codepoint = 0x2800
 
         for offset_x, offset_y, bit_mask in char_table:
@@ -154,6 +165,9 @@ def render_braille(
 
 class AsciimaticsFrontend(Frontend):
 
+    # lets rendering skip the parts of the screen that didn't change
+    video_ram_type = DirtyTrackingVideoRam
+
     def __init__(self, render_method=render_braille):
         super().__init__()
         self.screen = None
@@ -173,6 +187,7 @@ class AsciimaticsFrontend(Frontend):
         Asciimatics helper function to drive the emulator.
         """
         screen = screen or self.screen
+        shown_size = self._vm.video_ram.size
 
         while True:
             ev = screen.get_event()
@@ -203,14 +218,23 @@ class AsciimaticsFrontend(Frontend):
                 if hex_value is not None:
                     self._vm.press(hex_value)
 
-                for i in range(self._vm.ticks_per_frame):
-                    self._vm.tick()
+                if self._vm.run_frame() in PAUSING_STOP_REASONS:
+                    self.paused = True
 
                 # an ugly way to emulate key-up events in the terminal
                 if hex_value is not None:
                     self._vm.release(hex_value)
 
-            self.render_method(screen, self._vm)
+            # clear what's left of the old screen after a resolution
+            # change, since resizing marks the new one dirty
+            video_ram = self._vm.video_ram
+            if video_ram.size != shown_size:
+                shown_size = video_ram.size
+                screen.clear()
+
+            region = video_ram.consume_dirty()
+            if region is not None:
+                self.render_method(screen, self._vm, region=region)
             screen.refresh()
 
 
@@ -20,3 +20,11 @@ class DigitTooTall(DigitFormatException):
 
 class DigitTooWide(DigitFormatException):
     pass
+
+
+class UnhandledInstructionError(ValueError):
+    pass
+
+
+class InvalidSnapshotError(ValueError):
+    pass
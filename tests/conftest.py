@@ -1,11 +1,15 @@
 import sys
 import pytest
 from itertools import product
-from typing import Tuple, Any, Iterable, Dict, Generator
+from typing import Tuple, Any, Iterable, Dict, Generator, Mapping, Optional
 
 from eightdad.core import Chip8VirtualMachine
 from eightdad.core.bytecode import Chip8Instruction as Instruction
-from eightdad.core.vm import DEFAULT_EXECUTION_START, INSTRUCTION_LENGTH
+from eightdad.core.vm import (
+    DEFAULT_EXECUTION_START,
+    INSTRUCTION_LENGTH,
+    ExecutionMode
+)
 
 
 @pytest.helpers.register
@@ -37,6 +41,63 @@ def debugger_active() -> bool:
     return gettrace is None
 
 
+@pytest.helpers.register
+def build_vm(
+    program: bytes,
+    mode: ExecutionMode = ExecutionMode.INTERPRET,
+    data: Optional[Mapping[int, bytes]] = None,
+    registers: Optional[Mapping[int, int]] = None,
+    **kwargs
+) -> Chip8VirtualMachine:
+    """
+    Build a VM with a program loaded where execution starts.
+
+    :param program: the program to load
+    :param mode: which execution mode the VM should use
+    :param data: other bytes to load, by address
+    :param registers: initial V register values, by register
+    :param kwargs: passed on to the VM
+    :return: the new VM
+    """
+    vm = Chip8VirtualMachine(execution_mode=mode, **kwargs)
+    vm.load_to_memory(program, DEFAULT_EXECUTION_START)
+    for location, contents in (data or {}).items():
+        vm.load_to_memory(contents, location)
+    for register, value in (registers or {}).items():
+        vm.v_registers[register] = value
+    return vm
+
+
+@pytest.helpers.register
+def full_state(vm: Chip8VirtualMachine) -> Tuple:
+    """
+    Return everything about a VM that running it can change.
+
+    Comparing this between VMs checks that they'd carry on identically,
+    whatever execution mode they use.
+
+    :param vm: the VM to describe
+    :return: a tuple which compares equal for matching VMs
+    """
+    return (
+        vm.dump_state(),
+        vm.i_register,
+        bytes(vm.memory),
+        vm.cycle_count,
+        vm._delay_timer.elapsed,
+        vm._sound_timer.elapsed,
+        vm.waiting_for_key,
+        vm.waiting_register,
+        tuple(vm._key_events),
+        vm.high_resolution,
+        vm.selected_planes,
+        tuple(
+            (plane.size, plane.pixels.tobytes())
+            for plane in vm.video_planes
+        ),
+    )
+
+
 @pytest.helpers.register
 def load_instruction(
     vm: Chip8VirtualMachine,
@@ -0,0 +1,110 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from eightdad.core import Chip8VirtualMachine as VM
+from eightdad.core.vm import DEFAULT_EXECUTION_START
+from eightdad.core.batch import Chip8Batch
+
+
+# Waits for a key, then draws its digit
+KEY_PROGRAM = bytes.fromhex(
+    "F30A"  # 200 V3 = key
+    "F329"  # 202 I = digit V3
+    "D335"  # 204 draw at V3, V3
+    "1206"  # 206 halt
+)
+
+
+def build_batch(num_lanes=4, program=KEY_PROGRAM, **kwargs) -> Chip8Batch:
+    batch = Chip8Batch(num_lanes, **kwargs)
+    batch.load_to_memory(program, DEFAULT_EXECUTION_START)
+    return batch
+
+
+def test_width_must_be_a_multiple_of_8():
+    with pytest.raises(ValueError):
+        Chip8Batch(2, display_size=(60, 32))
+
+
+def test_load_past_end_of_memory_raises():
+    with pytest.raises(IndexError):
+        Chip8Batch(2, memory_size=0x300).load_to_memory(b"\0" * 0x101, 0x200)
+
+
+def test_lanes_wait_for_their_own_keys():
+    batch = build_batch()
+    batch.run_cycles(3)
+    assert batch.waiting_for_key.all()
+    assert not batch.running.any()
+
+    batch.press(0xA, [1])
+    batch.press(0x5, [2, 3])
+    batch.press(0x7, [3])
+    batch.run_cycles(5)
+
+    assert list(batch.waiting_for_key) == [True, False, False, False]
+    assert list(batch.v_registers[:, 3]) == [0, 0xA, 0x5, 0x5]
+    assert batch.framebuffer(1) != batch.framebuffer(2)
+    assert batch.framebuffer(2) == batch.framebuffer(3)
+
+
+def test_held_key_satisfies_wait():
+    batch = build_batch()
+    batch.press(0x9, [0])
+    batch.step()
+
+    assert list(batch.waiting_for_key) == [False, True, True, True]
+    assert batch.v_registers[0, 3] == 0x9
+
+
+def test_to_vm_continues_like_the_lane():
+    batch = build_batch()
+    batch.press(0x4, [2])
+    batch.run_cycles(2)
+
+    vm = batch.to_vm(2)
+    batch.run_cycles(30)
+    for _ in range(30):
+        vm.tick()
+
+    assert batch.framebuffer(2) == vm.video_ram.pixels.tobytes()
+    assert bytes(batch.v_registers[2]) == bytes(vm.v_registers)
+    assert batch.program_counter[2] == vm.program_counter
+
+
+def test_to_vm_keeps_a_pending_key_wait():
+    batch = build_batch()
+    batch.step()
+    batch.press(0xC, [0])
+
+    vm = batch.to_vm(0)
+    assert vm.waiting_for_key
+    vm.tick()
+    assert vm.v_registers[3] == 0xC
+
+
+def test_random_draws_follow_the_seed():
+    program = bytes.fromhex("C0FFC10F1204")
+    first = build_batch(64, program, seed=3)
+    second = build_batch(64, program, seed=3)
+    first.run_cycles(2)
+    second.run_cycles(2)
+
+    assert (first.v_registers == second.v_registers).all()
+    assert (first.v_registers[:, 0] < 0xFF).all()
+    assert (first.v_registers[:, 1] <= 0x0F).all()
+    assert len(set(first.v_registers[:, 0])) > 1
+
+
+def test_timers_count_down_like_the_vm():
+    program = bytes.fromhex("600A" "F015" "F018" "1206")
+    batch = build_batch(2, program)
+    vm = VM()
+    vm.load_to_memory(program, DEFAULT_EXECUTION_START)
+
+    for _ in range(120):
+        batch.step()
+        vm.tick()
+        assert list(batch.delay_timer) == [vm.delay_timer] * 2
+        assert list(batch.sound_timer) == [vm.sound_timer] * 2
@@ -0,0 +1,165 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from eightdad.core import Chip8VirtualMachine as VM
+from eightdad.core.vm import DEFAULT_EXECUTION_START
+from eightdad.types import UnhandledInstructionError
+from eightdad.core.batch import Chip8Batch
+
+
+PROGRAM_LENGTH = 32
+NUM_CYCLES = 400
+
+
+def random_instruction(rng: random.Random, wrap: bool) -> int:
+    x = rng.randrange(16)
+    y = rng.randrange(16)
+    kk = rng.choice((0, 1, rng.randrange(256)))
+    # mostly stay inside the program, sometimes wander off the end
+    address = DEFAULT_EXECUTION_START + 2 * rng.randrange(PROGRAM_LENGTH + 2)
+
+    # these stop most lanes early, so keep them rare
+    if rng.random() < 0.04:
+        return rng.choice((
+            0x00EE,
+            x << 8 | 0xEE,
+            # draws the rest of memory, which can take thousands of
+            # rows when wrapping, so only use it when clipping
+            0xD000 | x << 8 | y << 4 | int(wrap),
+            rng.randrange(0x10000)
+        ))
+
+    return rng.choice((
+        0x00E0,
+        x << 8 | 0xE0,
+        0x1000 | address,
+        0x2000 | address,
+        0x3000 | x << 8 | kk,
+        0x4000 | x << 8 | kk,
+        0x5000 | x << 8 | y << 4,
+        0x6000 | x << 8 | kk,
+        0x7000 | x << 8 | kk,
+        0x8000 | x << 8 | y << 4 | rng.choice((0, 1, 2, 3, 4, 5, 6, 7, 0xE)),
+        0x9000 | x << 8 | y << 4,
+        0x2000 | address,
+        0xA000 | rng.choice((address, 0x050, 0xFF8, rng.randrange(0x1000))),
+        0xB000 | address,
+        0xD000 | x << 8 | y << 4 | rng.randrange(1, 16),
+        0xD000 | x << 8 | y << 4 | rng.randrange(1, 16),
+        0xE09E | x << 8,
+        0xE0A1 | x << 8,
+        0xF000 | x << 8 | rng.choice(
+            (0x07, 0x0A, 0x15, 0x18, 0x1E, 0x29, 0x33, 0x55, 0x65)),
+    ))
+
+
+def random_program(rng: random.Random, wrap: bool) -> bytes:
+    words = []
+    while len(words) < PROGRAM_LENGTH:
+        word = random_instruction(rng, wrap)
+        # Cxkk draws from a different generator in batches
+        if word >> 12 != 0xC:
+            words.append(word)
+    return b"".join(word.to_bytes(2, "big") for word in words)
+
+
+def random_key_events(rng: random.Random):
+    return {
+        rng.randrange(NUM_CYCLES): (rng.randrange(16), rng.random() < 0.6)
+        for _ in range(10)
+    }
+
+
+def run_vm(program: bytes, key_events, **vm_kwargs):
+    """
+    Tick a VM the way a batch lane runs, stopping at the first error.
+    """
+    vm = VM(**vm_kwargs)
+    vm.load_to_memory(program, DEFAULT_EXECUTION_START)
+    stopped_by = None
+
+    for cycle in range(NUM_CYCLES):
+        if cycle in key_events:
+            key, pressed = key_events[cycle]
+            vm.press(key) if pressed else vm.release(key)
+
+        if stopped_by is not None:
+            vm._advance_timers(1)
+            vm.cycle_count += 1
+            continue
+
+        try:
+            vm.tick()
+        except UnhandledInstructionError:
+            stopped_by = "unhandled"
+        except (IndexError, StopIteration):
+            stopped_by = "faulted"
+
+    return vm, stopped_by
+
+
+def assert_lane_matches(batch: Chip8Batch, lane: int, vm: VM, stopped_by):
+    assert bytes(batch.memory[lane]) == bytes(vm.memory)
+    assert bytes(batch.v_registers[lane]) == bytes(vm.v_registers)
+    assert batch.program_counter[lane] == vm.program_counter
+    assert batch.i_register[lane] == vm.i_register
+    assert list(batch.call_stack[lane, :batch.stack_size[lane]]) \
+        == vm.call_stack
+    assert batch.delay_timer[lane] == vm.delay_timer
+    assert batch.sound_timer[lane] == vm.sound_timer
+    assert batch.waiting_for_key[lane] == vm.waiting_for_key
+    assert batch.framebuffer(lane) == vm.video_ram.pixels.tobytes()
+    assert batch.unhandled[lane] == (stopped_by == "unhandled")
+    assert batch.faulted[lane] == (stopped_by == "faulted")
+
+
+@pytest.mark.parametrize("display_wrap", (False, True))
+@pytest.mark.parametrize("seed", range(6))
+def test_random_programs_match_vm(seed, display_wrap):
+    rng = random.Random(seed)
+    num_lanes = 48
+    programs = [
+        random_program(rng, display_wrap) for _ in range(num_lanes)]
+    key_events = [random_key_events(rng) for _ in range(num_lanes)]
+
+    batch = Chip8Batch(
+        num_lanes, display_wrap=display_wrap, stack_depth=NUM_CYCLES)
+    for lane, program in enumerate(programs):
+        batch.memory[lane, DEFAULT_EXECUTION_START:][:len(program)] = \
+            np.frombuffer(program, dtype=np.uint8)
+
+    for cycle in range(NUM_CYCLES):
+        for lane, events in enumerate(key_events):
+            if cycle in events:
+                key, pressed = events[cycle]
+                if pressed:
+                    batch.press(key, [lane])
+                else:
+                    batch.release(key, [lane])
+        batch.step()
+
+    for lane in range(num_lanes):
+        vm, stopped_by = run_vm(
+            programs[lane], key_events[lane], display_wrap=display_wrap)
+        assert_lane_matches(batch, lane, vm, stopped_by)
+
+
+@pytest.mark.parametrize("program", [
+    "6001" "F029" "D005" "01E0" "1208",  # draw, then clear with 01E0
+    "2206" "1202" "0000" "0FEE",  # call, then return with 0FEE
+])
+def test_hi_byte_of_clear_and_return_is_ignored(program):
+    program = bytes.fromhex(program)
+    batch = Chip8Batch(1)
+    batch.memory[0, DEFAULT_EXECUTION_START:][:len(program)] = \
+        np.frombuffer(program, dtype=np.uint8)
+
+    for _ in range(NUM_CYCLES):
+        batch.step()
+
+    vm, stopped_by = run_vm(program, {})
+    assert stopped_by is None
+    assert_lane_matches(batch, 0, vm, stopped_by)
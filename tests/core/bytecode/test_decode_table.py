@@ -0,0 +1,58 @@
+import pytest
+from eightdad.core.bytecode import (
+    Chip8Instruction as Instruction,
+    DecodedInstruction,
+    FIRST_NIBBLE_TO_HANDLER,
+    decode_raw,
+    get_decode_table,
+)
+
+
+SAMPLE_INSTRUCTIONS = (
+    0x00E0, 0x00EE, 0x1ABC, 0x2DEF, 0x3F05, 0x4A19, 0x51A0, 0x6AF2,
+    0x7824, 0x8124, 0x9870, 0xADEF, 0xB789, 0xC678, 0xD4E7, 0xEF9E,
+    0xFB33
+)
+
+DECODED_FIELDS = ('pattern', 'type_nibble', 'hi_byte', 'lo_byte')
+PATTERN_FIELDS = ('nnn', 'x', 'y', 'kk', 'n')
+
+
+class TestDecodeTable:
+
+    def test_table_covers_every_instruction(self):
+        table = get_decode_table()
+        assert len(table) == 0x10000
+        assert all(entry.raw == raw for raw, entry in enumerate(table))
+
+    def test_table_is_built_once(self):
+        assert get_decode_table() is get_decode_table()
+
+    def test_table_is_immutable(self):
+        table = get_decode_table()
+        with pytest.raises(TypeError):
+            table[0] = decode_raw(1)
+        with pytest.raises(AttributeError):
+            table[0].x = 1
+
+    @pytest.mark.parametrize("raw", SAMPLE_INSTRUCTIONS)
+    def test_entries_match_chip8instruction(self, raw):
+        """Table entries agree with the legible decoder on used fields"""
+        entry = get_decode_table()[raw]
+        instruction = Instruction(raw)
+
+        for field in DECODED_FIELDS:
+            assert getattr(entry, field) == getattr(instruction, field)
+
+        for field in PATTERN_FIELDS:
+            try:
+                expected = getattr(instruction, field)
+            except AttributeError:
+                continue
+            assert getattr(entry, field) == expected
+
+    @pytest.mark.parametrize("raw", SAMPLE_INSTRUCTIONS)
+    def test_entries_name_family_handler(self, raw):
+        entry = get_decode_table()[raw]
+        assert isinstance(entry, DecodedInstruction)
+        assert entry.handler == FIRST_NIBBLE_TO_HANDLER[raw >> 12]
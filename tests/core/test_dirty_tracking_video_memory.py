@@ -0,0 +1,89 @@
+import random
+
+import pytest
+from bitarray import bitarray
+
+from eightdad.core import DirtyTrackingVideoRam, VideoRam
+from eightdad.core.video import DirtyRegion
+
+
+def clean(width=64, height=32, wrap=False) -> DirtyTrackingVideoRam:
+    v = DirtyTrackingVideoRam(width, height, wrap)
+    v.consume_dirty()
+    return v
+
+
+def test_starts_fully_dirty():
+    v = DirtyTrackingVideoRam(16, 4)
+    assert v.consume_dirty() == DirtyRegion(frozenset(range(4)), 0, 0, 16, 4)
+    assert v.consume_dirty() is None
+
+
+def test_sprite_marks_rows_and_box():
+    v = clean()
+    v.draw_sprite(10, 5, b"\xFF\x00\x81")
+    assert v.consume_dirty() == DirtyRegion(frozenset({5, 7}), 10, 5, 18, 8)
+
+
+def test_clipped_sprite_stays_on_screen():
+    v = clean()
+    v.draw_sprite(60, 30, b"\xFF\xFF\xFF")
+    assert v.consume_dirty() == DirtyRegion(
+        frozenset({30, 31}), 60, 30, 64, 32)
+
+
+def test_wrapped_sprite_spans_the_screen():
+    v = clean(wrap=True)
+    v.draw_sprite(60, 31, b"\xFF\xFF")
+    assert v.consume_dirty() == DirtyRegion(frozenset({0, 31}), 0, 0, 64, 32)
+
+
+def test_xor_pixel():
+    v = clean()
+    v.xor_pixel(3, 4, True)
+    v.xor_pixel(70, 4, True)
+    v.xor_pixel(9, 4, False)
+    assert v.consume_dirty() == DirtyRegion(frozenset({4}), 3, 4, 4, 5)
+
+
+def test_clear_screen_only_dirties_if_something_was_on():
+    v = clean()
+    v.clear_screen()
+    assert v.consume_dirty() is None
+
+    v.xor_pixel(0, 0, True)
+    v.consume_dirty()
+    v.clear_screen()
+    assert v.consume_dirty() == DirtyRegion(
+        frozenset(range(32)), 0, 0, 64, 32)
+
+
+def test_load_pixels_dirties_everything():
+    v = clean(8, 2)
+    v.load_pixels(b"\0\0")
+    assert v.consume_dirty() == DirtyRegion(frozenset({0, 1}), 0, 0, 8, 2)
+
+
+@pytest.mark.parametrize("wrap", [False, True])
+@pytest.mark.parametrize("size", [(64, 32), (60, 30), (5, 3)])
+def test_every_change_is_inside_the_region(size, wrap):
+    rng = random.Random(f"{size}{wrap}")
+    v = clean(*size, wrap)
+    untracked = VideoRam(*size, wrap)
+
+    for _ in range(200):
+        before = v.pixels.copy()
+        x, y = rng.randrange(size[0] + 8), rng.randrange(size[1] + 8)
+        data = bytes(rng.randrange(256) for _ in range(rng.randrange(6)))
+
+        assert v.draw_sprite(x, y, data, num_bytes=len(data)) \
+            == untracked.draw_sprite(x, y, data, num_bytes=len(data))
+        assert v.pixels == untracked.pixels
+
+        region = v.consume_dirty()
+        changed = before ^ v.pixels
+        for index in changed.search(bitarray("1")):
+            changed_y, changed_x = divmod(index, size[0])
+            assert changed_y in region.rows
+            assert region.left <= changed_x < region.right
+            assert region.top <= changed_y < region.bottom
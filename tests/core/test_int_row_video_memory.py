@@ -0,0 +1,127 @@
+import random
+
+import pytest
+from bitarray import bitarray
+from bitarray.util import urandom
+
+from eightdad.core import Chip8VirtualMachine as VM, IntRowVideoRam, VideoRam
+from eightdad.core.vm import DEFAULT_EXECUTION_START, ExecutionMode
+
+SIZES = [(64, 32), (60, 30), (8, 4), (5, 3), (128, 64)]
+
+
+def random_operation(rng: random.Random, size):
+    """Return a (method name, args) pair to apply to both VideoRams"""
+    width, height = size
+    choice = rng.random()
+    if choice < 0.05:
+        return "clear_screen", ()
+    if choice < 0.3:
+        return "xor_pixel", (
+            rng.randrange(width + 8), rng.randrange(height + 8), True)
+
+    x = rng.randrange(256)
+    y = rng.randrange(256)
+    if rng.random() < 0.7:
+        x %= width + 8
+        y %= height + 8
+    data = bytes(rng.randrange(256) for _ in range(rng.randrange(16)))
+    return "draw_sprite", (x, y, data)
+
+
+@pytest.mark.parametrize("wrap", [False, True])
+@pytest.mark.parametrize("size", SIZES)
+def test_matches_bitarray_video_ram(size, wrap):
+    rng = random.Random(f"{size}{wrap}")
+    expected = VideoRam(*size, wrap)
+    rows = IntRowVideoRam(*size, wrap)
+
+    for _ in range(300):
+        name, args = random_operation(rng, size)
+        assert getattr(rows, name)(*args) == getattr(expected, name)(*args)
+        assert rows.pixels == expected.pixels
+
+    x, y = rng.randrange(size[0]), rng.randrange(size[1])
+    assert rows[x, y] == expected[x, y]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_load_pixels_replaces_rows(size):
+    expected = VideoRam(*size)
+    expected.pixels[:] = urandom(len(expected.pixels), endian='big')
+
+    rows = IntRowVideoRam(*size)
+    rows.draw_sprite(0, 0, b"\xFF" * 4)
+    rows.load_pixels(expected.pixels.tobytes())
+
+    assert rows.pixels == expected.pixels
+    assert all(
+        rows[x, y] == expected[x, y]
+        for x in range(size[0]) for y in range(size[1]))
+
+
+def test_load_pixels_rejects_wrong_size():
+    with pytest.raises(ValueError):
+        IntRowVideoRam(64, 32).load_pixels(bytes(255))
+
+
+def test_pixels_stays_the_same_object():
+    rows = IntRowVideoRam(16, 2)
+    pixels = rows.pixels
+    rows.draw_sprite(4, 1, b"\xFF")
+
+    assert rows.pixels is pixels
+    assert pixels.tobytes() == b"\0\0\x0F\xF0"
+
+
+@pytest.mark.parametrize("wrap", [False, True])
+def test_xor_row_matches_bitarray_video_ram(wrap):
+    row = bitarray("1011001110001101", endian='big')
+    rows = IntRowVideoRam(20, 2, wrap)
+    expected = VideoRam(20, 2, wrap)
+
+    for x in (0, 4, 9, 19):
+        assert rows.xor_row(x, 1, row) == expected.xor_row(x, 1, row)
+        assert rows.pixels == expected.pixels
+
+
+# Draws digits 0 to 9 in a line, then halts
+DIGITS_PROGRAM = bytes.fromhex(
+    "6000"  # 200 V0 = 0
+    "6102"  # 202 V1 = 2
+    "F029"  # 204 I = digit V0
+    "D125"  # 206 draw at V1, V1
+    "7106"  # 208 V1 += 6
+    "7001"  # 20A V0 += 1
+    "300A"  # 20C skip if V0 == 10
+    "1204"  # 20E loop
+    "1210"  # 210 halt
+)
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+def test_vm_draws_the_same_with_either_type(mode):
+    screens = []
+    for video_ram_type in (VideoRam, IntRowVideoRam):
+        vm = VM(execution_mode=mode, video_ram_type=video_ram_type)
+        vm.load_to_memory(DIGITS_PROGRAM, DEFAULT_EXECUTION_START)
+        vm.run_cycles(200)
+        screens.append(vm.video_ram.pixels.tobytes())
+
+    assert screens[0] == screens[1]
+    assert any(screens[0])
+
+
+def test_vm_snapshots_restore_int_rows():
+    vm = VM(video_ram_type=IntRowVideoRam)
+    vm.load_to_memory(DIGITS_PROGRAM, DEFAULT_EXECUTION_START)
+    vm.run_cycles(30)
+    snapshot = vm.snapshot()
+    halfway = vm.video_ram.pixels.tobytes()
+
+    vm.run_cycles(200)
+    vm.restore(snapshot)
+
+    assert vm.video_ram.pixels.tobytes() == halfway
+    assert vm.video_ram.rows == [
+        int.from_bytes(halfway[y * 8:(y + 1) * 8], 'big') for y in range(32)]
@@ -0,0 +1,110 @@
+import pytest
+from eightdad.core import Chip8VirtualMachine as VM
+from eightdad.core.rewind import Delta, Keyframe, RewindBuffer
+from eightdad.core.vm import ExecutionMode
+
+build_vm = pytest.helpers.build_vm
+full_state = pytest.helpers.full_state
+
+
+# Counts in V0, stores it in memory and draws it each time around
+COUNTER_PROGRAM = bytes.fromhex(
+    "A300"  # 200 I = 300
+    "7001"  # 202 V0 += 1
+    "F033"  # 204 BCD V0 to 300
+    "F029"  # 206 I = digit V0
+    "00E0"  # 208 clear screen
+    "D125"  # 20A draw
+    "1200"  # 20C loop
+)
+
+
+def record_frames(vm: VM, rewind: RewindBuffer, frames: int):
+    states = []
+    for _ in range(frames):
+        vm.run_cycles(vm.ticks_per_frame)
+        rewind.record()
+        states.append(full_state(vm))
+    return states
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+@pytest.mark.parametrize("display_size", [(64, 32), (60, 30)])
+@pytest.mark.parametrize("track_dirty_pages", [False, True])
+def test_steps_back_through_every_frame(
+        mode, display_size, track_dirty_pages):
+    vm = build_vm(
+        COUNTER_PROGRAM,
+        mode,
+        display_size=display_size,
+        track_dirty_pages=track_dirty_pages
+    )
+    rewind = RewindBuffer(vm, keyframe_interval=4)
+    states = record_frames(vm, rewind, 11)
+
+    for expected in reversed(states[:-1]):
+        assert rewind.step_back()
+        assert full_state(vm) == expected
+
+    assert not rewind.step_back()
+    assert len(rewind) == 1
+
+
+def test_recording_continues_after_stepping_back():
+    vm = build_vm(COUNTER_PROGRAM)
+    rewind = RewindBuffer(vm, keyframe_interval=3)
+    record_frames(vm, rewind, 5)
+    for _ in range(3):
+        rewind.step_back()
+
+    states = record_frames(vm, rewind, 5)
+    assert len(rewind) == 7
+
+    for expected in reversed(states[:-1]):
+        rewind.step_back()
+        assert full_state(vm) == expected
+
+
+@pytest.mark.parametrize("track_dirty_pages", [False, True])
+def test_deltas_only_hold_what_changed(track_dirty_pages):
+    vm = build_vm(COUNTER_PROGRAM, track_dirty_pages=track_dirty_pages)
+    rewind = RewindBuffer(vm)
+    record_frames(vm, rewind, 2)
+    keyframe, delta = rewind._entries
+
+    assert isinstance(keyframe, Keyframe)
+    assert isinstance(delta, Delta)
+    assert [page for page, _ in delta.pages] == [3]
+    assert 0 < len(delta.rows) <= 5
+    assert all(len(row) == 8 for _, row in delta.rows)
+
+
+def test_stays_within_memory_budget():
+    vm = build_vm(COUNTER_PROGRAM)
+    budget = 4 * len(vm.snapshot())
+    rewind = RewindBuffer(vm, keyframe_interval=2, memory_budget=budget)
+    states = record_frames(vm, rewind, 50)
+
+    assert rewind.memory_used <= budget
+    assert isinstance(rewind._entries[0], Keyframe)
+
+    # the newest frames are still there to step back to
+    for expected in reversed(states[-len(rewind):-1]):
+        assert rewind.step_back()
+        assert full_state(vm) == expected
+
+
+def test_clear():
+    vm = build_vm(COUNTER_PROGRAM)
+    rewind = RewindBuffer(vm)
+    record_frames(vm, rewind, 3)
+    rewind.clear()
+
+    assert len(rewind) == 0
+    assert rewind.memory_used == 0
+    assert not rewind.step_back()
+
+
+def test_rejects_keyframe_interval_below_1():
+    with pytest.raises(ValueError):
+        RewindBuffer(build_vm(COUNTER_PROGRAM), keyframe_interval=0)
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from eightdad.core import DirtyTrackingVideoRam, IntRowVideoRam, VideoRam
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("video_ram_type", [
+    VideoRam, IntRowVideoRam, DirtyTrackingVideoRam])
+@pytest.mark.parametrize("size", [(64, 32), (60, 30), (128, 64)])
+def test_unpacked_matches_getitem(video_ram_type, size):
+    rng = random.Random(str(size))
+    v = video_ram_type(*size)
+    for _ in range(20):
+        v.draw_sprite(
+            rng.randrange(size[0]), rng.randrange(size[1]),
+            bytes(rng.randrange(256) for _ in range(5)))
+
+    array = v.as_array()
+
+    assert array.shape == (size[1], size[0])
+    assert array.dtype == np.bool_
+    assert [
+        [v[x, y] for x in range(size[0])] for y in range(size[1])
+    ] == array.tolist()
+
+
+def test_packed_is_a_read_only_view():
+    v = VideoRam(64, 32)
+    packed = v.as_array(packed=True)
+    assert packed.shape == (32, 8)
+    assert not packed.flags.writeable
+
+    v.draw_sprite(8, 2, b"\xA5")
+    assert packed[2, 1] == 0xA5
+
+    with pytest.raises(ValueError):
+        packed[0, 0] = 1
+
+
+def test_packed_is_flat_for_odd_widths():
+    v = VideoRam(60, 30)
+    packed = v.as_array(packed=True)
+    assert packed.shape == (225,)
+    assert packed.tobytes() == v.pixels.tobytes()
+
+
+def test_int_rows_are_synced_before_viewing():
+    v = IntRowVideoRam(64, 32)
+    v.draw_sprite(0, 31, b"\xFF")
+    assert v.as_array(packed=True)[31, 0] == 0xFF
+    assert v.as_array()[31, :8].all()
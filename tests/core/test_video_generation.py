@@ -0,0 +1,75 @@
+import zlib
+
+import pytest
+from bitarray import bitarray
+
+from eightdad.core import DirtyTrackingVideoRam, IntRowVideoRam, VideoRam
+
+VIDEO_RAM_TYPES = [VideoRam, IntRowVideoRam, DirtyTrackingVideoRam]
+
+
+@pytest.fixture(params=VIDEO_RAM_TYPES)
+def video_ram_type(request):
+    return request.param
+
+
+def test_starts_at_zero(video_ram_type):
+    assert video_ram_type().generation == 0
+
+
+@pytest.mark.parametrize("call", [
+    lambda v: v.draw_sprite(4, 4, b"\x80"),
+    lambda v: v.draw_sprite(70, 40, b"\xFF", num_bytes=1),
+    lambda v: v.xor_pixel(5, 5, True),
+    lambda v: v.xor_row(60, 3, bitarray("11110001")),
+], ids=["sprite", "wrapped sprite", "pixel", "wrapped row"])
+def test_bumps_on_change(video_ram_type, call):
+    v = video_ram_type(wrap=True)
+    call(v)
+    assert v.generation > 0
+
+
+@pytest.mark.parametrize("call", [
+    lambda v: v.draw_sprite(4, 4, b"\0\0"),
+    lambda v: v.draw_sprite(70, 4, b"\xFF", num_bytes=1),
+    lambda v: v.draw_sprite(60, 4, b"\x0F"),
+    lambda v: v.draw_sprite(4, 40, b"\xFF", num_bytes=1),
+    lambda v: v.xor_pixel(5, 5, False),
+    lambda v: v.xor_pixel(70, 5, True),
+    lambda v: v.xor_row(60, 3, bitarray("00001111")),
+    lambda v: v.clear_screen(),
+    lambda v: v.load_pixels(bytes(256)),
+], ids=[
+    "blank sprite", "sprite off right", "sprite clipped to nothing",
+    "sprite off bottom", "pixel with false", "pixel off screen",
+    "row clipped to nothing", "clearing a blank screen", "same pixels"])
+def test_stays_put_without_change(video_ram_type, call):
+    v = video_ram_type()
+    call(v)
+    assert v.generation == 0
+
+
+def test_clear_and_load_bump_when_they_change_pixels(video_ram_type):
+    v = video_ram_type()
+    v.xor_pixel(1, 1, True)
+    before = v.generation
+
+    v.clear_screen()
+    assert v.generation > before
+
+    before = v.generation
+    v.load_pixels(b"\xFF" * 256)
+    assert v.generation > before
+
+
+def test_frame_hash_tracks_contents(video_ram_type):
+    v = video_ram_type()
+    blank = v.frame_hash
+    assert blank == zlib.crc32(bytes(256))
+
+    v.draw_sprite(10, 10, b"\x3C\x42")
+    assert v.frame_hash == zlib.crc32(v.pixels.tobytes())
+    assert v.frame_hash != blank
+
+    v.draw_sprite(10, 10, b"\x3C\x42")
+    assert v.frame_hash == blank
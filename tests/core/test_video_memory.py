@@ -1,9 +1,12 @@
+import random
+
 import pytest
 
 from typing import Generator, Tuple
 from itertools import product
 
 from eightdad.core import VideoRam
+from eightdad.core.video import sprite_mask
 
 ALLOW_SKIP_WHEN_DEBUGGER_ENABLED = True
 
@@ -214,3 +217,90 @@ class TestDraw:
         v = VideoRam(8, 3)
         v.draw_sprite(0, 1, data, num_bytes=1)
         assert b"\0\xA0\0" == v.pixels.tobytes()
+
+
+def draw_by_pixel(v: VideoRam, x: int, y: int, data: bytes) -> bool:
+    """Reference draw, one xor_pixel call per lit sprite pixel"""
+    unset = False
+    for row, byte in enumerate(data):
+        for column in range(8):
+            if byte & (0x80 >> column):
+                unset |= v.xor_pixel(x + column, y + row, True)
+    return unset
+
+
+class TestDrawRows:
+    """
+    Row-at-a-time drawing matches drawing each pixel separately
+    """
+
+    @pytest.mark.parametrize("wrap", [False, True])
+    @pytest.mark.parametrize("size", [(64, 32), (60, 30), (8, 4), (5, 3)])
+    def test_matches_pixel_by_pixel(self, size, wrap):
+        rng = random.Random(f"{size}{wrap}")
+        rows = VideoRam(*size, wrap)
+        pixels = VideoRam(*size, wrap)
+
+        for _ in range(300):
+            x = rng.randrange(256)
+            y = rng.randrange(256)
+            if rng.random() < 0.7:
+                x %= size[0] + 8
+                y %= size[1] + 8
+            data = bytes(rng.randrange(256) for _ in range(rng.randrange(16)))
+
+            assert rows.draw_sprite(x, y, data, num_bytes=len(data)) \
+                == draw_by_pixel(pixels, x, y, data)
+            assert rows.pixels == pixels.pixels
+
+    def test_wrapped_row_splits_across_the_line(self):
+        v = VideoRam(16, 2, wrap=True)
+        assert not v.draw_sprite(12, 1, b"\xFF")
+        assert v.pixels.tobytes() == b"\0\0\xF0\x0F"
+
+    def test_clipped_row_is_cut_at_the_edge(self):
+        v = VideoRam(16, 2)
+        assert not v.draw_sprite(12, 1, b"\xFF")
+        assert v.pixels.tobytes() == b"\0\0\0\x0F"
+
+    @pytest.mark.parametrize("x", [0, 70])
+    def test_running_out_of_source_still_fails(self, x):
+        v = VideoRam(64, 32)
+        with pytest.raises(StopIteration):
+            v.draw_sprite(x, 0, b"\xFF\xFF", num_bytes=3)
+
+
+class TestSpriteMasks:
+    """
+    Sprites drawn from cached masks follow changes to sprite memory
+    """
+
+    def test_edited_memory_draws_new_content(self):
+        memory = bytearray(b"\xF0\x90")
+        v = VideoRam(16, 4)
+        v.draw_sprite(3, 1, memory)
+
+        memory[1] = 0x0F
+        v.clear_screen()
+        v.draw_sprite(3, 1, memory)
+
+        expected = VideoRam(16, 4)
+        draw_by_pixel(expected, 3, 1, b"\xF0\x0F")
+        assert v.pixels == expected.pixels
+
+    def test_repeat_draws_reuse_masks(self):
+        sprite_mask.cache_clear()
+        v = VideoRam(64, 32)
+        for _ in range(3):
+            v.draw_sprite(21, 7, b"\x3C\x42\x81")
+
+        assert sprite_mask.cache_info().hits == 2
+        assert sprite_mask.cache_info().misses == 1
+
+    def test_masks_are_not_modified_by_drawing(self):
+        mask = sprite_mask(b"\xFF\x81", 4, 16, False)
+        before = mask.lines.copy()
+        v = VideoRam(16, 4)
+        v.draw_sprite(4, 3, b"\xFF\x81")
+        v.draw_sprite(4, 0, b"\xFF\x81")
+        assert mask.lines == before
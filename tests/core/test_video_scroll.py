@@ -0,0 +1,177 @@
+import random
+
+import pytest
+from bitarray.util import urandom
+
+from eightdad.core import DirtyTrackingVideoRam, IntRowVideoRam, VideoRam
+
+VIDEO_RAM_TYPES = [VideoRam, IntRowVideoRam, DirtyTrackingVideoRam]
+SIZES = [(64, 32), (128, 64), (60, 30), (5, 3)]
+METHODS = ["scroll_down", "scroll_up", "scroll_left", "scroll_right"]
+
+
+def random_screen(video_ram_type, size):
+    reference = VideoRam(*size)
+    reference.pixels[:] = urandom(len(reference.pixels), endian='big')
+
+    vram = video_ram_type(*size)
+    vram.load_pixels(reference.pixels.tobytes())
+    return vram
+
+
+def scrolled(vram, dx, dy):
+    """Reference scroll, moving each pixel by (dx, dy) one at a time"""
+    width, height = vram.size
+    return [
+        [
+            0 <= x - dx < width and 0 <= y - dy < height
+            and vram[x - dx, y - dy]
+            for x in range(width)
+        ]
+        for y in range(height)
+    ]
+
+
+def screen(vram):
+    width, height = vram.size
+    return [[vram[x, y] for x in range(width)] for y in range(height)]
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("video_ram_type", VIDEO_RAM_TYPES)
+@pytest.mark.parametrize("lines", [1, 2, 15, 40, 70])
+def test_scroll_down(video_ram_type, size, lines):
+    vram = random_screen(video_ram_type, size)
+    expected = scrolled(vram, 0, lines)
+
+    vram.scroll_down(lines)
+
+    assert screen(vram) == expected
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("video_ram_type", VIDEO_RAM_TYPES)
+@pytest.mark.parametrize("lines", [1, 2, 15, 40, 70])
+def test_scroll_up(video_ram_type, size, lines):
+    vram = random_screen(video_ram_type, size)
+    expected = scrolled(vram, 0, -lines)
+
+    vram.scroll_up(lines)
+
+    assert screen(vram) == expected
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("video_ram_type", VIDEO_RAM_TYPES)
+@pytest.mark.parametrize("columns", [1, 4, 59, 64, 200])
+@pytest.mark.parametrize("right", [False, True])
+def test_scroll_sideways(video_ram_type, size, columns, right):
+    vram = random_screen(video_ram_type, size)
+    expected = scrolled(vram, columns if right else -columns, 0)
+
+    if right:
+        vram.scroll_right(columns)
+    else:
+        vram.scroll_left(columns)
+
+    assert screen(vram) == expected
+
+
+@pytest.mark.parametrize("video_ram_type", VIDEO_RAM_TYPES)
+@pytest.mark.parametrize("method", METHODS)
+def test_scrolling_blank_screen_keeps_generation(video_ram_type, method):
+    vram = video_ram_type()
+
+    getattr(vram, method)(4)
+
+    assert vram.generation == 0
+    assert not vram.pixels.any()
+
+
+@pytest.mark.parametrize("video_ram_type", VIDEO_RAM_TYPES)
+@pytest.mark.parametrize("method", METHODS)
+def test_scrolling_bumps_generation(video_ram_type, method):
+    vram = video_ram_type()
+    vram.draw_sprite(30, 10, b"\xFF\xFF")
+    generation = vram.generation
+
+    getattr(vram, method)(4)
+
+    assert vram.generation > generation
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_scrolling_marks_screen_dirty(method):
+    vram = DirtyTrackingVideoRam()
+    vram.draw_sprite(30, 10, b"\xFF")
+    vram.consume_dirty()
+
+    getattr(vram, method)(4)
+
+    region = vram.consume_dirty()
+    assert region.rows == frozenset(range(32))
+    assert (region.left, region.right) == (0, 64)
+
+
+@pytest.mark.parametrize("video_ram_type", VIDEO_RAM_TYPES)
+def test_resize_clears_screen(video_ram_type):
+    vram = video_ram_type()
+    vram.draw_sprite(0, 0, b"\xFF")
+    generation = vram.generation
+
+    vram.resize(128, 64)
+
+    assert vram.size == (128, 64)
+    assert len(vram.pixels) == 128 * 64
+    assert not vram.pixels.any()
+    assert vram.generation > generation
+
+    vram.draw_sprite(120, 60, b"\x01")
+    assert vram[127, 60]
+
+
+def test_resize_marks_new_screen_dirty():
+    vram = DirtyTrackingVideoRam(128, 64)
+    vram.consume_dirty()
+
+    vram.resize(64, 32)
+
+    assert vram.consume_dirty() == (frozenset(range(32)), 0, 0, 64, 32)
+
+
+def test_resize_rejects_empty_screen():
+    with pytest.raises(ValueError):
+        VideoRam().resize(0, 32)
+
+
+def draw_wide_by_pixel(vram, x, y, data):
+    unset = False
+    for line in range(len(data) // 2):
+        bits = (data[2 * line] << 8) | data[2 * line + 1]
+        for column in range(16):
+            if bits & (0x8000 >> column):
+                unset |= vram.xor_pixel(x + column, y + line, True)
+    return unset
+
+
+@pytest.mark.parametrize("wrap", [False, True])
+@pytest.mark.parametrize("video_ram_type", VIDEO_RAM_TYPES)
+@pytest.mark.parametrize("size", [(128, 64), (64, 32), (12, 8)])
+def test_draw_wide_sprite_matches_pixels(video_ram_type, size, wrap):
+    rng = random.Random(f"{size}{wrap}")
+    expected = VideoRam(*size, wrap)
+    vram = video_ram_type(*size, wrap)
+
+    for _ in range(50):
+        x = rng.randrange(size[0] + 20)
+        y = rng.randrange(size[1] + 20)
+        data = bytes(rng.randrange(256) for _ in range(32))
+
+        assert vram.draw_wide_sprite(x, y, data) \
+            == draw_wide_by_pixel(expected, x, y, data)
+        assert vram.pixels == expected.pixels
+
+
+def test_draw_wide_sprite_short_source():
+    with pytest.raises(IndexError):
+        VideoRam().draw_wide_sprite(0, 0, bytes(31))
@@ -0,0 +1,64 @@
+import pytest
+from eightdad.core import Chip8VirtualMachine as VM
+from eightdad.core.bytecode import get_decode_table
+
+
+load_and_execute_instruction = pytest.helpers.load_and_execute_instruction
+
+
+def test_family_handlers_can_be_called_directly():
+    """Family handlers run whatever current_instruction holds"""
+    vm = VM()
+    vm.v_registers[3] = 0x42
+    vm.current_instruction = get_decode_table()[0xF315]
+
+    vm.handle_ixii()
+
+    assert vm.delay_timer == 0x42
+
+
+def test_instruction_parser_alias_reads_current_instruction():
+    vm = VM()
+    vm.current_instruction = get_decode_table()[0x6A12]
+    assert vm.instruction_parser.x == 0xA
+    assert vm.instruction_parser.kk == 0x12
+
+
+def test_instruction_parser_decode_sets_current_instruction():
+    """Code calling the old parser's decode still drives the handlers"""
+    vm = VM()
+    vm.v_registers[3] = 0x42
+    vm.instruction_parser.decode(bytes.fromhex("6A12F315"), 2)
+
+    assert vm.current_instruction == get_decode_table()[0xF315]
+    assert vm.instruction_parser.pattern == vm.current_instruction.pattern
+
+    vm.handle_ixii()
+    assert vm.delay_timer == 0x42
+
+
+def test_subclass_overrides_are_dispatched_to():
+    """Overriding a family handler in a subclass still takes effect"""
+
+    class CountingVM(VM):
+        def __init__(self, *args, **kwargs):
+            self.ixkk_calls = 0
+            super().__init__(*args, **kwargs)
+
+        def handle_ixkk(self) -> None:
+            self.ixkk_calls += 1
+            super().handle_ixkk()
+
+    vm = CountingVM()
+    load_and_execute_instruction(vm, 0x6A12)
+
+    assert vm.ixkk_calls == 1
+    assert vm.v_registers[0xA] == 0x12
+
+
+@pytest.mark.parametrize("raw", (0x0123, 0x800F, 0xE0FF, 0xF0FF))
+def test_gaps_in_tables_are_unhandled(raw):
+    vm = VM()
+    with pytest.raises(ValueError):
+        load_and_execute_instruction(vm, raw)
+    assert vm.instruction_unhandled
@@ -10,10 +10,11 @@ from unittest.mock import Mock
 import pytest
 
 from eightdad.core import Chip8VirtualMachine as VM, VideoRam
-from eightdad.core.vm import DEFAULT_EXECUTION_START
+from eightdad.core.vm import DEFAULT_EXECUTION_START, ExecutionMode
 
 
 load_and_execute_instruction = pytest.helpers.load_and_execute_instruction
+build_vm = pytest.helpers.build_vm
 
 
 @pytest.mark.parametrize("call_location", (0xF00, 0x500))
@@ -52,3 +53,13 @@ def test_00e0_calls_vram_clear_screen():
     load_and_execute_instruction(vm, 0x00E0)
     assert vm.video_ram.clear_screen.called_once()
 
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+def test_hi_byte_is_ignored(mode):
+    """0nE0 and 0nEE clear and return for any n, as 00E0 and 00EE do"""
+    vm = build_vm(bytes.fromhex("01E0" "2206" "0000" "03EE"), mode)
+    vm.video_ram.draw_sprite(0, 0, b"\x80")
+
+    vm.run_cycles(3)
+    assert not vm.video_ram.pixels.any()
+    assert vm.program_counter == DEFAULT_EXECUTION_START + 4
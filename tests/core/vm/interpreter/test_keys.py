@@ -144,3 +144,61 @@ class TestEXA1SkipIfKeyInXNotPressed:
         vm.tick(1/20.0)
         assert vm.program_counter == DEFAULT_EXECUTION_START + INSTRUCTION_LENGTH
 
+
+
+class TestFX0AKeyEvents:
+
+    def setup_vm(self) -> VM:
+        vm = VM()
+        load_multiple(vm, 0xF30A, 0xA000)
+        vm.tick()
+        return vm
+
+    def test_waiting_vm_is_blocked_on_input(self):
+        vm = self.setup_vm()
+        assert vm.waiting_for_key
+        assert vm.blocked_on_input
+
+        vm.tick()
+        assert vm.blocked_on_input
+
+    def test_press_unblocks_before_next_tick(self):
+        vm = self.setup_vm()
+        vm.press(0x7)
+        assert not vm.blocked_on_input
+
+        vm.tick()
+        assert not vm.waiting_for_key
+        assert vm.v_registers[3] == 0x7
+
+    def test_first_press_wins(self):
+        vm = self.setup_vm()
+        vm.press(0xC)
+        vm.press(0x2)
+        vm.tick()
+        assert vm.v_registers[3] == 0xC
+
+    def test_press_released_before_tick_still_counts(self):
+        vm = self.setup_vm()
+        vm.press(0x9)
+        vm.release(0x9)
+        vm.tick()
+        assert vm.v_registers[3] == 0x9
+
+    def test_presses_before_waiting_are_ignored(self):
+        vm = VM()
+        load_multiple(vm, 0x6000, 0xF30A)
+        vm.press(0x4)
+        vm.release(0x4)
+        vm.tick()
+        vm.tick()
+        assert vm.blocked_on_input
+
+    def test_held_key_satisfies_wait_immediately(self):
+        vm = VM()
+        load_multiple(vm, 0xF30A)
+        vm.press(0xB)
+        vm.press(0x5)
+        vm.tick()
+        assert not vm.waiting_for_key
+        assert vm.v_registers[3] == 0x5
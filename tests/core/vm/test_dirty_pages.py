@@ -0,0 +1,60 @@
+import pytest
+from eightdad.core import Chip8VirtualMachine as VM
+from eightdad.core.vm import ExecutionMode, MEMORY_PAGE_SIZE
+
+build_vm = pytest.helpers.build_vm
+
+
+def test_untracked_vm_has_no_dirty_pages():
+    vm = VM()
+    vm.load_to_memory(b"\xff", 0x300)
+    assert not vm.tracks_dirty_pages
+    assert vm.dirty_pages == frozenset()
+    vm.clear_dirty_pages()
+
+
+def test_load_to_memory_marks_every_page_it_touches():
+    vm = VM(track_dirty_pages=True)
+    vm.clear_dirty_pages()
+    vm.load_to_memory(b"\xff" * 3, 2 * MEMORY_PAGE_SIZE - 1)
+    assert vm.dirty_pages == {1, 2}
+
+
+def test_empty_load_marks_nothing():
+    vm = VM(track_dirty_pages=True)
+    vm.clear_dirty_pages()
+    vm.load_to_memory(b"", 0x300)
+    assert vm.dirty_pages == frozenset()
+
+
+def test_clear_dirty_pages():
+    vm = VM(track_dirty_pages=True)
+    vm.clear_dirty_pages()
+    vm.load_to_memory(b"\xff", 0x300)
+    vm.clear_dirty_pages()
+    assert vm.dirty_pages == frozenset()
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+@pytest.mark.parametrize("program,expected", [
+    (bytes.fromhex("A3FF" "6A7B" "FA33" "1206"), {3, 4}),  # BCD
+    (bytes.fromhex("A5F8" "FF55" "1204"), {5, 6}),  # save registers
+    (bytes.fromhex("A5F0" "FF65" "1204"), set()),  # load registers
+])
+def test_instructions_mark_pages_they_write(mode, program, expected):
+    vm = build_vm(program, mode, track_dirty_pages=True)
+    vm.clear_dirty_pages()
+    vm.run_cycles(8)
+    assert vm.dirty_pages == expected
+
+
+def test_restore_only_marks_changed_pages():
+    vm = VM(track_dirty_pages=True)
+    vm.clear_dirty_pages()
+    snapshot = vm.snapshot()
+    vm.load_to_memory(b"\x01", 0x510)
+    vm.load_to_memory(b"\x01", 0xA00)
+    vm.clear_dirty_pages()
+
+    vm.restore(snapshot)
+    assert vm.dirty_pages == {5, 10}
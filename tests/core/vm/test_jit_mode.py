@@ -0,0 +1,197 @@
+"""
+JIT mode must behave exactly like the interpreter.
+"""
+import random
+import pytest
+from eightdad.core.vm import ExecutionMode, DEFAULT_EXECUTION_START
+
+build_vm = pytest.helpers.build_vm
+full_state = pytest.helpers.full_state
+
+
+# Arithmetic, timers, calls, memory writes and drawing in a loop
+TIMED_LOOP = bytes.fromhex(
+    "6A05"  # 200 VA = 5
+    "6B03"  # 202 VB = 3
+    "8AB4"  # 204 VA += VB
+    "8AB5"  # 206 VA -= VB
+    "8AB7"  # 208 VA = VB - VA
+    "8FA6"  # 20A VF = VA >> 1
+    "8ABE"  # 20C VA = VB << 1
+    "8AB1"  # 20E VA |= VB
+    "8AB2"  # 210 VA &= VB
+    "8AB3"  # 212 VA ^= VB
+    "F015"  # 214 DT = V0
+    "7CFF"  # 216 VC += 0xFF
+    "F107"  # 218 V1 = DT
+    "3C00"  # 21A skip if VC == 0
+    "C2FF"  # 21C V2 = random
+    "F229"  # 21E I = digit V2
+    "D125"  # 220 draw digit
+    "A300"  # 222 I = 300
+    "FC33"  # 224 BCD of VC
+    "F265"  # 226 load V0 - V2 from I
+    "2240"  # 228 call 240
+    "00E0"  # 22A clear screen
+    "1200"  # 22C loop
+    "0000"  # 22E padding
+    "0000000000000000"
+    "0000000000000000"
+    "7D01"  # 240 VD += 1
+    "F01E"  # 242 I += V0
+    "FD55"  # 244 save V0 - VD
+    "00EE"  # 246 return
+)
+
+
+@pytest.mark.parametrize("min_instructions", (1, 30, 700))
+def test_jit_matches_interpreter(min_instructions):
+    jitted = build_vm(TIMED_LOOP, ExecutionMode.JIT, registers={0: 7})
+
+    random.seed(3)
+    executed = 0
+    while executed < min_instructions:
+        executed += jitted.tick_block()
+
+    interpreted = build_vm(TIMED_LOOP, registers={0: 7})
+    random.seed(3)
+    for _ in range(executed):
+        interpreted.tick()
+
+    assert full_state(jitted) == full_state(interpreted)
+
+
+def test_blocks_stop_before_timer_instructions():
+    vm = build_vm(TIMED_LOOP, ExecutionMode.JIT, registers={0: 7})
+    assert vm.tick_block() == 10
+    assert vm.program_counter == 0x214
+
+
+def test_timer_instructions_can_start_blocks():
+    vm = build_vm(TIMED_LOOP, ExecutionMode.JIT, registers={0: 7})
+    assert vm._jit.lookup(0x214).length == 2
+
+
+@pytest.mark.parametrize(
+    "start,length",
+    (
+        (0x218, 2),  # skip
+        (0x21C, 5),  # Fx33 memory write
+        (0x226, 2),  # call
+        (0x22A, 2),  # jump
+        (0x240, 3),  # Fx55 memory write
+        (0x246, 1),  # return
+    )
+)
+def test_blocks_end_after_control_flow_and_writes(start, length):
+    vm = build_vm(TIMED_LOOP, ExecutionMode.JIT, registers={0: 7})
+    assert vm._jit.lookup(start).length == length
+
+
+def test_registers_are_held_in_locals():
+    vm = build_vm(TIMED_LOOP, ExecutionMode.JIT, registers={0: 7})
+    source = vm._jit.lookup(DEFAULT_EXECUTION_START).source
+    body = source.split("\n")[3:-4]
+    assert not any("registers[" in line for line in body if "=" not in line)
+
+
+def test_interpreted_instructions_run_one_at_a_time():
+    vm = build_vm(bytes.fromhex("F00A"), ExecutionMode.JIT, registers={0: 7})
+    assert vm.execute_block() == 1
+    assert vm.waiting_for_key
+
+
+def test_unhandled_instruction_still_raises():
+    vm = build_vm(bytes.fromhex("FFFF"), ExecutionMode.JIT, registers={0: 7})
+    with pytest.raises(ValueError):
+        vm.tick_block()
+
+
+class TestErrorsInsideBlocks:
+
+    # each sets some registers, then raises partway through the block
+    @pytest.mark.parametrize("program", [
+        "6005" "6106" "A3FF" "00EE",  # return with an empty stack
+        "6005" "6A03" "AFFE" "D015",  # draw past the end of memory
+        "6005" "6A03" "AFFE" "F265",  # load past the end of memory
+        "6005" "6A03" "AFFF" "F155",  # save past the end of memory
+        "6011" "6A03" "E09E",  # skip on a key past the last one
+    ])
+    @pytest.mark.parametrize(
+        "mode", [ExecutionMode.PREDECODE, ExecutionMode.JIT])
+    def test_stop_where_the_interpreter_does(self, mode, program):
+        expected = build_vm(bytes.fromhex(program))
+        vm = build_vm(bytes.fromhex(program), mode)
+
+        with pytest.raises(Exception) as expected_error:
+            expected.run_cycles(10)
+        with pytest.raises(expected_error.type):
+            vm.run_cycles(10)
+
+        assert full_state(vm) == full_state(expected)
+
+    def test_registers_are_stored_before_raising(self):
+        vm = build_vm(
+            bytes.fromhex("600561066A03A3FF00EE"), ExecutionMode.JIT)
+
+        with pytest.raises(IndexError):
+            vm.run_cycles(10)
+
+        assert vm.program_counter == 0x208
+        assert vm.cycle_count == 4
+        assert vm.v_registers[0:2] == bytes([5, 6])
+        assert vm.i_register == 0x3FF
+
+    def test_tick_block_counts_like_tick(self):
+        program = bytes.fromhex("600561066A03A3FF00EE")
+        ticked = build_vm(program)
+        vm = build_vm(program, ExecutionMode.JIT)
+
+        with pytest.raises(IndexError):
+            for _ in range(5):
+                ticked.tick()
+        with pytest.raises(IndexError):
+            vm.tick_block()
+
+        assert full_state(vm) == full_state(ticked)
+
+
+class TestInvalidation:
+
+    def test_self_modifying_code_is_picked_up(self):
+        vm = build_vm(bytes.fromhex(
+            "2208"  # 200 call 208, compiling it
+            "F155"  # 202 write V0 and V1 over 208
+            "2208"  # 204 call 208 again
+            "1206"  # 206 halt
+            "6C01"  # 208 VC = 1, rewritten to VC = 7
+            "00EE"  # 20A return
+        ), ExecutionMode.JIT, registers={0: 7})
+        vm.v_registers[0] = 0x6C
+        vm.v_registers[1] = 0x07
+        vm.i_register = 0x208
+
+        vm.tick_block()
+        vm.tick_block()
+        assert vm.v_registers[0xC] == 1
+
+        vm.tick_block()
+        vm.tick_block()
+        vm.tick_block()
+        assert vm.v_registers[0xC] == 7
+
+    def test_writes_only_drop_overlapping_blocks(self):
+        vm = build_vm(TIMED_LOOP, ExecutionMode.JIT, registers={0: 7})
+        vm._jit.lookup(0x200)
+        vm._jit.lookup(0x240)
+
+        vm.load_to_memory(b"\x12", 0x241)
+        assert 0x200 in vm._jit._blocks
+        assert 0x240 not in vm._jit._blocks
+
+    def test_recompiling_same_bytes_reuses_function(self):
+        vm = build_vm(TIMED_LOOP, ExecutionMode.JIT, registers={0: 7})
+        first = vm._jit.lookup(0x240).run
+
+        vm.load_to_memory(vm.memory[0x240:0x248], 0x240)
+        assert vm._jit.lookup(0x240).run is first
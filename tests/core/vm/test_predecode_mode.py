@@ -0,0 +1,121 @@
+"""
+Predecode mode must behave exactly like the interpreter.
+"""
+import random
+import pytest
+from eightdad.core import Chip8VirtualMachine as VM
+from eightdad.core.vm import ExecutionMode, DEFAULT_EXECUTION_START
+
+build_vm = pytest.helpers.build_vm
+full_state = pytest.helpers.full_state
+
+
+# Exercises arithmetic, skips, calls, I manipulation and drawing in a loop
+ARITHMETIC_LOOP = bytes.fromhex(
+    "00E0"  # 200 clear screen
+    "6A05"  # 202 VA = 5
+    "6B03"  # 204 VB = 3
+    "8AB4"  # 206 VA += VB
+    "8AB5"  # 208 VA -= VB
+    "8AB7"  # 20A VA = VB - VA
+    "8AB6"  # 20C VA = VB >> 1
+    "8ABE"  # 20E VA = VB << 1
+    "8AB1"  # 210 VA |= VB
+    "8AB2"  # 212 VA &= VB
+    "8AB3"  # 214 VA ^= VB
+    "7CFF"  # 216 VC += 0xFF
+    "3C00"  # 218 skip if VC == 0
+    "4C01"  # 21A skip if VC != 1
+    "5AB0"  # 21C skip if VA == VB
+    "9AB0"  # 21E skip if VA != VB
+    "C1FF"  # 220 V1 = random
+    "F129"  # 222 I = digit V1
+    "D125"  # 224 draw digit
+    "F11E"  # 226 I += V1
+    "F165"  # 228 load V0, V1 from I
+    "2230"  # 22A call 230
+    "1206"  # 22C loop
+    "0000"  # 22E padding
+    "7D01"  # 230 VD += 1
+    "8DC4"  # 232 VD += VC
+    "00EE"  # 234 return
+)
+
+
+def test_interpret_is_the_default_mode():
+    assert VM().execution_mode == ExecutionMode.INTERPRET
+
+
+@pytest.mark.parametrize("num_ticks", (1, 17, 500))
+def test_predecode_matches_interpreter(num_ticks):
+    interpreted = build_vm(ARITHMETIC_LOOP)
+    predecoded = build_vm(ARITHMETIC_LOOP, ExecutionMode.PREDECODE)
+
+    random.seed(8)
+    for _ in range(num_ticks):
+        interpreted.tick()
+
+    random.seed(8)
+    for _ in range(num_ticks):
+        predecoded.tick()
+
+    assert full_state(predecoded) == full_state(interpreted)
+
+
+def test_fx65_loads_up_to_the_end_of_memory():
+    vm = build_vm(bytes.fromhex("F265"), ExecutionMode.PREDECODE)
+    vm.v_registers[0:3] = bytes([1, 2, 3])
+    vm.i_register = len(vm.memory) - 2
+    vm.memory[-2:] = bytes([7, 8])
+
+    with pytest.raises(IndexError):
+        vm.tick()
+    assert vm.v_registers[0:3] == bytes([7, 8, 3])
+    assert vm.program_counter == DEFAULT_EXECUTION_START
+
+
+class TestInvalidation:
+
+    def test_fx55_rewriting_code_is_picked_up(self):
+        """Code rewritten by Fx55 runs the new instruction"""
+        vm = build_vm(bytes.fromhex(
+            "2208"  # 200 call 208, caching its instructions
+            "F155"  # 202 write V0 and V1 over 208
+            "2208"  # 204 call 208 again
+            "1206"  # 206 halt
+            "6C01"  # 208 VC = 1, rewritten to VC = 7
+            "00EE"  # 20A return
+        ), ExecutionMode.PREDECODE)
+        vm.v_registers[0] = 0x6C
+        vm.v_registers[1] = 0x07
+        vm.i_register = 0x208
+
+        for _ in range(4):
+            vm.tick()
+        assert vm.v_registers[0xC] == 1
+
+        for _ in range(3):
+            vm.tick()
+        assert vm.v_registers[0xC] == 7
+
+    def test_fx33_drops_overlapping_entries(self):
+        vm = build_vm(bytes.fromhex("A203F033"), ExecutionMode.PREDECODE)
+        vm.tick()
+        vm.tick()
+        assert vm._predecoded[0x200] is not None
+        assert vm._predecoded[0x202] is None
+
+    def test_load_to_memory_is_picked_up(self):
+        vm = build_vm(bytes.fromhex("6A01"), ExecutionMode.PREDECODE)
+        vm.tick()
+        assert vm.v_registers[0xA] == 1
+
+        vm.load_to_memory(bytes.fromhex("6A02"), DEFAULT_EXECUTION_START)
+        vm.program_counter = DEFAULT_EXECUTION_START
+        vm.tick()
+        assert vm.v_registers[0xA] == 2
+
+    def test_unhandled_instruction_still_raises(self):
+        vm = build_vm(bytes.fromhex("FFFF"), ExecutionMode.PREDECODE)
+        with pytest.raises(ValueError):
+            vm.tick()
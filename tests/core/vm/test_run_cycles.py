@@ -0,0 +1,183 @@
+import random
+import pytest
+from eightdad.core import Chip8VirtualMachine as VM
+from eightdad.core.vm import (
+    DEFAULT_EXECUTION_START,
+    ExecutionMode,
+    StopReason
+)
+
+build_vm = pytest.helpers.build_vm
+full_state = pytest.helpers.full_state
+
+
+# Counts down with the delay timer while doing arithmetic
+TIMED_PROGRAM = bytes.fromhex(
+    "60FF"  # 200 V0 = FF
+    "F015"  # 202 DT = V0
+    "F118"  # 204 ST = V1
+    "7101"  # 206 V1 += 1
+    "C2FF"  # 208 V2 = random
+    "8124"  # 20A V1 += V2
+    "F307"  # 20C V3 = DT
+    "A300"  # 20E I = 300
+    "F355"  # 210 save V0 - V3
+    "3300"  # 212 skip if V3 == 0
+    "1206"  # 214 loop
+    "1216"  # 216 halt
+)
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+@pytest.mark.parametrize("num_cycles", (1, 9, 10, 11, 600, 5000))
+def test_run_cycles_matches_ticking(mode, num_cycles):
+    ticked = build_vm(TIMED_PROGRAM)
+    random.seed(5)
+    for _ in range(num_cycles):
+        ticked.tick()
+
+    ran = build_vm(TIMED_PROGRAM, mode)
+    random.seed(5)
+    expected = StopReason.HALTED if ticked.halted else StopReason.CYCLE_LIMIT
+    assert ran.run_cycles(num_cycles) == expected
+
+    assert full_state(ran) == full_state(ticked)
+
+
+class TestRunFrame:
+
+    def test_runs_one_frame_of_cycles(self):
+        vm = build_vm(TIMED_PROGRAM)
+        assert vm.run_frame() == StopReason.FRAME_END
+        assert vm.cycle_count == vm.ticks_per_frame
+
+    def test_finishes_a_partial_frame(self):
+        vm = build_vm(TIMED_PROGRAM)
+        vm.run_cycles(7)
+        assert vm.run_frame() == StopReason.FRAME_END
+        assert vm.cycle_count == vm.ticks_per_frame
+
+
+class TestEarlyStops:
+
+    def test_key_wait_idles_remaining_cycles(self):
+        vm = build_vm(bytes.fromhex("F015F00A"))
+        vm.v_registers[0] = 10
+
+        assert vm.run_cycles(100) == StopReason.KEY_WAIT
+        assert vm.cycle_count == 100
+        assert vm.program_counter == DEFAULT_EXECUTION_START + 4
+        assert vm.delay_timer == 0
+
+    def test_key_wait_resumes_after_press(self):
+        vm = build_vm(bytes.fromhex("F00A6A01"))
+        assert vm.run_cycles(10) == StopReason.KEY_WAIT
+
+        vm.press(0x5)
+        assert vm.run_cycles(1) == StopReason.CYCLE_LIMIT
+        assert vm.v_registers[0] == 0x5
+        assert vm.v_registers[0xA] == 1
+
+    def test_held_key_doesnt_stop_the_run(self):
+        vm = build_vm(bytes.fromhex("F00A6A01"))
+        vm.press(0x3)
+        assert vm.run_cycles(2) == StopReason.CYCLE_LIMIT
+        assert vm.v_registers[0xA] == 1
+
+    @pytest.mark.parametrize("mode", list(ExecutionMode))
+    def test_unhandled_instruction_stops_run(self, mode):
+        vm = build_vm(bytes.fromhex("6A01FFFF"), mode)
+        assert vm.run_cycles(10) == StopReason.UNHANDLED
+        assert vm.instruction_unhandled
+        assert vm.program_counter == DEFAULT_EXECUTION_START + 2
+        assert vm.cycle_count == 1
+
+    @pytest.mark.parametrize("mode", list(ExecutionMode))
+    def test_breakpoint_stops_before_address(self, mode):
+        vm = build_vm(TIMED_PROGRAM, mode)
+        vm.breakpoints.add(0x20C)
+
+        assert vm.run_cycles(100) == StopReason.BREAKPOINT
+        assert vm.program_counter == 0x20C
+        assert vm.cycle_count == 6
+
+    def test_breakpoint_can_be_resumed(self):
+        vm = build_vm(TIMED_PROGRAM)
+        vm.breakpoints.add(0x20C)
+        vm.run_cycles(100)
+
+        assert vm.run_cycles(100) == StopReason.BREAKPOINT
+        assert vm.program_counter == 0x20C
+        assert vm.cycle_count == 6 + 8
+
+
+# Spins on the delay timer, then halts
+SPIN_PROGRAM = bytes.fromhex(
+    "6A3D"  # 200 VA = 61
+    "FA15"  # 202 DT = VA
+    "F507"  # 204 V5 = DT
+    "3500"  # 206 skip if V5 == 0
+    "1204"  # 208 loop
+    "7B01"  # 20A VB += 1
+    "120C"  # 20C halt
+)
+
+
+class TestIdleLoops:
+
+    @pytest.mark.parametrize("mode", list(ExecutionMode))
+    @pytest.mark.parametrize("ticks_per_frame", (10, 13))
+    @pytest.mark.parametrize(
+        "num_cycles",
+        (1, 5, 6, 7, 8, 100, 599, 600, 601, 602, 603, 604, 605, 606, 2000)
+    )
+    def test_skipping_matches_ticking(self, mode, ticks_per_frame, num_cycles):
+        ticked = VM(ticks_per_frame=ticks_per_frame)
+        ticked.load_to_memory(SPIN_PROGRAM, DEFAULT_EXECUTION_START)
+        for _ in range(num_cycles):
+            ticked.tick()
+
+        ran = VM(ticks_per_frame=ticks_per_frame, execution_mode=mode)
+        ran.load_to_memory(SPIN_PROGRAM, DEFAULT_EXECUTION_START)
+        reason = ran.run_cycles(num_cycles)
+
+        assert full_state(ran) == full_state(ticked)
+        if num_cycles == 2000:
+            assert reason == StopReason.HALTED
+
+    def test_spin_loop_isnt_interpreted(self):
+        vm = build_vm(SPIN_PROGRAM)
+        calls = []
+        execute = vm._execute_next
+
+        def counting_execute():
+            calls.append(vm.program_counter)
+            execute()
+
+        vm._execute_next = counting_execute
+        assert vm.run_cycles(10 ** 6) == StopReason.HALTED
+
+        assert len(calls) < 20
+        assert vm.v_registers[0xB] == 1
+        assert vm.cycle_count == 10 ** 6
+
+    def test_breakpoints_disable_skipping(self):
+        vm = build_vm(SPIN_PROGRAM)
+        vm.breakpoints.add(0x20A)
+
+        assert vm.run_cycles(10 ** 4) == StopReason.BREAKPOINT
+        assert vm.delay_timer == 0
+
+        vm.breakpoints.clear()
+        assert vm.run_cycles(10) == StopReason.HALTED
+        assert vm.halted
+
+    def test_modified_loop_isnt_skipped(self):
+        vm = build_vm(SPIN_PROGRAM)
+        vm.run_cycles(5)
+        # the jump still targets the loop, but it exits on V5 == 1 now
+        vm.memory[0x207] = 0x01
+
+        assert vm.run_cycles(590) == StopReason.CYCLE_LIMIT
+        assert vm.v_registers[5] == vm.delay_timer == 2
+        assert vm.program_counter in (0x204, 0x206, 0x208)
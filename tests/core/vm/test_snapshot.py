@@ -0,0 +1,156 @@
+import random
+
+import pytest
+from eightdad.core import Chip8VirtualMachine as VM
+from eightdad.core.vm import DEFAULT_EXECUTION_START, ExecutionMode
+from eightdad.types import InvalidSnapshotError
+
+build_vm = pytest.helpers.build_vm
+full_state = pytest.helpers.full_state
+
+
+# Draws, calls, saves registers and waits for a key along the way
+PROGRAM = bytes.fromhex(
+    "6A05"  # 200 VA = 5
+    "FA15"  # 202 DT = VA
+    "C0FF"  # 204 V0 = random
+    "F029"  # 206 I = digit V0
+    "D015"  # 208 draw
+    "2220"  # 20A call 220
+    "F10A"  # 20C V1 = key
+    "F129"  # 20E I = digit V1
+    "D115"  # 210 draw
+    "1204"  # 212 loop
+    "0000" * 6 +
+    "A300"  # 220 I = 300
+    "F155"  # 222 save V0, V1
+    "7201"  # 224 V2 += 1
+    "00EE"  # 226 return
+)
+
+
+def run_with_input(vm: VM, seed: int):
+    random.seed(seed)
+    for _ in range(40):
+        vm.run_cycles(7)
+        if vm.blocked_on_input:
+            vm.press(vm.cycle_count % 16)
+            vm.release(vm.cycle_count % 16)
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+def test_restore_rewinds_to_snapshot(mode):
+    vm = build_vm(PROGRAM, mode)
+    run_with_input(vm, 1)
+    snapshot = vm.snapshot()
+    before = full_state(vm)
+
+    run_with_input(vm, 2)
+    after = full_state(vm)
+    assert after != before
+
+    vm.restore(snapshot)
+    assert full_state(vm) == before
+
+    run_with_input(vm, 2)
+    assert full_state(vm) == after
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+def test_restore_into_another_vm(mode):
+    source = build_vm(PROGRAM)
+    run_with_input(source, 3)
+    source.press(0x4)
+
+    target = build_vm(bytes.fromhex("1200"), mode)
+    target.run_cycles(5)
+    target.restore(source.snapshot())
+    assert full_state(target) == full_state(source)
+
+    run_with_input(source, 4)
+    run_with_input(target, 4)
+    assert full_state(target) == full_state(source)
+
+
+def test_snapshot_keeps_a_pending_key_wait():
+    vm = build_vm(bytes.fromhex("F30A1202"))
+    vm.run_cycles(3)
+    vm.press(0xB)
+    snapshot = vm.snapshot()
+
+    restored = build_vm(PROGRAM)
+    restored.restore(snapshot)
+    assert restored.waiting_for_key
+    assert restored.waiting_register == 3
+
+    restored.tick()
+    assert restored.v_registers[3] == 0xB
+
+
+def test_snapshots_round_trip_across_a_key_wait():
+    vm = build_vm(bytes.fromhex("F30A1202"))
+
+    def assert_round_trips():
+        snapshot = vm.snapshot()
+        restored = build_vm(PROGRAM)
+        restored.restore(snapshot)
+        assert restored.snapshot() == snapshot
+
+    assert_round_trips()
+    vm.run_cycles(3)
+    assert vm.waiting_for_key
+    assert_round_trips()
+
+    vm.press(0xB)
+    vm.run_cycles(3)
+    assert not vm.waiting_for_key
+    assert_round_trips()
+
+
+def test_restore_copies_in_place():
+    vm = build_vm(PROGRAM)
+    memory = vm.memory
+    registers = vm.v_registers
+    call_stack = vm.call_stack
+    pixels = vm.video_ram.pixels
+
+    vm.restore(build_vm(b"\xff" * 16).snapshot())
+
+    assert vm.memory is memory
+    assert vm.v_registers is registers
+    assert vm.call_stack is call_stack
+    assert vm.video_ram.pixels is pixels
+    assert vm.memory[DEFAULT_EXECUTION_START] == 0xFF
+
+
+def test_snapshot_is_compact():
+    vm = build_vm(PROGRAM)
+    size = len(vm.memory) + len(vm.video_ram.pixels.tobytes())
+    assert len(vm.snapshot()) < size + 128
+
+
+class TestInvalidSnapshots:
+
+    def test_truncated(self):
+        with pytest.raises(InvalidSnapshotError):
+            build_vm(PROGRAM).restore(build_vm(PROGRAM).snapshot()[:-1])
+
+    def test_too_short_for_header(self):
+        with pytest.raises(InvalidSnapshotError):
+            build_vm(PROGRAM).restore(b"8DAD")
+
+    def test_wrong_magic(self):
+        snapshot = bytearray(build_vm(PROGRAM).snapshot())
+        snapshot[0:4] = b"NOPE"
+        with pytest.raises(InvalidSnapshotError):
+            build_vm(PROGRAM).restore(snapshot)
+
+    def test_different_memory_size(self):
+        small = VM(memory_size=2048)
+        with pytest.raises(InvalidSnapshotError):
+            build_vm(PROGRAM).restore(small.snapshot())
+
+    def test_different_display_size(self):
+        wide = VM(display_size=(128, 64))
+        with pytest.raises(InvalidSnapshotError):
+            build_vm(PROGRAM).restore(wide.snapshot())
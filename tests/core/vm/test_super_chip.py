@@ -0,0 +1,245 @@
+"""
+SUPER-CHIP instructions, which only run when the VM is built for them.
+"""
+import pytest
+from eightdad.core import Chip8VirtualMachine as VM, IntRowVideoRam
+from eightdad.core.rewind import RewindBuffer
+from eightdad.core.video import DEFAULT_LARGE_DIGITS
+from eightdad.core.vm import (
+    DEFAULT_EXECUTION_START,
+    DIGIT_HEIGHT,
+    ExecutionMode,
+    StopReason
+)
+from eightdad.types import InvalidSnapshotError, UnhandledInstructionError
+
+build_vm = pytest.helpers.build_vm
+full_state = pytest.helpers.full_state
+
+
+# Switches to high resolution, then draws, scrolls and switches back
+PROGRAM = bytes.fromhex(
+    "00FF"  # 200 high resolution
+    "6A05"  # 202 VA = 5
+    "FA30"  # 204 I = large digit VA
+    "6078"  # 206 V0 = 120
+    "6136"  # 208 V1 = 54
+    "D01A"  # 20A draw the digit at the bottom right
+    "A300"  # 20C I = 300
+    "D010"  # 20E draw a 16x16 sprite
+    "00C3"  # 210 scroll down 3
+    "00FB"  # 212 scroll right 4
+    "00FC"  # 214 scroll left 4
+    "D010"  # 216 draw it again
+    "00FE"  # 218 low resolution
+    "D010"  # 21A draw an 8x16 sprite
+    "00FB"  # 21C scroll right 4
+    "1200"  # 21E loop
+)
+
+# VM options with sprite data to draw from
+SUPER_CHIP = dict(data={0x300: bytes(range(0x81, 0xA1))}, super_chip=True)
+
+
+def run(vm: VM, program: str) -> None:
+    vm.load_to_memory(bytes.fromhex(program), vm.program_counter)
+    for _ in range(len(program) // 4):
+        vm.tick()
+
+
+def test_large_digits_loaded_after_small_ones():
+    vm = VM(super_chip=True)
+    location = vm.large_digits_memory_location
+
+    assert location == vm.digits_memory_location + 16 * DIGIT_HEIGHT
+    assert vm.memory[location:location + 160] \
+        == b"".join(DEFAULT_LARGE_DIGITS)
+
+
+def test_classic_vm_has_no_large_digits():
+    vm = VM()
+    assert vm.large_digits_memory_location is None
+    assert not any(vm.memory[16 * DIGIT_HEIGHT:DEFAULT_EXECUTION_START])
+
+
+@pytest.mark.parametrize(
+    "instruction", ["00FF", "00FE", "00C1", "00FB", "00FC", "F030"])
+def test_unhandled_without_super_chip(instruction):
+    vm = VM()
+    vm.load_to_memory(bytes.fromhex(instruction), DEFAULT_EXECUTION_START)
+
+    with pytest.raises(UnhandledInstructionError):
+        vm.tick()
+    assert vm.program_counter == DEFAULT_EXECUTION_START
+
+
+def test_classic_dxy0_draws_rest_of_memory():
+    vm = VM(memory_size=DEFAULT_EXECUTION_START + 20)
+    vm.load_to_memory(bytes.fromhex("D010") + b"\xFF" * 18, 0x200)
+    vm.i_register = 0x202
+
+    vm.tick()
+
+    assert vm.video_ram.pixels.count() == 8 * 18
+
+
+def test_resolution_switches():
+    vm = build_vm(PROGRAM, **SUPER_CHIP)
+    vm.video_ram.draw_sprite(0, 0, b"\xFF")
+
+    run(vm, "00FF")
+    assert vm.high_resolution
+    assert vm.video_ram.size == (128, 64)
+    assert not vm.video_ram.pixels.any()
+
+    run(vm, "00FE")
+    assert not vm.high_resolution
+    assert vm.video_ram.size == (64, 32)
+
+
+def test_high_resolution_doubles_display_size():
+    vm = build_vm(PROGRAM, display_size=(32, 16), **SUPER_CHIP)
+    run(vm, "00FF")
+    assert vm.video_ram.size == (64, 32)
+
+
+def test_switching_to_current_resolution_keeps_screen():
+    vm = build_vm(PROGRAM, **SUPER_CHIP)
+    vm.video_ram.draw_sprite(0, 0, b"\xFF")
+    generation = vm.video_ram.generation
+
+    run(vm, "00FE")
+
+    assert vm.video_ram.generation == generation
+    assert vm.video_ram[0, 0]
+
+
+def test_scroll_instructions():
+    vm = build_vm(PROGRAM, **SUPER_CHIP)
+    vm.video_ram.draw_sprite(8, 0, b"\x80")
+
+    run(vm, "00C5")
+    assert vm.video_ram[8, 5]
+
+    run(vm, "00FB")
+    assert vm.video_ram[12, 5]
+
+    run(vm, "00FC00FC")
+    assert vm.video_ram[4, 5]
+    assert vm.video_ram.pixels.count() == 1
+
+
+def test_fx30_points_at_large_digit():
+    vm = build_vm(PROGRAM, **SUPER_CHIP)
+    vm.v_registers[3] = 0xB
+
+    run(vm, "F330")
+
+    location = vm.large_digits_memory_location + 0xB * 10
+    assert vm.i_register == location
+    assert vm.memory[location:location + 10] == DEFAULT_LARGE_DIGITS[0xB]
+
+
+def test_dxy0_draws_16x16_in_high_resolution():
+    vm = build_vm(PROGRAM, **SUPER_CHIP)
+    vm.i_register = 0x300
+    run(vm, "00FFD010")
+
+    assert vm.video_ram.pixels.count() \
+        == sum(bin(byte).count("1") for byte in range(0x81, 0xA1))
+    # the first line is 0x81 0x82, and the last starts with 0x9F
+    assert vm.video_ram[7, 0] and vm.video_ram[14, 0]
+    assert not vm.video_ram[15, 0]
+    assert vm.video_ram[0, 15]
+    assert vm.v_registers[0xF] == 0
+
+    vm.program_counter = 0x202
+    vm.tick()
+    assert vm.v_registers[0xF] == 1
+    assert not vm.video_ram.pixels.any()
+
+
+def test_dxy0_draws_8x16_in_low_resolution():
+    vm = build_vm(PROGRAM, **SUPER_CHIP)
+    vm.i_register = 0x300
+    run(vm, "D010")
+
+    assert vm.video_ram.pixels.count() \
+        == sum(bin(byte).count("1") for byte in range(0x81, 0x91))
+    # the first line is 0x81 and the last is 0x90
+    assert vm.video_ram[7, 0] and vm.video_ram[3, 15]
+    assert not vm.video_ram[8, 0]
+
+
+def test_dxy0_past_end_of_memory():
+    vm = build_vm(PROGRAM, **SUPER_CHIP)
+    vm.i_register = len(vm.memory) - 8
+
+    with pytest.raises(IndexError):
+        run(vm, "00FFD010")
+
+
+@pytest.mark.parametrize("mode", [ExecutionMode.PREDECODE, ExecutionMode.JIT])
+def test_modes_match_interpreter(mode):
+    expected = build_vm(PROGRAM, **SUPER_CHIP)
+    vm = build_vm(PROGRAM, mode, **SUPER_CHIP)
+
+    for num_cycles in (1, 2, 3, 5, 7, 11, 13) * 3:
+        vm.run_cycles(num_cycles)
+        expected.run_cycles(num_cycles)
+        assert full_state(vm) == full_state(expected)
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+def test_run_frame_matches_interpreter(mode):
+    expected = build_vm(PROGRAM, video_ram_type=IntRowVideoRam, **SUPER_CHIP)
+    vm = build_vm(PROGRAM, mode, **SUPER_CHIP)
+
+    for _ in range(5):
+        assert vm.run_frame() == StopReason.FRAME_END
+        expected.run_frame()
+        assert full_state(vm) == full_state(expected)
+
+
+def test_snapshot_restores_resolution():
+    vm = build_vm(PROGRAM, **SUPER_CHIP)
+    for _ in range(8):
+        vm.tick()
+    assert vm.high_resolution
+    snapshot = vm.snapshot()
+    state = full_state(vm)
+
+    for _ in range(5):
+        vm.tick()
+    assert not vm.high_resolution
+
+    vm.restore(snapshot)
+    assert full_state(vm) == state
+
+    other = build_vm(PROGRAM, ExecutionMode.JIT, **SUPER_CHIP)
+    other.restore(snapshot)
+    assert full_state(other) == state
+
+
+def test_high_resolution_snapshot_needs_super_chip():
+    vm = build_vm(PROGRAM, **SUPER_CHIP)
+    vm.tick()
+    snapshot = vm.snapshot()
+
+    with pytest.raises(InvalidSnapshotError):
+        VM().restore(snapshot)
+
+
+def test_rewind_across_resolution_changes():
+    vm = build_vm(PROGRAM, **SUPER_CHIP)
+    rewind = RewindBuffer(vm, keyframe_interval=100)
+    states = []
+
+    for _ in range(16):
+        vm.tick()
+        rewind.record()
+        states.append(full_state(vm))
+
+    for state in reversed(states[:-1]):
+        assert rewind.step_back()
+        assert full_state(vm) == state
@@ -1,6 +1,8 @@
 import pytest
 
-from eightdad.core.vm import Timer
+from eightdad.core.vm import ExecutionMode, Timer
+
+build_vm = pytest.helpers.build_vm
 
 TWO_HUNDREDTH = 1.0 / 200
 
@@ -12,13 +14,14 @@ class TestTick:
         assert timer.elapsed == 0
 
         timer.tick(TWO_HUNDREDTH)
-        assert timer.elapsed == TWO_HUNDREDTH
+        # 3 cycles at 600 cycles per second, each worth 60
+        assert timer.elapsed == 180
 
     def test_overflowing_threshold__decrements_elapsed(self):
 
         timer = Timer()
 
-        initial_value = TWO_HUNDREDTH * 199
+        initial_value = 590
         timer.elapsed = initial_value
 
         timer.tick(TWO_HUNDREDTH)
@@ -30,7 +33,7 @@ class TestTick:
         timer = Timer()
         assert timer.value == 0
 
-        timer.tick(timer.decrement_threshold + 0.01)
+        timer.tick(1.0)
         assert timer.value == 0
 
     @pytest.mark.parametrize(
@@ -40,7 +43,7 @@ class TestTick:
     def test_non_zero_timer_decrements(self, initial_value):
         timer = Timer()
 
-        timer.elapsed = 199 * TWO_HUNDREDTH
+        timer.elapsed = 590
         timer.value = initial_value
 
         timer.tick(TWO_HUNDREDTH)
@@ -48,5 +51,126 @@ class TestTick:
         assert timer.value == initial_value - 1
 
 
+    @pytest.mark.parametrize("ticks_per_cycle", [1.5, 0.75, 2.25])
+    def test_partial_cycles_carry_between_ticks(self, ticks_per_cycle):
+        timer = Timer()
+        timer.value = 255
+        dt = 1 / (600 * ticks_per_cycle)
+
+        for _ in range(round(600 * ticks_per_cycle)):
+            timer.tick(dt)
+
+        assert timer.value == 255 - 60
+
+
+class TestVmTickLengths:
+
+    # a block of 6xkk instructions, looped
+    PROGRAM = bytes.fromhex("6001" * 5 + "1200")
+
+    def test_tick_carries_partial_cycles(self):
+        vm = build_vm(self.PROGRAM)
+        vm._delay_timer.value = 255
+        dt = 2 / (3 * vm.ticks_per_second)
+
+        for _ in range(3 * vm.ticks_per_second):
+            vm.tick(dt)
+
+        assert vm._delay_timer.value == 255 - 120
+
+    def test_tick_block_matches_tick(self):
+        ticked = build_vm(self.PROGRAM)
+        vm = build_vm(self.PROGRAM, ExecutionMode.JIT)
+        ticked._delay_timer.value = vm._delay_timer.value = 255
+        dt = 2 / (3 * vm.ticks_per_second)
+
+        while vm.cycle_count < 3 * vm.ticks_per_second:
+            vm.tick_block(dt)
+        for _ in range(vm.cycle_count):
+            ticked.tick(dt)
+
+        assert vm._delay_timer.value == ticked._delay_timer.value
+
+
+class TestAdvance:
+
+    @pytest.mark.parametrize("cycles_per_second", [600, 1000, 777])
+    def test_large_step_applies_every_decrement(self, cycles_per_second):
+        timer = Timer(cycles_per_second)
+        timer.value = 255
+
+        timer.advance(cycles_per_second * 2)
+
+        assert timer.value == 255 - 120
+        assert timer.elapsed == 0
+
+    def test_value_clamps_at_zero(self):
+        timer = Timer()
+        timer.value = 3
+
+        timer.advance(600 * 10)
+
+        assert timer.value == 0
+
+    @pytest.mark.parametrize("cycles_per_second", [600, 1000, 777])
+    def test_single_cycles_match_one_large_step(self, cycles_per_second):
+        stepped = Timer(cycles_per_second)
+        jumped = Timer(cycles_per_second)
+        stepped.value = jumped.value = 200
+
+        for _ in range(cycles_per_second + 13):
+            stepped.advance(1)
+        jumped.advance(cycles_per_second + 13)
+
+        assert (stepped.value, stepped.elapsed) == \
+            (jumped.value, jumped.elapsed)
+
+    def test_one_second_is_sixty_decrements_without_drift(self):
+        timer = Timer(1000)
+        timer.value = 255
+
+        for _ in range(1000 * 4):
+            timer.advance(1)
+
+        assert timer.value == 255 - 240
+        assert timer.elapsed == 0
+
+
+class TestCyclesUntilDecrement:
+
+    @pytest.mark.parametrize("cycles_per_second", [600, 1000, 777, 60, 30])
+    @pytest.mark.parametrize("offset", [0, 1, 5, 9])
+    def test_matches_stepping(self, cycles_per_second, offset):
+        timer = Timer(cycles_per_second)
+        timer.value = 200
+        timer.advance(offset)
+
+        expected = timer.cycles_until_decrement()
+
+        for cycle in range(1, expected + 1):
+            before = timer.value
+            timer.advance(1)
+            assert (timer.value < before) == (cycle == expected)
+
+
+class TestLookahead:
+
+    @pytest.mark.parametrize("cycles_per_second", [600, 1000, 777, 30])
+    @pytest.mark.parametrize("value", [0, 1, 2, 255])
+    @pytest.mark.parametrize("offset", [0, 3, 7])
+    def test_matches_stepping(self, cycles_per_second, value, offset):
+        timer = Timer(cycles_per_second)
+        timer.advance(offset)
+        timer.value = value
+
+        until_zero = timer.cycles_until_zero()
+        predicted = [timer.value_after(i) for i in range(until_zero + 3)]
 
+        stepped = []
+        for _ in range(until_zero + 3):
+            stepped.append(timer.value)
+            timer.advance(1)
 
+        assert predicted == stepped
+        assert stepped[until_zero] == 0
+        assert until_zero == 0 or stepped[until_zero - 1] > 0
@@ -0,0 +1,283 @@
+"""
+XO-CHIP instructions, which only run when the VM is built for them.
+"""
+import pytest
+from eightdad.core import Chip8VirtualMachine as VM, IntRowVideoRam
+from eightdad.core.bytecode import is_long_instruction
+from eightdad.core.rewind import RewindBuffer
+from eightdad.core.vm import (
+    DEFAULT_EXECUTION_START,
+    XO_CHIP_MEMORY_SIZE,
+    ExecutionMode
+)
+from eightdad.types import InvalidSnapshotError, UnhandledInstructionError
+
+build_vm = pytest.helpers.build_vm
+full_state = pytest.helpers.full_state
+
+
+# Draws to both planes, scrolls them separately and skips over F000 NNNN
+PROGRAM = bytes.fromhex(
+    "F0000400"  # 200 I = 400
+    "F301"      # 204 select both planes
+    "6005"      # 206 V0 = 5
+    "6103"      # 208 V1 = 3
+    "D014"      # 20A draw 4 lines to each plane
+    "00D1"      # 20C scroll up 1
+    "F201"      # 20E select the second plane
+    "00C2"      # 210 scroll down 2
+    "00FB"      # 212 scroll right 4
+    "3005"      # 214 skip if V0 == 5
+    "F0000500"  # 216 skipped
+    "A600"      # 21A I = 600
+    "5012"      # 21C save V0 to V1
+    "6000"      # 21E V0 = 0
+    "6100"      # 220 V1 = 0
+    "5103"      # 222 load V1 to V0
+    "7001"      # 224 V0 += 1
+    "F301"      # 226 select both planes
+    "A400"      # 228 I = 400
+    "D010"      # 22A draw a 16x16 sprite to each plane
+    "4005"      # 22C skip if V0 != 5
+    "F0000600"  # 22E skipped
+    "F101"      # 232 select the first plane
+    "00E0"      # 234 clear it
+    "F301"      # 236 select both planes
+    "D015"      # 238 draw 5 lines to each plane
+    "1200"      # 23A loop
+)
+
+# VM options with sprite data to draw from
+XO_CHIP = dict(data={0x400: bytes(range(0x81, 0xC1))}, xo_chip=True)
+
+
+def run(vm: VM, program: str) -> None:
+    vm.load_to_memory(bytes.fromhex(program), vm.program_counter)
+    for _ in range(len(program) // 4):
+        vm.tick()
+
+
+def test_xo_chip_defaults():
+    vm = VM(xo_chip=True)
+
+    assert vm.super_chip
+    assert len(vm.memory) == XO_CHIP_MEMORY_SIZE
+    assert len(vm.video_planes) == 2
+    assert vm.video_planes[0] is vm.video_ram
+    assert vm.selected_planes == 1
+
+
+def test_classic_vm_has_one_plane():
+    vm = VM()
+    assert len(vm.memory) == 4096
+    assert vm.video_planes == (vm.video_ram,)
+
+
+@pytest.mark.parametrize(
+    "instruction", ["F0000400", "F101", "00D1", "5012", "5013"])
+def test_unhandled_without_xo_chip(instruction):
+    vm = VM(super_chip=True)
+    vm.load_to_memory(bytes.fromhex(instruction), DEFAULT_EXECUTION_START)
+
+    with pytest.raises(UnhandledInstructionError):
+        vm.tick()
+    assert vm.program_counter == DEFAULT_EXECUTION_START
+
+
+def test_f000_needs_x_of_zero():
+    vm = build_vm(PROGRAM, **XO_CHIP)
+    vm.load_to_memory(bytes.fromhex("F1000400"), DEFAULT_EXECUTION_START)
+
+    with pytest.raises(UnhandledInstructionError):
+        vm.tick()
+
+
+def test_f000_loads_16_bit_i():
+    vm = build_vm(PROGRAM, **XO_CHIP)
+    vm.load_to_memory(bytes.fromhex("F000FFF0"), DEFAULT_EXECUTION_START)
+    vm.tick()
+
+    assert vm.i_register == 0xFFF0
+    assert vm.program_counter == DEFAULT_EXECUTION_START + 4
+
+
+def test_is_long_instruction():
+    memory = bytes.fromhex("F000F0")
+    assert is_long_instruction(memory, 0)
+    assert not is_long_instruction(memory, 1)
+    # running off the end isn't an error
+    assert not is_long_instruction(memory, 2)
+
+
+@pytest.mark.parametrize("skip, taken", [
+    ("3005", True), ("3006", False), ("4006", True), ("5010", True),
+    ("9010", False), ("E09E", False), ("E0A1", True),
+])
+def test_skips_step_over_f000(skip, taken):
+    vm = build_vm(PROGRAM, **XO_CHIP)
+    vm.v_registers[0] = vm.v_registers[1] = 5
+    vm.load_to_memory(
+        bytes.fromhex(skip + "F0000400"), DEFAULT_EXECUTION_START)
+
+    vm.tick()
+
+    expected = 6 if taken else 2
+    assert vm.program_counter == DEFAULT_EXECUTION_START + expected
+
+
+def test_5xy2_and_5xy3_copy_register_ranges():
+    vm = build_vm(PROGRAM, **XO_CHIP)
+    vm.v_registers[2:6] = bytes([1, 2, 3, 4])
+    vm.i_register = 0xFF00
+
+    run(vm, "5252")
+    assert vm.memory[0xFF00:0xFF04] == bytes([1, 2, 3, 4])
+
+    run(vm, "5522")
+    assert vm.memory[0xFF00:0xFF04] == bytes([4, 3, 2, 1])
+
+    run(vm, "5363")
+    assert vm.v_registers[3:7] == bytes([4, 3, 2, 1])
+    assert vm.i_register == 0xFF00
+
+
+def test_5xy2_past_end_of_memory():
+    vm = build_vm(PROGRAM, **XO_CHIP)
+    vm.i_register = len(vm.memory) - 2
+
+    with pytest.raises(IndexError):
+        run(vm, "5032")
+
+
+def test_draw_uses_selected_planes():
+    vm = build_vm(PROGRAM, **XO_CHIP)
+    vm.i_register = 0x400
+    first, second = vm.video_planes
+
+    run(vm, "F201D001")
+    assert not first.pixels.any()
+    assert second[0, 0] and second[7, 0]
+
+    # each plane's sprite follows the previous plane's
+    run(vm, "F301D001")
+    assert first[0, 0] and first[7, 0]
+    assert second.pixels.count() == 2
+    assert second[6, 0] and not second[0, 0]
+
+
+def test_draw_sets_vf_on_any_plane_collision():
+    vm = build_vm(PROGRAM, **XO_CHIP)
+    vm.i_register = 0x400
+
+    run(vm, "F201D001")
+    assert vm.v_registers[0xF] == 0
+
+    run(vm, "F301D001")
+    assert vm.v_registers[0xF] == 1
+
+
+def test_dxy0_draws_16x16_in_low_resolution():
+    vm = build_vm(PROGRAM, **XO_CHIP)
+    vm.i_register = 0x400
+    run(vm, "F301D010")
+
+    first, second = vm.video_planes
+    assert first.pixels.count() \
+        == sum(bin(byte).count("1") for byte in range(0x81, 0xA1))
+    assert second.pixels.count() \
+        == sum(bin(byte).count("1") for byte in range(0xA1, 0xC1))
+
+
+def test_clear_and_scroll_only_selected_planes():
+    vm = build_vm(PROGRAM, **XO_CHIP)
+    first, second = vm.video_planes
+    for plane in vm.video_planes:
+        plane.draw_sprite(8, 8, b"\x80")
+
+    run(vm, "F20100D3")
+    assert first[8, 8] and second[8, 5]
+
+    run(vm, "F10100E0")
+    assert not first.pixels.any()
+    assert second[8, 5]
+
+
+def test_resolution_switch_resizes_every_plane():
+    vm = build_vm(PROGRAM, **XO_CHIP)
+    run(vm, "00FF")
+    assert all(plane.size == (128, 64) for plane in vm.video_planes)
+
+
+@pytest.mark.parametrize("mode", [ExecutionMode.PREDECODE, ExecutionMode.JIT])
+def test_modes_match_interpreter(mode):
+    expected = build_vm(PROGRAM, **XO_CHIP)
+    vm = build_vm(PROGRAM, mode, **XO_CHIP)
+
+    for num_cycles in (1, 2, 3, 5, 7, 11, 13) * 5:
+        vm.run_cycles(num_cycles)
+        expected.run_cycles(num_cycles)
+        assert full_state(vm) == full_state(expected)
+
+
+# Overwrites the instruction after a skip with F000 once it has run
+SELF_MODIFYING = bytes.fromhex(
+    "3300"  # 200 skip if V3 == 0
+    "6401"  # 202 becomes F000
+    "6502"  # 204 V5 = 2, skipped once 202 is F000
+    "A202"  # 206 I = 202
+    "60F0"  # 208 V0 = F0
+    "6100"  # 20A V1 = 00
+    "5012"  # 20C save V0 to V1
+    "7601"  # 20E V6 += 1
+    "1200"  # 210 loop
+)
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+def test_writing_after_skip_invalidates_it(mode):
+    vm = build_vm(
+        SELF_MODIFYING, mode, video_ram_type=IntRowVideoRam, **XO_CHIP)
+
+    vm.run_cycles(8)
+    assert vm.program_counter == 0x200
+    vm.run_cycles(1)
+    assert vm.program_counter == 0x206
+
+
+def test_snapshot_restores_planes():
+    vm = build_vm(PROGRAM, **XO_CHIP)
+    vm.run_cycles(30)
+    snapshot = vm.snapshot()
+    state = full_state(vm)
+
+    vm.run_cycles(17)
+    assert full_state(vm) != state
+
+    vm.restore(snapshot)
+    assert full_state(vm) == state
+
+    other = build_vm(PROGRAM, ExecutionMode.JIT, **XO_CHIP)
+    other.restore(snapshot)
+    assert full_state(other) == state
+
+
+def test_snapshot_needs_matching_planes():
+    snapshot = build_vm(PROGRAM, **XO_CHIP).snapshot()
+
+    with pytest.raises(InvalidSnapshotError):
+        VM(super_chip=True, memory_size=XO_CHIP_MEMORY_SIZE).restore(snapshot)
+
+
+def test_rewind_restores_every_plane():
+    vm = build_vm(PROGRAM, **XO_CHIP)
+    rewind = RewindBuffer(vm, keyframe_interval=10)
+    states = []
+
+    for _ in range(40):
+        vm.tick()
+        rewind.record()
+        states.append(full_state(vm))
+
+    for state in reversed(states[:-1]):
+        assert rewind.step_back()
+        assert full_state(vm) == state
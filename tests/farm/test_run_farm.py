@@ -0,0 +1,107 @@
+import json
+
+import pytest
+from eightdad.core.vm import ExecutionMode, StopReason
+from eightdad.farm import (
+    FarmJob,
+    find_roms,
+    format_result,
+    run_farm,
+    run_job
+)
+
+
+HALTING_ROM = bytes.fromhex("6005F029D0051206")
+UNHANDLED_ROM = bytes.fromhex("6A01FFFF")
+# counts forever
+LOOPING_ROM = bytes.fromhex("70011200")
+# returns with nothing on the stack
+CRASHING_ROM = bytes.fromhex("600500EE")
+
+
+@pytest.fixture
+def rom_dir(tmp_path):
+    (tmp_path / "halt.ch8").write_bytes(HALTING_ROM)
+    (tmp_path / "unhandled.c8").write_bytes(UNHANDLED_ROM)
+    (tmp_path / "loop.CH8").write_bytes(LOOPING_ROM)
+    (tmp_path / "crash.ch8").write_bytes(CRASHING_ROM)
+    (tmp_path / "readme.txt").write_text("not a rom")
+    return tmp_path
+
+
+def test_find_roms_filters_directories_by_suffix(rom_dir):
+    extra = rom_dir / "readme.txt"
+    found = find_roms([rom_dir, extra, rom_dir / "halt.ch8"])
+
+    assert [path.name for path in found] == [
+        "crash.ch8", "halt.ch8", "loop.CH8", "readme.txt", "unhandled.c8"]
+
+
+def test_run_job_reports_unhandled_instruction(rom_dir):
+    result = run_job(FarmJob(str(rom_dir / "unhandled.c8"), max_cycles=100))
+
+    assert result.stop_reason == StopReason.UNHANDLED
+    assert result.unhandled_instruction == 0xFFFF
+    assert result.unhandled_address == 0x202
+    assert result.cycles == 1
+    assert not result.ok
+
+
+def test_run_job_reports_load_errors(tmp_path):
+    result = run_job(FarmJob(str(tmp_path / "missing.ch8"), max_cycles=10))
+
+    assert result.error is not None
+    assert result.stop_reason is None
+    assert not result.ok
+
+
+def test_run_farm_keeps_rom_order(rom_dir):
+    paths = find_roms([rom_dir])
+    results = run_farm(paths, max_frames=3, max_workers=2)
+
+    assert [result.rom_path for result in results] == [
+        str(path) for path in paths]
+
+    crash, halt, loop, unhandled = results
+    assert not crash.ok
+    assert halt.stop_reason == StopReason.HALTED
+    assert halt.ok
+    assert loop.stop_reason == StopReason.CYCLE_LIMIT
+    assert loop.cycles == 3 * 20
+    assert unhandled.stop_reason == StopReason.UNHANDLED
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+def test_run_job_reports_crashes(rom_dir, mode):
+    result = run_job(FarmJob(str(rom_dir / "crash.ch8"), 100, None, mode))
+
+    assert "IndexError" in result.error
+    assert result.error_address == 0x202
+    assert result.cycles == 1
+    assert result.seconds > 0
+    assert result.stop_reason is None
+    assert not result.ok
+    assert format_result(result).endswith(" @ 0x202")
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+def test_modes_agree_on_framebuffer(rom_dir, mode):
+    expected = run_job(FarmJob(str(rom_dir / "halt.ch8"), max_cycles=50))
+    result = run_job(FarmJob(str(rom_dir / "halt.ch8"), 50, None, mode))
+
+    assert result.framebuffer_hash == expected.framebuffer_hash
+
+
+def test_run_farm_needs_one_budget(rom_dir):
+    with pytest.raises(ValueError):
+        run_farm([rom_dir / "halt.ch8"])
+    with pytest.raises(ValueError):
+        run_farm([rom_dir / "halt.ch8"], max_cycles=1, max_frames=1)
+
+
+def test_results_serialize_to_json(rom_dir):
+    result = run_job(FarmJob(str(rom_dir / "unhandled.c8"), max_cycles=10))
+    loaded = json.loads(json.dumps(result.to_dict()))
+
+    assert loaded["stop_reason"] == "UNHANDLED"
+    assert loaded["unhandled_instruction"] == 0xFFFF
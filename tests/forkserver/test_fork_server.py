@@ -0,0 +1,118 @@
+import os
+
+import pytest
+from eightdad.core.vm import ExecutionMode, StopReason, XO_CHIP_MEMORY_SIZE
+from eightdad.forkserver import ForkServer, load_warm_vm
+from eightdad.frontend.headless import InputEvent, run_headless
+
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(os, "fork"), reason="needs os.fork()")
+
+
+# Counts V0 up from 0 each frame, and halts when key 5 is held
+COUNTER_ROM = bytes.fromhex(
+    "7001"  # 200 V0 += 1
+    "6105"  # 202 V1 = 5
+    "E19E"  # 204 skip next if key V1 held
+    "1200"  # 206 loop
+    "1208"  # 208 halt
+)
+
+
+@pytest.fixture
+def warm_vm(tmp_path):
+    rom_path = tmp_path / "counter.ch8"
+    rom_path.write_bytes(COUNTER_ROM)
+    return load_warm_vm(rom_path, boot_frames=2)
+
+
+def test_load_warm_vm_runs_boot_frames(warm_vm):
+    assert warm_vm.execution_mode == ExecutionMode.JIT
+    assert warm_vm.cycle_count == 2 * warm_vm.ticks_per_frame
+
+
+def test_load_warm_vm_with_super_chip(tmp_path):
+    rom_path = tmp_path / "hires.ch8"
+    # switch to high resolution, then halt
+    rom_path.write_bytes(bytes.fromhex("00FF1202"))
+    vm = load_warm_vm(rom_path, boot_frames=1, super_chip=True)
+
+    assert vm.super_chip
+    assert ForkServer(vm).run(lambda vm, _: vm.high_resolution, None)
+
+
+def test_load_warm_vm_with_xo_chip(tmp_path):
+    rom_path = tmp_path / "planes.ch8"
+    # select the second plane, then halt
+    rom_path.write_bytes(bytes.fromhex("F2011202"))
+    vm = load_warm_vm(rom_path, boot_frames=1, xo_chip=True)
+
+    assert vm.xo_chip
+    assert len(vm.memory) == XO_CHIP_MEMORY_SIZE
+    assert ForkServer(vm).run(lambda vm, _: vm.selected_planes, None) == 2
+
+
+def test_children_do_not_change_the_server_vm(warm_vm):
+    before = warm_vm.snapshot()
+    server = ForkServer(warm_vm, max_workers=2)
+
+    def job(vm, cycles):
+        vm.run_cycles(cycles)
+        return vm.v_registers[0]
+
+    counted = server.map(job, [4, 8, 12])
+
+    assert counted == [
+        (warm_vm.v_registers[0] + n // 4) % 256 for n in (4, 8, 12)]
+    assert warm_vm.snapshot() == before
+
+
+def test_map_runs_headless_input_search(warm_vm):
+    server = ForkServer(warm_vm)
+    frame = warm_vm.cycle_count // warm_vm.ticks_per_frame
+    scripts = [
+        [],
+        [InputEvent(frame + 1, 0x5, True)],
+        [InputEvent(frame + 1, 0x4, True)],
+    ]
+
+    results = server.map(
+        lambda vm, inputs: run_headless(vm, 200, inputs), scripts)
+
+    assert [result.stop_reason for result in results] == [
+        StopReason.CYCLE_LIMIT, StopReason.HALTED, StopReason.CYCLE_LIMIT]
+
+
+def test_run_reraises_job_errors(warm_vm):
+    def job(vm, item):
+        raise KeyError(item)
+
+    with pytest.raises(KeyError):
+        ForkServer(warm_vm).run(job, "missing")
+
+
+def test_child_exiting_without_result(warm_vm):
+    def job(vm, item):
+        os._exit(3)
+
+    with pytest.raises(ChildProcessError):
+        ForkServer(warm_vm).run(job, None)
+
+
+def test_map_waits_for_children_after_error(warm_vm):
+    def job(vm, item):
+        if item == 1:
+            raise ValueError(item)
+        return item
+
+    with pytest.raises(ValueError):
+        ForkServer(warm_vm, max_workers=3).map(job, range(5))
+
+    with pytest.raises(ChildProcessError):
+        os.waitpid(-1, os.WNOHANG)
+
+
+def test_rejects_no_workers(warm_vm):
+    with pytest.raises(ValueError):
+        ForkServer(warm_vm, max_workers=0)
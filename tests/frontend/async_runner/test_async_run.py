@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from eightdad.core.vm import StopReason
+from eightdad.frontend.async_runner import (
+    Frame,
+    FramePublisher,
+    KeyEvent,
+    run
+)
+
+build_vm = pytest.helpers.build_vm
+
+
+# Draws digit 0, waits for a key, draws it, then halts
+KEY_PROGRAM = bytes.fromhex(
+    "F029"  # 200 I = digit V0
+    "D005"  # 202 draw
+    "F10A"  # 204 V1 = key
+    "F129"  # 206 I = digit V1
+    "6208"  # 208 V2 = 8
+    "D125"  # 20A draw at V1, V2
+    "120C"  # 20C halt
+)
+
+# counts forever
+LOOP_PROGRAM = bytes.fromhex("70011200")
+
+
+async def client(keys: asyncio.Queue, frames: asyncio.Queue, key: int):
+    """
+    A stand-in for a remote observer: press a key, then watch frames.
+    """
+    seen = [await frames.get()]
+    await keys.put(KeyEvent(key, True))
+    await keys.put(KeyEvent(key, False))
+    while True:
+        seen.append(await frames.get())
+        if seen[-1].pixels != seen[0].pixels:
+            return seen
+
+
+def test_client_session_sees_its_key_drawn():
+    async def session():
+        vm = build_vm(KEY_PROGRAM)
+        keys = asyncio.Queue()
+        publisher = FramePublisher()
+        frames = publisher.subscribe(maxsize=100)
+
+        runner = asyncio.create_task(
+            run(vm, fps=1000, keys=keys, publisher=publisher))
+        seen = await client(keys, frames, 0x7)
+        return vm, await runner, seen
+
+    vm, reason, seen = asyncio.run(session())
+
+    assert reason == StopReason.HALTED
+    assert vm.v_registers[1] == 0x7
+    assert [frame.number for frame in seen] == list(
+        range(seen[0].number, seen[-1].number + 1))
+
+
+def test_many_sessions_share_one_loop():
+    async def sessions():
+        vms = [build_vm(LOOP_PROGRAM) for _ in range(8)]
+        return vms, await asyncio.gather(*(
+            run(vm, fps=500, max_frames=10) for vm in vms))
+
+    vms, reasons = asyncio.run(sessions())
+
+    assert reasons == [StopReason.FRAME_END] * 8
+    assert all(vm.cycle_count == 10 * vm.ticks_per_frame for vm in vms)
+
+
+def test_paces_frames_to_fps():
+    async def timed():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await run(build_vm(LOOP_PROGRAM), fps=100, max_frames=10)
+        return loop.time() - start
+
+    assert asyncio.run(timed()) >= 0.09
+
+
+def test_cancelling_ends_the_session():
+    async def cancelled():
+        task = asyncio.create_task(run(build_vm(LOOP_PROGRAM), fps=1000))
+        await asyncio.sleep(0.02)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled())
+
+
+class TestFramePublisher:
+
+    def test_slow_subscribers_keep_the_newest_frames(self):
+        async def publish():
+            publisher = FramePublisher()
+            latest = publisher.subscribe()
+            recent = publisher.subscribe(maxsize=2)
+            for number in range(5):
+                publisher.publish(Frame(number, b""))
+            return latest, recent
+
+        latest, recent = asyncio.run(publish())
+        assert latest.get_nowait().number == 4
+        assert [recent.get_nowait().number for _ in range(2)] == [3, 4]
+
+    def test_unsubscribe(self):
+        async def publish():
+            publisher = FramePublisher()
+            frames = publisher.subscribe()
+            publisher.unsubscribe(frames)
+            publisher.publish(Frame(0, b""))
+            return frames
+
+        assert asyncio.run(publish()).empty()
+
+    def test_rejects_empty_queues(self):
+        with pytest.raises(ValueError):
+            FramePublisher().subscribe(maxsize=0)
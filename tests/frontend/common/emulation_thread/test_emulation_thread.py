@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+from eightdad.core.vm import StopReason
+from eightdad.frontend.common.emulation_thread import (
+    EmulationThread,
+    FrameBuffer
+)
+
+build_vm = pytest.helpers.build_vm
+
+
+# Draws digit 0, waits for a key, draws it, then halts
+KEY_PROGRAM = bytes.fromhex(
+    "F029"  # 200 I = digit V0
+    "D005"  # 202 draw
+    "F10A"  # 204 V1 = key
+    "F129"  # 206 I = digit V1
+    "6208"  # 208 V2 = 8
+    "D125"  # 20A draw at V1, V2
+    "120C"  # 20C halt
+)
+
+
+def wait_for(condition, timeout=5.0):
+    end = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > end:
+            raise AssertionError("Timed out waiting for condition")
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def started():
+    threads = []
+
+    def start(vm, **kwargs):
+        thread = EmulationThread(vm, **kwargs)
+        threads.append(thread)
+        thread.start()
+        return thread
+
+    yield start
+    for thread in threads:
+        thread.stop(timeout=5)
+
+
+def test_publishes_frames_and_applies_keys(started):
+    vm = build_vm(KEY_PROGRAM)
+    thread = started(vm, fps=500)
+    blank = bytes(len(vm.video_ram.pixels.tobytes()))
+
+    wait_for(lambda: thread.frame_buffer.read()[1] != blank)
+    wait_for(lambda: vm.blocked_on_input)
+    waiting_screen = thread.frame_buffer.read()[1]
+
+    thread.press(0x7)
+    thread.release(0x7)
+    wait_for(lambda: thread.frame_buffer.read()[1] != waiting_screen)
+    assert thread.frame_buffer.read()[1] == vm.video_ram.pixels.tobytes()
+    assert vm.v_registers[1] == 0x7
+
+
+def test_starts_paused_and_steps(started):
+    vm = build_vm(KEY_PROGRAM)
+    thread = started(vm, fps=500, paused=True)
+    time.sleep(0.02)
+    assert vm.cycle_count == 0
+
+    thread.step()
+    wait_for(lambda: vm.cycle_count == 1)
+    thread.paused = False
+    wait_for(lambda: vm.blocked_on_input)
+
+
+def test_pauses_itself_on_unhandled_instruction(started):
+    vm = build_vm(bytes.fromhex("6A01FFFF"))
+    thread = started(vm, fps=500)
+
+    wait_for(lambda: thread.paused)
+    assert thread.last_stop_reason == StopReason.UNHANDLED
+    assert vm.program_counter == 0x202
+
+
+def test_pauses_itself_when_a_frame_raises(started):
+    # returns with nothing on the stack
+    vm = build_vm(bytes.fromhex("600500EE"))
+    thread = started(vm, fps=500)
+
+    wait_for(lambda: thread.paused)
+    assert isinstance(thread.last_error, IndexError)
+    assert thread.last_stop_reason is None
+    assert thread.is_alive()
+    assert vm.program_counter == 0x202
+
+
+def test_keeps_running_commands_after_one_raises(started):
+    vm = build_vm(bytes.fromhex("00EE"))
+    thread = started(vm, fps=500, paused=True)
+
+    thread.step()
+    wait_for(lambda: thread.last_error is not None)
+    assert isinstance(thread.last_error, IndexError)
+
+    thread.submit(lambda vm: vm.call_stack.append(0x300))
+    thread.step()
+    wait_for(lambda: vm.program_counter == 0x302)
+    assert thread.is_alive()
+
+
+def test_stop_ends_the_thread(started):
+    thread = started(build_vm(bytes.fromhex("70011200")), fps=30)
+    thread.stop(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_rejects_bad_fps():
+    with pytest.raises(ValueError):
+        EmulationThread(build_vm(KEY_PROGRAM), fps=0)
+
+
+class TestFrameBuffer:
+
+    def test_read_returns_newest_publish(self):
+        buffer = FrameBuffer(4)
+        assert buffer.read() == (0, bytes(4))
+
+        buffer.publish(b"\x01\x02\x03\x04")
+        buffer.publish(b"\x05\x06\x07\x08")
+        assert buffer.read() == (2, b"\x05\x06\x07\x08")
+
+    def test_reads_are_never_torn(self):
+        buffer = FrameBuffer(256)
+        done = threading.Event()
+
+        def writer():
+            for value in range(2000):
+                buffer.publish(bytes([value % 256]) * 256)
+            done.set()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        while not done.is_set():
+            _, pixels = buffer.read()
+            assert pixels == pixels[:1] * 256
+        thread.join()
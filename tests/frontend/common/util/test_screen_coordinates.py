@@ -0,0 +1,22 @@
+from eightdad.core import Chip8VirtualMachine as VM
+from eightdad.core.video import DirtyRegion
+from eightdad.frontend.common.util import screen_coordinates
+
+
+def test_covers_whole_screen():
+    vm = VM(display_size=(4, 2))
+    assert list(screen_coordinates(vm)) == [
+        (0, 0), (0, 1), (1, 0), (1, 1), (2, 0), (2, 1), (3, 0), (3, 1)]
+
+
+def test_steps():
+    vm = VM(display_size=(4, 8))
+    assert list(screen_coordinates(vm, x_step=2, y_step=4)) == [
+        (0, 0), (0, 4), (2, 0), (2, 4)]
+
+
+def test_region_limits_to_overlapping_chunks():
+    vm = VM()
+    region = DirtyRegion(frozenset({5, 6}), 3, 5, 7, 7)
+    assert list(screen_coordinates(vm, 2, 4, region)) == [
+        (2, 4), (4, 4), (6, 4)]
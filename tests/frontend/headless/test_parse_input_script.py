@@ -0,0 +1,33 @@
+import pytest
+from eightdad.frontend.headless import InputEvent, parse_input_script
+
+
+def test_parses_and_orders_events():
+    events = parse_input_script([
+        "# comment line",
+        "",
+        "60 release 5  # trailing comment",
+        "0 press 5",
+        "60 press F",
+    ])
+    assert events == [
+        InputEvent(0, 0x5, True),
+        InputEvent(60, 0x5, False),
+        InputEvent(60, 0xF, True),
+    ]
+
+
+@pytest.mark.parametrize(
+    "line",
+    (
+        "0 press",
+        "0 tap 5",
+        "zero press 5",
+        "0 press 10",
+        "-1 press 5",
+        "0 press 5 6",
+    )
+)
+def test_malformed_lines_raise_value_error(line):
+    with pytest.raises(ValueError, match="Line 2"):
+        parse_input_script(["0 press 1", line])
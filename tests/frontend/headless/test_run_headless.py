@@ -0,0 +1,98 @@
+import pytest
+from eightdad.core import Chip8VirtualMachine as VM
+from eightdad.core.vm import ExecutionMode, StopReason
+from eightdad.frontend.headless import (
+    InputEvent,
+    framebuffer_hash,
+    run_headless,
+    run_rom
+)
+
+build_vm = pytest.helpers.build_vm
+
+
+# Draws digit 0, waits for a key, draws it, then halts
+KEY_PROGRAM = bytes.fromhex(
+    "F029"  # 200 I = digit V0
+    "D005"  # 202 draw
+    "F10A"  # 204 V1 = key
+    "F129"  # 206 I = digit V1
+    "6208"  # 208 V2 = 8
+    "D125"  # 20A draw at V1, V2
+    "120C"  # 20C halt
+)
+
+
+def test_stops_at_cycle_limit():
+    vm = build_vm(KEY_PROGRAM)
+    result = run_headless(vm, max_cycles=45)
+
+    assert result.stop_reason == StopReason.KEY_WAIT
+    assert result.cycles == 45
+    assert result.frames == 2
+    assert result.framebuffer_hash == framebuffer_hash(vm)
+
+
+def test_unlimited_run_stops_on_key_wait_without_input():
+    result = run_headless(build_vm(KEY_PROGRAM))
+
+    assert result.stop_reason == StopReason.KEY_WAIT
+    # the wait idles out the rest of the first frame
+    assert result.cycles == 20
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+def test_scripted_input_reaches_halt(mode):
+    vm = build_vm(KEY_PROGRAM, mode)
+    result = run_headless(vm, inputs=[
+        InputEvent(3, 0x7, True),
+        InputEvent(4, 0x7, False)
+    ])
+
+    assert result.stop_reason == StopReason.HALTED
+    assert vm.v_registers[1] == 0x7
+    # the press is applied at the start of frame 3, and the halt idles
+    # out the rest of that frame
+    assert result.cycles == 4 * vm.ticks_per_frame
+
+
+def test_same_input_gives_same_hash():
+    inputs = [InputEvent(1, 0x3, True)]
+    first = run_headless(build_vm(KEY_PROGRAM), inputs=inputs)
+    second = run_headless(
+        build_vm(KEY_PROGRAM, ExecutionMode.JIT), inputs=inputs)
+    other_key = run_headless(
+        build_vm(KEY_PROGRAM), inputs=[InputEvent(1, 0x4, True)])
+
+    assert first.framebuffer_hash == second.framebuffer_hash
+    assert first.framebuffer_hash != other_key.framebuffer_hash
+
+
+def test_hash_is_the_frame_hash():
+    vm = build_vm(KEY_PROGRAM)
+    run_headless(vm, max_cycles=45)
+
+    assert framebuffer_hash(vm) == f"{vm.video_ram.frame_hash:08x}"
+
+
+def test_hash_covers_every_plane():
+    vm = VM(xo_chip=True)
+    first = framebuffer_hash(vm)
+
+    vm.video_planes[1].draw_sprite(0, 0, b"\x80")
+
+    assert framebuffer_hash(vm) != first
+    assert framebuffer_hash(vm) == "-".join(
+        f"{plane.frame_hash:08x}" for plane in vm.video_planes)
+
+
+def test_run_rom_counts_frames(tmp_path):
+    rom_path = tmp_path / "key.ch8"
+    rom_path.write_bytes(KEY_PROGRAM)
+    input_path = tmp_path / "input.txt"
+    input_path.write_text("2 press A\n")
+
+    result = run_rom(rom_path, max_frames=5, input_path=input_path)
+
+    assert result.stop_reason == StopReason.HALTED
+    assert result.cycles == 3 * 20